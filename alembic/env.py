@@ -30,6 +30,7 @@ config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
 
 # Import your Base here
 from app.db.base import Base
+from app.db.online_migrations import migration_timeouts, timeout_statements
 
 # --- PENTING: IMPOR SEMUA MODEL ANDA DI SINI ---
 # Ini memastikan bahwa semua kelas model yang mewarisi dari Base
@@ -43,15 +44,22 @@ import app.models.company
 import app.models.outlet
 import app.models.uom
 import app.models.product
+import app.models.login_throttle
+import app.models.sales_channel
+import app.models.product_channel_price
+import app.models.scheduler_lease
+import app.models.refresh_token
+import app.models.terminal
+import app.models.verification_code
+import app.models.audit_log
+import app.models.recipe_material
+import app.models.product_uom_conversion
 # Jika ada model lain yang akan kita buat nanti, tambahkan juga di sini:
 # import app.models.product
-# import app.models.product_uom_conversion
 # import app.models.product_variant
 # import app.models.product_outlet
-# import app.models.recipe_material
 # import app.models.production_order
 # import app.models.customer
-# import app.models.sales_channel
 # import app.models.product_variant_channel_price
 # import app.models.add_on
 # import app.models.product_variant_add_on
@@ -68,6 +76,11 @@ import app.models.product
 # that Alembic should track for migrations.
 target_metadata = Base.metadata
 
+# lock_timeout/statement_timeout untuk setiap migrasi; override dengan
+# `alembic -x lock_timeout=2s -x statement_timeout=10min upgrade head` atau
+# MIGRATION_LOCK_TIMEOUT / MIGRATION_STATEMENT_TIMEOUT di .env
+migration_settings = migration_timeouts(context.get_x_argument(as_dictionary=True))
+
 # --- End Alembic's Database URL and Model Setup ---
 
 
@@ -86,6 +99,8 @@ def run_migrations_offline() -> None:
     )
 
     with context.begin_transaction():
+        for statement in timeout_statements(migration_settings):
+            context.execute(statement)
         context.run_migrations()
 
 
@@ -102,8 +117,16 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # Level session, jadi tetap berlaku di setiap transaksi migrasi dan di autocommit_block()
+        for statement in timeout_statements(migration_settings):
+            connection.exec_driver_sql(statement)
+        connection.commit()
+
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # Satu transaksi per migrasi: lock dilepas di antara migrasi, bukan ditahan sampai head
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
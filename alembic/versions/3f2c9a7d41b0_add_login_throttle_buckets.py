@@ -0,0 +1,34 @@
+"""Add login throttle buckets
+
+Revision ID: 3f2c9a7d41b0
+Revises: da1a5aefce1a
+Create Date: 2025-07-08 10:12:41.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2c9a7d41b0'
+down_revision: Union[str, Sequence[str], None] = 'da1a5aefce1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bucket rate limit login yang dibagi antar worker (opsional, LOGIN_RATE_LIMIT_BACKEND=postgres)
+    op.create_table('login_throttle_buckets',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('login_throttle_buckets')
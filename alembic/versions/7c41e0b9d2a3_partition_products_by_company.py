@@ -0,0 +1,112 @@
+"""Partition products by company_id
+
+Revision ID: 7c41e0b9d2a3
+Revises: 3f2c9a7d41b0
+Create Date: 2025-07-09 09:41:03.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.partitioning import create_partition_layout
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c41e0b9d2a3'
+down_revision: Union[str, Sequence[str], None] = '3f2c9a7d41b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Index/constraint lama di tabel 'products' yang namanya akan dipakai ulang
+_LEGACY_INDEXES = ['ix_products_barcode', 'ix_products_id', 'ix_products_name', 'ix_products_sku']
+_LEGACY_CONSTRAINTS = ['products_pkey', '_name_company_uc', '_sku_company_uc']
+
+
+def _rename_legacy(table: str, suffix: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}{suffix}")
+    for name in _LEGACY_CONSTRAINTS:
+        op.execute(f"ALTER TABLE {table}{suffix} RENAME CONSTRAINT {name} TO {name}{suffix}")
+    for name in _LEGACY_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}{suffix}")
+    # Sequence id jangan ikut terhapus saat tabel lama di-drop
+    op.execute("ALTER SEQUENCE products_id_seq OWNED BY NONE")
+
+
+def _product_columns() -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('products_id_seq'::regclass)"), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('sku', sa.String(), nullable=False),
+        sa.Column('barcode', sa.String(), nullable=True),
+        sa.Column('stock_uom_id', sa.Integer(), nullable=False),
+        sa.Column('base_price', sa.Float(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+        sa.ForeignKeyConstraint(['stock_uom_id'], ['uoms.id'], ),
+    ]
+
+_COLUMN_LIST = (
+    "id, company_id, name, description, sku, barcode, stock_uom_id, base_price, "
+    "is_active, image_url, created_at, updated_at, deleted_at"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rename_legacy('products', '_legacy')
+
+    # Semua unique constraint pada tabel terpartisi wajib memuat kunci partisi (company_id).
+    # SKU dan barcode kini unik per company, bukan global.
+    op.create_table('products',
+    *_product_columns(),
+    sa.PrimaryKeyConstraint('id', 'company_id', name='products_pkey'),
+    sa.UniqueConstraint('name', 'company_id', name='_name_company_uc'),
+    sa.UniqueConstraint('sku', 'company_id', name='_sku_company_uc'),
+    sa.UniqueConstraint('barcode', 'company_id', name='_barcode_company_uc'),
+    postgresql_partition_by='LIST (company_id)'
+    )
+    create_partition_layout(op.get_bind())
+
+    op.create_index(op.f('ix_products_id'), 'products', ['id'], unique=False)
+    op.create_index(op.f('ix_products_name'), 'products', ['name'], unique=False)
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=False)
+    op.create_index(op.f('ix_products_barcode'), 'products', ['barcode'], unique=False)
+
+    op.execute(f"INSERT INTO products ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM products_legacy")
+    op.execute("ALTER SEQUENCE products_id_seq OWNED BY products.id")
+    op.drop_table('products_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE products RENAME TO products_partitioned")
+    for name in _LEGACY_CONSTRAINTS + ['_barcode_company_uc']:
+        op.execute(f"ALTER TABLE products_partitioned RENAME CONSTRAINT {name} TO {name}_partitioned")
+    for name in _LEGACY_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_partitioned")
+    op.execute("ALTER SEQUENCE products_id_seq OWNED BY NONE")
+
+    op.create_table('products',
+    *_product_columns(),
+    sa.PrimaryKeyConstraint('id', name='products_pkey'),
+    sa.UniqueConstraint('name', 'company_id', name='_name_company_uc'),
+    sa.UniqueConstraint('sku', 'company_id', name='_sku_company_uc')
+    )
+    op.create_index(op.f('ix_products_barcode'), 'products', ['barcode'], unique=True)
+    op.create_index(op.f('ix_products_id'), 'products', ['id'], unique=False)
+    op.create_index(op.f('ix_products_name'), 'products', ['name'], unique=False)
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=True)
+
+    op.execute(f"INSERT INTO products ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM products_partitioned")
+    op.execute("ALTER SEQUENCE products_id_seq OWNED BY products.id")
+    # DROP tabel induk ikut menghapus semua partisinya
+    op.drop_table('products_partitioned')
@@ -0,0 +1,32 @@
+"""Add outlet scope indexes
+
+Revision ID: a7c3e9d1f052
+Revises: f4a2d8c6b913
+Create Date: 2025-07-17 10:02:48.215736
+
+"""
+from typing import Sequence, Union
+
+from app.db import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9d1f052'
+down_revision: Union[str, Sequence[str], None] = 'f4a2d8c6b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Query yang dibatasi ke outlet pemanggil (app/api/deps.py); dibangun CONCURRENTLY agar kasir tidak terblokir
+    online.create_index_concurrently('ix_users_outlet_live', 'users', ['outlet_id', 'id'],
+                                     postgresql_where='deleted_at IS NULL')
+    online.create_index_concurrently('ix_product_channel_prices_company_outlet', 'product_channel_prices',
+                                     ['company_id', 'outlet_id', 'id'], postgresql_where='deleted_at IS NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    online.drop_index_concurrently('ix_product_channel_prices_company_outlet', 'product_channel_prices')
+    online.drop_index_concurrently('ix_users_outlet_live', 'users')
@@ -0,0 +1,41 @@
+"""Add composite and partial indexes for list queries
+
+Revision ID: b5d8e1f3a6c4
+Revises: 7c41e0b9d2a3
+Create Date: 2025-07-10 14:05:52.630917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d8e1f3a6c4'
+down_revision: Union[str, Sequence[str], None] = '7c41e0b9d2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # read_products: WHERE company_id = ? [AND is_active = ?] ORDER BY id
+    op.create_index('ix_products_company_active', 'products', ['company_id', 'is_active', 'id'], unique=False)
+    # Baris yang belum di-soft-delete saja
+    op.create_index('ix_products_company_live', 'products', ['company_id', 'id'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NULL'))
+    # Redundan: primary key (id, company_id) sudah diawali id
+    op.drop_index(op.f('ix_products_id'), table_name='products')
+
+    # read_users: WHERE company_id = ? [AND is_active = ?] [AND is_superuser = ?] ORDER BY id
+    op.create_index('ix_users_company_active_superuser', 'users',
+                    ['company_id', 'is_active', 'is_superuser', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_company_active_superuser', table_name='users')
+    op.create_index(op.f('ix_products_id'), 'products', ['id'], unique=False)
+    op.drop_index('ix_products_company_live', table_name='products')
+    op.drop_index('ix_products_company_active', table_name='products')
@@ -0,0 +1,58 @@
+"""Add terminals and terminal PINs
+
+Revision ID: c2e6a8f4d390
+Revises: b8d4f0a2c617
+Create Date: 2025-07-18 15:12:53.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e6a8f4d390'
+down_revision: Union[str, Sequence[str], None] = 'b8d4f0a2c617'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Terminal POS terdaftar dan PIN kasir per terminal (lihat app/services/terminals.py)
+    op.create_table('terminals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('outlet_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('secret_hash', sa.String(length=64), nullable=False),
+    sa.Column('pin_key', sa.String(length=64), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['outlet_id'], ['outlets.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_terminals_id'), 'terminals', ['id'], unique=False)
+    op.create_index('ix_terminals_outlet_live', 'terminals', ['outlet_id', 'id'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NULL'))
+    op.create_table('terminal_user_pins',
+    sa.Column('terminal_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('pin_digest', sa.String(length=64), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['terminal_id'], ['terminals.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('terminal_id', 'user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('terminal_user_pins')
+    op.drop_index('ix_terminals_outlet_live', table_name='terminals', postgresql_where=sa.text('deleted_at IS NULL'))
+    op.drop_index(op.f('ix_terminals_id'), table_name='terminals')
+    op.drop_table('terminals')
@@ -0,0 +1,42 @@
+"""Make list indexes partial on live (not soft-deleted) rows
+
+Revision ID: c9a4f2e7b130
+Revises: b5d8e1f3a6c4
+Create Date: 2025-07-11 11:26:37.482905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9a4f2e7b130'
+down_revision: Union[str, Sequence[str], None] = 'b5d8e1f3a6c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Query baca kini selalu memfilter deleted_at IS NULL (app/db/soft_delete.py),
+    # jadi index cukup memuat baris hidup dan tidak pernah menyentuh tombstone.
+    op.drop_index('ix_products_company_active', table_name='products')
+    op.create_index('ix_products_company_active', 'products', ['company_id', 'is_active', 'id'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NULL'))
+
+    op.drop_index('ix_users_company_active_superuser', table_name='users')
+    op.create_index('ix_users_company_active_superuser', 'users',
+                    ['company_id', 'is_active', 'is_superuser', 'id'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_company_active_superuser', table_name='users')
+    op.create_index('ix_users_company_active_superuser', 'users',
+                    ['company_id', 'is_active', 'is_superuser', 'id'], unique=False)
+
+    op.drop_index('ix_products_company_active', table_name='products')
+    op.create_index('ix_products_company_active', 'products', ['company_id', 'is_active', 'id'], unique=False)
@@ -0,0 +1,69 @@
+"""Add sales channels and product channel prices
+
+Revision ID: d3e8b6a1c572
+Revises: c9a4f2e7b130
+Create Date: 2025-07-14 09:18:55.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3e8b6a1c572'
+down_revision: Union[str, Sequence[str], None] = 'c9a4f2e7b130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales_channels',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code', 'company_id', name='_channel_code_company_uc')
+    )
+    op.create_index(op.f('ix_sales_channels_id'), 'sales_channels', ['id'], unique=False)
+
+    op.create_table('product_channel_prices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('sales_channel_id', sa.Integer(), nullable=False),
+    sa.Column('outlet_id', sa.Integer(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('valid_from', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('valid_to', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['product_id', 'company_id'], ['products.id', 'products.company_id'],
+                            name='fk_product_channel_prices_product'),
+    sa.ForeignKeyConstraint(['sales_channel_id'], ['sales_channels.id'], ),
+    sa.ForeignKeyConstraint(['outlet_id'], ['outlets.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_product_channel_prices_id'), 'product_channel_prices', ['id'], unique=False)
+    op.create_index('ix_product_channel_prices_product', 'product_channel_prices', ['product_id'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_channel_prices_product', table_name='product_channel_prices')
+    op.drop_index(op.f('ix_product_channel_prices_id'), table_name='product_channel_prices')
+    op.drop_table('product_channel_prices')
+    op.drop_index(op.f('ix_sales_channels_id'), table_name='sales_channels')
+    op.drop_table('sales_channels')
@@ -0,0 +1,42 @@
+"""Add verification codes
+
+Revision ID: d5f1b7c3e824
+Revises: c2e6a8f4d390
+Create Date: 2025-07-19 11:05:27.381640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1b7c3e824'
+down_revision: Union[str, Sequence[str], None] = 'c2e6a8f4d390'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Kode verifikasi/link aktivasi untuk VERIFICATION_BACKEND=postgres (dibagi antar worker/host)
+    op.create_table('verification_codes',
+    sa.Column('key_hash', sa.String(length=64), nullable=False),
+    sa.Column('purpose', sa.String(length=32), nullable=False),
+    sa.Column('secret_hash', sa.String(length=64), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('key_hash')
+    )
+    op.create_index('ix_verification_codes_expires_at', 'verification_codes', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_verification_codes_expires_at', table_name='verification_codes')
+    op.drop_table('verification_codes')
@@ -0,0 +1,28 @@
+"""Add catalog event sequence
+
+Revision ID: e1f7c3b9a845
+Revises: d3e8b6a1c572
+Create Date: 2025-07-15 10:42:31.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7c3b9a845'
+down_revision: Union[str, Sequence[str], None] = 'd3e8b6a1c572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nomor urut global event katalog (lihat app/services/catalog_events.py); dipakai terminal untuk resume
+    op.execute("CREATE SEQUENCE IF NOT EXISTS catalog_event_seq AS bigint")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP SEQUENCE IF EXISTS catalog_event_seq")
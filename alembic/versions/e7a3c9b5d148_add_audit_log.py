@@ -0,0 +1,55 @@
+"""Add audit log
+
+Revision ID: e7a3c9b5d148
+Revises: d5f1b7c3e824
+Create Date: 2025-07-21 08:52:40.527316
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.partitioning import AUDIT_DEFAULT_PARTITION, create_audit_partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c9b5d148'
+down_revision: Union[str, Sequence[str], None] = 'd5f1b7c3e824'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE audit_log_id_seq AS bigint")
+    # Append-only, dipartisi per bulan; partisi berikutnya dibuat oleh job scheduler
+    op.create_table('audit_log',
+    sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('audit_log_id_seq'::regclass)"), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('entity', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.String(length=64), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=True),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('actor_user_id', sa.Integer(), nullable=True),
+    sa.Column('changes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'changed_at'),
+    postgresql_partition_by='RANGE (changed_at)'
+    )
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id")
+    op.execute(f"CREATE TABLE {AUDIT_DEFAULT_PARTITION} PARTITION OF audit_log DEFAULT")
+    create_audit_partitions(op.get_bind(), date.today(), 3)
+
+    # Index pada tabel induk otomatis dibuat di setiap partisi
+    op.create_index('ix_audit_log_entity', 'audit_log', ['entity', 'entity_id', 'changed_at'], unique=False)
+    op.create_index('ix_audit_log_company', 'audit_log', ['company_id', 'changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audit_log_company', table_name='audit_log')
+    op.drop_index('ix_audit_log_entity', table_name='audit_log')
+    # Partisi ikut terhapus bersama tabel induk; sequence ikut karena OWNED BY
+    op.drop_table('audit_log')
@@ -0,0 +1,71 @@
+"""Add recipe materials and product UOM conversions
+
+Revision ID: f2b6d4a8c371
+Revises: e7a3c9b5d148
+Create Date: 2025-07-23 10:14:07.612904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d4a8c371'
+down_revision: Union[str, Sequence[str], None] = 'e7a3c9b5d148'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('recipe_materials',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('material_product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('uom_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('quantity > 0', name='ck_recipe_materials_quantity_positive'),
+    sa.CheckConstraint('material_product_id <> product_id', name='ck_recipe_materials_not_self'),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['product_id', 'company_id'], ['products.id', 'products.company_id'],
+                            name='fk_recipe_materials_product'),
+    sa.ForeignKeyConstraint(['material_product_id', 'company_id'], ['products.id', 'products.company_id'],
+                            name='fk_recipe_materials_material'),
+    sa.ForeignKeyConstraint(['uom_id'], ['uoms.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'product_id', 'material_product_id', name='_recipe_material_uc')
+    )
+    op.create_index(op.f('ix_recipe_materials_id'), 'recipe_materials', ['id'], unique=False)
+    op.create_index('ix_recipe_materials_material', 'recipe_materials', ['company_id', 'material_product_id'], unique=False)
+
+    op.create_table('product_uom_conversions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('uom_id', sa.Integer(), nullable=False),
+    sa.Column('factor', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('factor > 0', name='ck_product_uom_conversions_factor_positive'),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['product_id', 'company_id'], ['products.id', 'products.company_id'],
+                            name='fk_product_uom_conversions_product'),
+    sa.ForeignKeyConstraint(['uom_id'], ['uoms.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'product_id', 'uom_id', name='_product_uom_conversion_uc')
+    )
+    op.create_index(op.f('ix_product_uom_conversions_id'), 'product_uom_conversions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_product_uom_conversions_id'), table_name='product_uom_conversions')
+    op.drop_table('product_uom_conversions')
+    op.drop_index('ix_recipe_materials_material', table_name='recipe_materials')
+    op.drop_index(op.f('ix_recipe_materials_id'), table_name='recipe_materials')
+    op.drop_table('recipe_materials')
@@ -0,0 +1,41 @@
+"""Add scheduler leases
+
+Revision ID: f4a2d8c6b913
+Revises: e1f7c3b9a845
+Create Date: 2025-07-16 13:27:04.562981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a2d8c6b913'
+down_revision: Union[str, Sequence[str], None] = 'e1f7c3b9a845'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lease per job periodik, agar job berjalan tepat sekali di antara semua worker/host
+    op.create_table('scheduler_leases',
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('owner', sa.String(length=255), nullable=True),
+    sa.Column('lease_until', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_status', sa.String(length=20), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('last_duration_seconds', sa.Float(), nullable=True),
+    sa.Column('run_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('job_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduler_leases')
@@ -0,0 +1,174 @@
+# app/api/deps.py
+
+"""
+Shared endpoint dependencies: the caller (from the bearer token) and the
+data scope derived from it.
+
+A token issued by /auth/login carries company_id and outlet_id. Outlet
+staff are restricted to their outlet, company staff to their company, and
+superusers are unrestricted. Endpoints take `scope: Scope = Depends(get_scope)`
+and pass their filters through it, so a caller can narrow the result set
+but never widen it:
+
+    company_id = scope.company(company_id)   # 403 on another company
+    query = scope.apply(query, UserModel)    # WHERE company_id/outlet_id
+
+Requests without a token are unscoped unless AUTH_REQUIRED is set; most
+endpoints are not behind authentication yet.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.services.audit import set_actor
+from app.services.tokens import revocation_list
+
+# auto_error=False: token opsional selama AUTH_REQUIRED belum diaktifkan
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    username: str
+    company_id: Optional[int] = None
+    outlet_id: Optional[int] = None
+    is_superuser: bool = False
+    # Family refresh token asal access token ini (None untuk token lama tanpa "fam")
+    family_id: Optional[str] = None
+
+
+def _unauthorized(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def principal_from_token(token: Optional[str]) -> Optional[Principal]:
+    """The caller from an access token, or None if no token was sent."""
+    if token is None:
+        return None
+    payload = decode_access_token(token)
+    if payload is None or payload.get("user_id") is None:
+        raise _unauthorized()
+    # Logout atau reuse refresh token mencabut access token dari login yang sama (cek di memori)
+    if revocation_list.is_revoked(payload.get("fam")):
+        raise _unauthorized("Token has been revoked")
+    # Tanpa query DB: semua yang dibutuhkan untuk scoping ada di token
+    return Principal(
+        user_id=payload["user_id"],
+        username=payload.get("sub", ""),
+        company_id=payload.get("company_id"),
+        outlet_id=payload.get("outlet_id"),
+        is_superuser=bool(payload.get("is_superuser", False)),
+        family_id=payload.get("fam"),
+    )
+
+
+async def get_principal(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[Principal]:
+    return principal_from_token(token)
+
+
+async def audit_actor(principal: Optional[Principal] = Depends(get_principal)) -> None:
+    """
+    Router dependency: remember the caller for audit records. Shares
+    get_principal (cached per request) with the endpoint's own dependencies,
+    so a revoked or invalid token is rejected and never recorded as actor.
+    """
+    set_actor(principal.user_id if principal is not None else None)
+
+
+async def get_current_principal(principal: Optional[Principal] = Depends(get_principal)) -> Principal:
+    if principal is None:
+        raise _unauthorized("Not authenticated")
+    return principal
+
+
+@dataclass(frozen=True)
+class Scope:
+    """Rows the caller may see: None means unrestricted on that level."""
+    company_id: Optional[int] = None
+    outlet_id: Optional[int] = None
+
+    def company(self, requested: Optional[int]) -> Optional[int]:
+        """Effective company filter for a requested company_id."""
+        if self.company_id is None:
+            return requested
+        if requested is not None and requested != self.company_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access to this company is not allowed.")
+        return self.company_id
+
+    def outlet(self, requested: Optional[int]) -> Optional[int]:
+        """Effective outlet filter for a requested outlet_id."""
+        if self.outlet_id is None:
+            return requested
+        if requested is not None and requested != self.outlet_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access to this outlet is not allowed.")
+        return self.outlet_id
+
+    def apply(self, query: Any, model: Any, shared_outlet_rows: bool = False) -> Any:
+        """
+        Restrict a select on `model` to the scope, on whichever of company_id /
+        outlet_id the model has. With shared_outlet_rows, rows whose outlet_id
+        is NULL (valid for every outlet, e.g. channel prices) stay visible.
+        """
+        if self.company_id is not None and hasattr(model, "company_id"):
+            query = query.where(model.company_id == self.company_id)
+        if self.outlet_id is not None and hasattr(model, "outlet_id"):
+            if shared_outlet_rows:
+                query = query.where(or_(model.outlet_id == self.outlet_id, model.outlet_id.is_(None)))
+            else:
+                query = query.where(model.outlet_id == self.outlet_id)
+        return query
+
+    def allows(self, row: Any, shared_outlet_rows: bool = False) -> bool:
+        """Whether a loaded row/schema falls inside the scope (for lookups by id); same rules as apply()."""
+        if self.company_id is not None and getattr(row, "company_id", self.company_id) != self.company_id:
+            return False
+        if self.outlet_id is None or not hasattr(row, "outlet_id"):
+            return True
+        return row.outlet_id == self.outlet_id or (shared_outlet_rows and row.outlet_id is None)
+
+
+UNSCOPED = Scope()
+
+
+def scope_for(principal: Optional[Principal]) -> Scope:
+    if principal is None:
+        if settings.AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        return UNSCOPED
+    if principal.is_superuser:
+        return UNSCOPED
+    # Tanpa company, Scope(None) berarti tanpa batas; hanya superuser yang boleh begitu
+    if principal.company_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is not assigned to a company.")
+    return Scope(company_id=principal.company_id, outlet_id=principal.outlet_id)
+
+
+async def get_scope(principal: Optional[Principal] = Depends(get_principal)) -> Scope:
+    return scope_for(principal)
+
+
+async def get_websocket_scope(websocket: WebSocket, token: Optional[str] = None) -> Scope:
+    """
+    Scope of a WebSocket handshake. The token comes from ?token=... (browsers
+    cannot set headers on a WebSocket) or an Authorization: Bearer header.
+    Rejections close the handshake with 1008 instead of an HTTP error.
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and credentials:
+            token = credentials
+    try:
+        return scope_for(principal_from_token(token))
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
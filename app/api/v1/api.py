@@ -1,19 +1,38 @@
 # dwc_pos/app/api/v1/api.py
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.api.deps import audit_actor
 
 from .endpoints import auth # Import your auth router
 from .endpoints import uoms
 from .endpoints import products
 from .endpoints import users
+from .endpoints import pricing
+from .endpoints import events
+from .endpoints import scheduler
+from .endpoints import terminals
+from .endpoints import audit
+from .endpoints import database
+from .endpoints import receipts
+from .endpoints import recipes
 
 api_router = APIRouter()
 
 # Include authentication router
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(uoms.router, prefix="/uoms", tags=["UOMs"]) 
-api_router.include_router(products.router, prefix="/products", tags=["Products"])
-api_router.include_router(users.router, prefix="/users", tags=["Users"])
+# audit_actor: perubahan yang dicatat di audit log memuat user pelakunya
+api_router.include_router(products.router, prefix="/products", tags=["Products"], dependencies=[Depends(audit_actor)])
+api_router.include_router(users.router, prefix="/users", tags=["Users"], dependencies=[Depends(audit_actor)])
+api_router.include_router(pricing.router, prefix="/pricing", tags=["Pricing"], dependencies=[Depends(audit_actor)])
+api_router.include_router(events.router, prefix="/events", tags=["Events"])
+api_router.include_router(scheduler.router, prefix="/scheduler", tags=["Scheduler"])
+api_router.include_router(terminals.router, prefix="/terminals", tags=["Terminals"], dependencies=[Depends(audit_actor)])
+api_router.include_router(audit.router, prefix="/audit", tags=["Audit"])
+api_router.include_router(database.router, prefix="/db", tags=["Database"])
+api_router.include_router(receipts.router, prefix="/receipts", tags=["Receipts"])
+api_router.include_router(recipes.router, prefix="/recipes", tags=["Recipes"])
 
 # You will include other routers here later (products, categories, etc.)
 # from app.api.v1.endpoints import users, products, categories
@@ -0,0 +1,65 @@
+# app/api/v1/endpoints/audit.py
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.api.deps import Scope, get_scope
+from app.core.config import settings
+from app.db.connection import get_db
+from app.models.audit_log import AuditLog as AuditLogModel
+from app.schemas.audit import AuditLogEntry
+from app.services.audit import audit_writer
+
+router = APIRouter()
+
+@router.get("/", response_model=List[AuditLogEntry])
+async def read_audit_log(
+    entity: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    company_id: Optional[int] = None,
+    actor_user_id: Optional[int] = None,
+    since: Optional[datetime] = None, # Default: AUDIT_DEFAULT_LOOKBACK_DAYS terakhir
+    until: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Change history, newest first. Always bounded in time (`since`/`until`),
+    so only the monthly partitions of that range are scanned.
+    Records are written asynchronously and appear within a few seconds.
+    """
+    if entity_id is not None and entity is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="entity_id requires entity.")
+    if since is None:
+        since = datetime.now(timezone.utc) - timedelta(days=settings.AUDIT_DEFAULT_LOOKBACK_DAYS)
+
+    query = select(AuditLogModel).where(AuditLogModel.changed_at >= since)
+    if until is not None:
+        query = query.where(AuditLogModel.changed_at < until)
+    company_id = scope.company(company_id)
+    if company_id is not None:
+        query = query.where(AuditLogModel.company_id == company_id)
+    if entity is not None:
+        query = query.where(AuditLogModel.entity == entity)
+    if entity_id is not None:
+        query = query.where(AuditLogModel.entity_id == entity_id)
+    if actor_user_id is not None:
+        query = query.where(AuditLogModel.actor_user_id == actor_user_id)
+
+    result = await db.execute(
+        query.order_by(AuditLogModel.changed_at.desc(), AuditLogModel.id.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+@router.get("/writer")
+async def read_audit_writer_stats(
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+) -> Dict[str, Any]:
+    """Queue length and write counters of this worker's audit writer."""
+    return audit_writer.stats()
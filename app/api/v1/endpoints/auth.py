@@ -1,29 +1,105 @@
 # app/api/v1/endpoints/auth.py
 
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from app.db.connection import get_db
+from app.api.deps import Principal, get_principal
+from app.db.connection import engine, get_db
+from app.db.writes import insert_returning
 from app.models.user import User as UserModel
-from app.models.company import Company as CompanyModel
 from app.schemas.user import UserCreate, User as UserSchema
-from app.schemas.token import Token
+from app.schemas.auth import TerminalPinLogin, VerificationCodeRequest, VerifyEmailLink, VerifyLoginCode
+from app.schemas.token import RefreshTokenRequest, Token
 from app.core.config import settings # <--- INI PENTING: Import settings di sini
 from app.core.security import (
     get_password_hash,
     verify_password,
-    create_access_token
+    create_access_token,
+    generate_verification_code,
+    generate_verification_token,
     # Hapus ACCESS_TOKEN_EXPIRE_MINUTES dari sini karena diakses via settings
 )
+from app.services.cache_bus import mark_stale
+from app.services.email_service import send_email_verification_code, send_email_verification_link
+from app.services.terminals import PinLoginError, pin_login
+from app.services.tokens import (
+    RefreshTokenError,
+    issue_refresh_token,
+    revoke_family,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
+from app.services.verification import EMAIL_LINK, LOGIN_CODE, VerificationError, verification_store
+from app.core.rate_limit import (
+    AdmissionRejected,
+    HashAdmissionGate,
+    LoginThrottle,
+    PostgresTokenBucket,
+    RateLimitExceeded,
+    TokenBucketLimiter,
+)
 
 router = APIRouter()
 
+# --- Login throttling (per worker) ---
+_username_rate = settings.LOGIN_USERNAME_REFILL_PER_MINUTE / 60
+_ip_rate = settings.LOGIN_IP_REFILL_PER_MINUTE / 60
+_shared = settings.LOGIN_RATE_LIMIT_BACKEND == "postgres"
+login_throttle = LoginThrottle(
+    username_limiter=TokenBucketLimiter(settings.LOGIN_USERNAME_BURST, _username_rate),
+    ip_limiter=TokenBucketLimiter(settings.LOGIN_IP_BURST, _ip_rate),
+    shared_username=PostgresTokenBucket(engine, settings.LOGIN_USERNAME_BURST, _username_rate) if _shared else None,
+    shared_ip=PostgresTokenBucket(engine, settings.LOGIN_IP_BURST, _ip_rate) if _shared else None,
+)
+password_hash_gate = HashAdmissionGate(
+    settings.LOGIN_MAX_CONCURRENT_HASHES,
+    settings.LOGIN_HASH_QUEUE_TIMEOUT_SECONDS,
+)
+
+# --- PIN login (per worker) ---
+pin_user_limiter = TokenBucketLimiter(settings.PIN_LOGIN_USER_BURST, settings.PIN_LOGIN_USER_REFILL_PER_MINUTE / 60)
+pin_terminal_limiter = TokenBucketLimiter(
+    settings.PIN_LOGIN_TERMINAL_BURST, settings.PIN_LOGIN_TERMINAL_REFILL_PER_MINUTE / 60
+)
+
+def _token_response(user: UserModel, refresh_token: str, family_id: str) -> dict:
+    """Access token for the user, tied to the refresh token family, plus the refresh token itself."""
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        # company_id/outlet_id dipakai app/api/deps.py untuk membatasi data yang bisa dibaca;
+        # fam menghubungkan access token ke family refresh token-nya (untuk pencabutan)
+        data={
+            "sub": user.username,
+            "user_id": user.id,
+            "is_superuser": user.is_superuser,
+            "company_id": user.company_id,
+            "outlet_id": user.outlet_id,
+            "fam": family_id,
+        },
+        expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+def _too_many_attempts(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts. Please try again later.",
+        headers={"Retry-After": str(max(1, int(retry_after)))},
+    )
+
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_in: UserCreate,
@@ -32,23 +108,20 @@ async def register_user(
     """
     Register a new user.
     Hashes the password and checks for duplicate username or email.
+    Self-registered users are never superusers and belong to no company or
+    outlet (is_superuser, company_id and outlet_id in the body are ignored):
+    the company in the token grants data scope, so only a company admin or
+    superuser can assign one, through /users. Until then the user can log in
+    but every scoped endpoint answers 403.
     """
-    # Validate company_id if provided
-    if user_in.company_id is not None:
-        company = await db.execute(
-            select(CompanyModel).where(CompanyModel.id == user_in.company_id, CompanyModel.is_active == True)
-        )
-        if not company.scalar_one_or_none():
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Company with ID {user_in.company_id} not found or is inactive."
-            )
-
     # Check for duplicate username or email
     existing_user = await db.execute(
         select(UserModel).where(
             (UserModel.username == user_in.username) | (UserModel.email == user_in.email)
         )
+        # Unique constraint di DB juga mencakup baris yang sudah di-soft-delete
+        .execution_options(include_deleted=True)
+        .limit(1)
     )
     if existing_user.scalar_one_or_none():
         raise HTTPException(
@@ -59,57 +132,267 @@ async def register_user(
     # Hash the password
     hashed_password = get_password_hash(user_in.password)
     
-    # Create the user model instance
-    db_user = UserModel(
-        username=user_in.username,
-        email=user_in.email,
-        hashed_password=hashed_password,
-        full_name=user_in.full_name,
-        company_id=user_in.company_id,
-        is_active=user_in.is_active,
-        is_superuser=user_in.is_superuser
-    )
-
-    db.add(db_user)
+    # INSERT ... RETURNING: respons dibangun dari baris yang dikembalikan, tanpa refresh/re-select
+    row = await insert_returning(db, UserModel, {
+        "username": user_in.username,
+        "email": user_in.email,
+        "hashed_password": hashed_password,
+        "full_name": user_in.full_name,
+        # Company/outlet dan hak superuser hanya bisa diberikan lewat /users
+        "company_id": None,
+        "outlet_id": None,
+        "is_active": user_in.is_active,
+        "is_superuser": False,
+    })
     await db.commit()
-    await db.refresh(db_user)
-
-    # Eager load the company relationship for the response
-    loaded_user_result = await db.execute(
-        select(UserModel)
-        .options(selectinload(UserModel.company))
-        .where(UserModel.id == db_user.id)
-    )
-    loaded_user = loaded_user_result.scalar_one()
-
-    return loaded_user
+    return UserSchema.model_validate({**row, "company": None})
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Login endpoint to get an OAuth2 access token.
+    Attempts are rate limited per username and client IP, and the number of
+    concurrent bcrypt verifications per worker is capped; excess attempts get
+    429 before any database lookup or hashing.
     """
-    user = await db.execute(
-        select(UserModel)
-        .options(selectinload(UserModel.company)) # Eager load company saat login
-        .where(UserModel.username == form_data.username, UserModel.is_active == True)
-    )
-    user = user.scalar_one_or_none()
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        try:
+            await login_throttle.check(form_data.username, request.client.host if request.client else None)
+        except RateLimitExceeded as e:
+            raise _too_many_attempts(e.retry_after)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        async with password_hash_gate.slot():
+            user = await db.execute(
+                select(UserModel)
+                .options(selectinload(UserModel.company)) # Eager load company saat login
+                .where(UserModel.username == form_data.username, UserModel.is_active == True)
+            )
+            user = user.scalar_one_or_none()
+
+            # bcrypt dijalankan di threadpool agar tidak memblokir event loop
+            password_ok = user is not None and await run_in_threadpool(
+                verify_password, form_data.password, user.hashed_password
+            )
+    except AdmissionRejected:
+        raise _too_many_attempts(1)
+
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create an access token using settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    # Access token (settings.ACCESS_TOKEN_EXPIRE_MINUTES) + refresh token, agar terminal tidak perlu login ulang
+    refresh_token, family_id = await issue_refresh_token(db, user.id)
+    tokens = _token_response(user, refresh_token, family_id)
+    await db.commit()
+    return tokens
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    refresh_in: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    The presented refresh token is single-use: presenting it again revokes
+    every token descended from the same login.
+    """
+    try:
+        user, refresh_token, family_id = await rotate_refresh_token(db, refresh_in.refresh_token)
+    except RefreshTokenError as e:
+        if e.reused:
+            await db.commit() # Simpan pencabutan family
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    tokens = _token_response(user, refresh_token, family_id)
+    await db.commit()
+    return tokens
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    refresh_in: Optional[RefreshTokenRequest] = None,
+    principal: Optional[Principal] = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Revoke the refresh token and every access token issued from the same login.
+    Without a body, the login of the bearer access token is revoked instead
+    (the only way to end a PIN session, which has no refresh token).
+    """
+    if refresh_in is not None:
+        if await revoke_refresh_token(db, refresh_in.refresh_token):
+            await db.commit()
+    elif principal is not None and principal.family_id is not None:
+        await revoke_family(db, principal.family_id)
+        await db.commit()
+
+
+@router.post("/pin-login", response_model=Token)
+async def pin_login_for_access_token(
+    login_in: TerminalPinLogin,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cashier login with a 6-digit PIN on a registered terminal (quick user switching).
+    The terminal identifies itself with its secret; the token is scoped to the
+    terminal's outlet, also for superusers. Terminal and cashier data come
+    from the cached terminal roster; the only database access is one INSERT
+    recording the session as a token family, so /auth/logout (bearer token)
+    and family revocation can end it. Attempts are rate limited per cashier
+    and per terminal.
+    """
+    for key, limiter in (
+        (f"terminal:{login_in.terminal_id}:{login_in.username_or_email.strip().lower()}", pin_user_limiter),
+        (f"terminal:{login_in.terminal_id}", pin_terminal_limiter),
+    ):
+        allowed, retry_after = limiter.try_acquire(key)
+        if not allowed:
+            raise _too_many_attempts(retry_after)
+
+    try:
+        roster, cashier = await pin_login(
+            db, login_in.terminal_id, login_in.terminal_secret, login_in.username_or_email, login_in.pin
+        )
+    except PinLoginError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect terminal, user or PIN",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Family dicatat agar sesi bisa dicabut; refresh token-nya tidak diberikan
+    # (refresh akan menghasilkan token tanpa batas outlet terminal): kasir cukup memasukkan PIN lagi
+    _refresh_token, family_id = await issue_refresh_token(db, cashier.user_id)
+    await db.commit()
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username, "user_id": user.id, "is_superuser": user.is_superuser, "company_id": user.company_id},
+        data={
+            "sub": cashier.username,
+            "user_id": cashier.user_id,
+            # Superuser tanpa batas scope; token terminal selalu dibatasi outlet terminal
+            "is_superuser": False,
+            "company_id": roster.company_id,
+            "outlet_id": roster.outlet_id, # Outlet terminal, bukan outlet default user
+            "term": roster.terminal_id,
+            "fam": family_id,
+        },
         expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+
+async def _throttle(request: Request, key: str) -> None:
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        try:
+            await login_throttle.check(key, request.client.host if request.client else None)
+        except RateLimitExceeded as e:
+            raise _too_many_attempts(e.retry_after)
+
+async def _user_by_email(db: AsyncSession, email: str) -> Optional[UserModel]:
+    result = await db.execute(select(UserModel).where(func.lower(UserModel.email) == email.strip().lower()))
+    return result.scalar_one_or_none()
+
+@router.post("/verification-code", status_code=status.HTTP_202_ACCEPTED)
+async def request_verification_code(
+    request: Request,
+    code_in: VerificationCodeRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Email a 6-digit login code. The response is the same whether or not the
+    email is registered, so the endpoint cannot be used to discover accounts.
+    """
+    await _throttle(request, code_in.email)
+    user = await _user_by_email(db, code_in.email)
+    if user is not None and user.is_active:
+        code = generate_verification_code()
+        await verification_store.issue(
+            LOGIN_CODE, code_in.email, code, settings.VERIFICATION_CODE_TTL_SECONDS, payload={"user_id": user.id}
+        )
+        await send_email_verification_code(user.email, code)
+    return {"detail": "If the email is registered, a verification code has been sent."}
+
+@router.post("/verify-code", response_model=Token)
+async def login_with_verification_code(
+    request: Request,
+    verify_in: VerifyLoginCode,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Log in with an emailed code. Each code is single-use and allows
+    VERIFICATION_MAX_ATTEMPTS wrong guesses before it is discarded.
+    """
+    await _throttle(request, verify_in.email)
+    try:
+        payload = await verification_store.verify(LOGIN_CODE, verify_in.email, verify_in.code)
+    except VerificationError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired verification code",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await db.get(UserModel, payload["user_id"])
+    if user is None or not user.is_active or user.deleted_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired verification code",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    refresh_token, family_id = await issue_refresh_token(db, user.id)
+    tokens = _token_response(user, refresh_token, family_id)
+    await db.commit()
+    return tokens
+
+@router.post("/verification-link", status_code=status.HTTP_202_ACCEPTED)
+async def request_verification_link(
+    request: Request,
+    link_in: VerificationCodeRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Email an account activation link (same response whether or not the email is registered).
+    """
+    await _throttle(request, link_in.email)
+    user = await _user_by_email(db, link_in.email)
+    if user is not None:
+        token = generate_verification_token()
+        # Token itu sendiri adalah subjek: link bisa diverifikasi tanpa email
+        await verification_store.issue(
+            EMAIL_LINK, token, token, settings.VERIFICATION_LINK_TTL_SECONDS, payload={"user_id": user.id}
+        )
+        await send_email_verification_link(user.email, f"{settings.VERIFICATION_LINK_BASE_URL}?token={token}")
+    return {"detail": "If the email is registered, an activation link has been sent."}
+
+@router.post("/verify-email", status_code=status.HTTP_204_NO_CONTENT)
+async def verify_email_link(
+    verify_in: VerifyEmailLink,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Activate the account behind an activation link token (single-use).
+    """
+    try:
+        payload = await verification_store.verify(EMAIL_LINK, verify_in.token, verify_in.token)
+    except VerificationError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired activation link")
+    user = await db.get(UserModel, payload["user_id"])
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired activation link")
+    if not user.is_active:
+        user.is_active = True
+        mark_stale(db, "user", user.id)
+        await db.commit()
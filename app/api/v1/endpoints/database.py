@@ -0,0 +1,34 @@
+# app/api/v1/endpoints/database.py
+
+from typing import Any, Dict
+from fastapi import APIRouter, status
+
+from app.core.config import settings
+from app.db.connection import engine
+from app.db.queries import statement_stats
+
+router = APIRouter()
+
+@router.get("/statement-cache")
+async def read_statement_cache_stats(
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+) -> Dict[str, Any]:
+    """
+    SQLAlchemy compiled-cache outcomes per hot query on this worker (since
+    start or the last reset), plus the configured cache sizes. "(other)"
+    counts every statement outside the registry in app/db/queries.py.
+    """
+    compiled_cache = engine.sync_engine._compiled_cache
+    return {
+        "compiled_cache_entries": len(compiled_cache) if compiled_cache is not None else 0,
+        "compiled_cache_size": settings.DB_COMPILED_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "queries": statement_stats.snapshot(),
+    }
+
+@router.post("/statement-cache/reset", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_statement_cache_stats(
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """Start a new measurement window (e.g. right before a load test)."""
+    statement_stats.reset()
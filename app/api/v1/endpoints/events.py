@@ -0,0 +1,64 @@
+# app/api/v1/endpoints/events.py
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+
+from app.api.deps import Scope, get_websocket_scope
+from app.core.config import settings
+from app.services.catalog_events import catalog_hub
+
+router = APIRouter()
+
+@router.websocket("/catalog")
+async def catalog_events(
+    websocket: WebSocket,
+    company_id: int,
+    outlet_id: Optional[int] = None, # Kosong = semua outlet company ini
+    since: Optional[int] = None, # seq terakhir yang sudah diproses terminal (resume)
+    scope: Scope = Depends(get_websocket_scope), # Token lewat ?token=... atau header Authorization
+):
+    """
+    Push catalog changes (product, uom, price) of one company/outlet to a terminal.
+
+    Messages:
+      {"type": "hello", "seq": <latest seq>}
+      {"type": "changes", "seq": n, "changes": {"product": [ids] | "*", "price": [...], "uom": "*"}}
+      {"type": "resync", "seq": n}   -- re-read the catalog, then continue from n
+    The terminal stores the latest seq and passes it as `since` when reconnecting.
+    A caller bound to a company/outlet can only subscribe to its own.
+    """
+    try:
+        company_id, outlet_id = scope.company(company_id), scope.outlet(outlet_id)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    await websocket.accept()
+    subscription = catalog_hub.subscribe(company_id, outlet_id, since)
+
+    async def sender():
+        await websocket.send_json({"type": "hello", "seq": catalog_hub.latest_seq})
+        while True:
+            message = await subscription.next_message()
+            # Terminal yang tidak sanggup menerima dalam batas waktu diputus; ia bisa resume nanti
+            await asyncio.wait_for(websocket.send_json(message), settings.CATALOG_EVENTS_SEND_TIMEOUT_SECONDS)
+
+    async def receiver():
+        # Pesan dari terminal (mis. ping) diabaikan; loop ini mendeteksi disconnect
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if isinstance(error, asyncio.TimeoutError):
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            elif error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        catalog_hub.unsubscribe(subscription)
@@ -0,0 +1,232 @@
+# app/api/v1/endpoints/pricing.py
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import Integer, any_, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.api.deps import Scope, get_scope
+from app.db.connection import get_db
+from app.models.product import Product as ProductModel
+from app.models.sales_channel import SalesChannel as SalesChannelModel
+from app.models.product_channel_price import ProductChannelPrice as ProductChannelPriceModel
+from app.schemas.pricing import (
+    SalesChannelCreate,
+    SalesChannel as SalesChannelSchema,
+    ProductChannelPriceCreate,
+    ProductChannelPrice as ProductChannelPriceSchema,
+    PriceResolveRequest,
+    PriceResolveResponse,
+    ResolvedPrice,
+)
+from app.core.cache import local_cache
+from app.services.cache_bus import mark_stale
+from app.services.catalog_events import publish_catalog_event
+from app.services.pricing import PRICE_NAMESPACE, price_book
+from app.services.reference_data import get_active_company
+
+router = APIRouter()
+
+@router.post("/channels", response_model=SalesChannelSchema, status_code=status.HTTP_201_CREATED)
+async def create_sales_channel(
+    channel_in: SalesChannelCreate,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Create a new Sales Channel (e.g., dine-in, takeaway, a delivery app) for a company.
+    """
+    scope.company(channel_in.company_id)
+    if await get_active_company(db, channel_in.company_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with ID {channel_in.company_id} not found or is inactive."
+        )
+
+    existing_channel = await db.execute(
+        select(SalesChannelModel).where(
+            SalesChannelModel.company_id == channel_in.company_id,
+            SalesChannelModel.code == channel_in.code
+        )
+        # Unique constraint di DB juga mencakup baris yang sudah di-soft-delete
+        .execution_options(include_deleted=True)
+        .limit(1)
+    )
+    if existing_channel.scalar_one_or_none():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sales channel with this code already exists for this company."
+        )
+
+    db_channel = SalesChannelModel(**channel_in.model_dump())
+    db.add(db_channel)
+    await db.commit()
+    await db.refresh(db_channel)
+    return db_channel
+
+@router.get("/channels", response_model=List[SalesChannelSchema])
+async def read_sales_channels(
+    company_id: int,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Retrieve the Sales Channels of a company.
+    """
+    result = await db.execute(
+        select(SalesChannelModel)
+        .where(SalesChannelModel.company_id == scope.company(company_id))
+        .order_by(SalesChannelModel.id)
+    )
+    return result.scalars().all()
+
+@router.post("/prices", response_model=ProductChannelPriceSchema, status_code=status.HTTP_201_CREATED)
+async def create_channel_price(
+    price_in: ProductChannelPriceCreate,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Create a channel price override for a product.
+    Every worker's price book picks it up after commit through the cache bus.
+    Outlet staff can only create overrides for their own outlet.
+    """
+    scope.company(price_in.company_id)
+    # Tanpa outlet_id, kasir outlet membuat override untuk outletnya sendiri (bukan semua outlet)
+    price_in = price_in.model_copy(update={"outlet_id": scope.outlet(price_in.outlet_id)})
+    channel = await db.execute(
+        select(SalesChannelModel).where(
+            SalesChannelModel.id == price_in.sales_channel_id,
+            SalesChannelModel.company_id == price_in.company_id
+        )
+    )
+    if not channel.scalar_one_or_none():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sales channel with ID {price_in.sales_channel_id} not found for this company."
+        )
+
+    product = await db.execute(
+        select(ProductModel.id).where(
+            ProductModel.id == price_in.product_id,
+            ProductModel.company_id == price_in.company_id
+        )
+    )
+    if product.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {price_in.product_id} not found for this company."
+        )
+
+    db_price = ProductChannelPriceModel(**price_in.model_dump())
+    db.add(db_price)
+    mark_stale(db, PRICE_NAMESPACE, price_in.product_id)
+    publish_catalog_event(db, "price", price_in.company_id, price_in.product_id, outlet_id=price_in.outlet_id)
+    await db.commit()
+    await db.refresh(db_price)
+    return db_price
+
+@router.get("/prices", response_model=List[ProductChannelPriceSchema])
+async def read_channel_prices(
+    company_id: int,
+    product_id: Optional[int] = None,
+    sales_channel_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Retrieve channel price overrides of a company, optionally for one product or channel.
+    Outlet staff see the overrides of their outlet plus those valid for every outlet.
+    """
+    query = select(ProductChannelPriceModel).where(ProductChannelPriceModel.company_id == scope.company(company_id))
+    query = scope.apply(query, ProductChannelPriceModel, shared_outlet_rows=True)
+    if product_id is not None:
+        query = query.where(ProductChannelPriceModel.product_id == product_id)
+    if sales_channel_id is not None:
+        query = query.where(ProductChannelPriceModel.sales_channel_id == sales_channel_id)
+
+    result = await db.execute(query.order_by(ProductChannelPriceModel.id).offset(skip).limit(limit))
+    return result.scalars().all()
+
+@router.delete("/prices/{price_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_channel_price(
+    price_id: int,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Deactivate (soft delete) a channel price override.
+    """
+    # Override di luar scope pemanggil (termasuk yang berlaku untuk semua outlet) diperlakukan sebagai tidak ada
+    result = await db.execute(
+        scope.apply(
+            select(ProductChannelPriceModel).where(ProductChannelPriceModel.id == price_id),
+            ProductChannelPriceModel, shared_outlet_rows=False,
+        )
+    )
+    price = result.scalar_one_or_none()
+    if not price:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Channel price not found"
+        )
+
+    price.is_active = False
+    price.deleted_at = func.now()
+    mark_stale(db, PRICE_NAMESPACE, price.product_id)
+    publish_catalog_event(db, "price", price.company_id, price.product_id, outlet_id=price.outlet_id)
+    await db.commit()
+
+@router.post("/resolve", response_model=PriceResolveResponse)
+async def resolve_prices(
+    resolve_in: PriceResolveRequest,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Resolve effective prices for cart lines on a channel/outlet at a point in time.
+    Overrides come from the in-memory price book; base prices from the product cache,
+    with at most one query for products that are not cached.
+    """
+    company_id = scope.company(resolve_in.company_id)
+    outlet_id = scope.outlet(resolve_in.outlet_id) # Kasir outlet selalu mendapat harga outletnya
+    product_ids = list(dict.fromkeys(resolve_in.product_ids))
+    base_prices = {
+        product_id: product.base_price
+        for product_id, product in local_cache.get_many("product", product_ids).items()
+        if product.company_id == company_id
+    }
+
+    missing = [product_id for product_id in product_ids if product_id not in base_prices]
+    if missing:
+        result = await db.execute(
+            select(ProductModel.id, ProductModel.base_price).where(
+                ProductModel.company_id == company_id,
+                ProductModel.id == any_(literal(missing, ARRAY(Integer))),
+                ProductModel.deleted_at.is_(None),
+            )
+        )
+        base_prices.update({row.id: row.base_price for row in result})
+
+    results = []
+    for product_id in resolve_in.product_ids:
+        if product_id not in base_prices:
+            results.append(ResolvedPrice(product_id=product_id, found=False))
+            continue
+        rule = price_book.resolve(product_id, resolve_in.sales_channel_id, outlet_id, resolve_in.at)
+        if rule is not None:
+            results.append(ResolvedPrice(product_id=product_id, found=True, price=rule.price, source="channel", price_rule_id=rule.id))
+        else:
+            results.append(ResolvedPrice(product_id=product_id, found=True, price=base_prices[product_id], source="base"))
+
+    return PriceResolveResponse(price_book_version=price_book.version, results=results)
@@ -2,138 +2,393 @@
 
 from typing import List, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import Float, Integer, Numeric, String, any_, cast, func, literal, or_, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload # Penting untuk eager loading relasi
+from sqlalchemy.orm import joinedload # Penting untuk eager loading relasi
 
+from app.api.deps import Scope, get_scope
+from app.db import queries
 from app.db.connection import get_db
 from app.models.product import Product as ProductModel
-from app.models.company import Company as CompanyModel # Perlu diimpor untuk validasi
-from app.models.uom import UOM as UOMModel # Perlu diimpor untuk validasi
-from app.schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema
+from app.schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    Product as ProductSchema,
+    ProductBatchGetRequest,
+    ProductBatchGetItem,
+    ProductBatchGetResponse,
+    ProductBulkUpdateRequest,
+    ProductBulkUpdateResponse,
+)
+from app.core.cache import local_cache, MISSING
+from app.db.writes import insert_returning, update_returning
+from app.services.audit import record_update
+from app.services.cache_bus import mark_stale
+from app.services.catalog_events import publish_catalog_event
+from app.services.reference_data import get_active_company, get_active_uom, get_uom
 
 router = APIRouter()
 
+def _product_key(product_id: int, company_id: Optional[int]) -> list:
+    """
+    WHERE criteria for a single product.
+    products dipartisi per company_id; jika company_id diketahui, PostgreSQL hanya memindai satu partisi.
+    """
+    criteria = [ProductModel.id == product_id]
+    if company_id is not None:
+        criteria.append(ProductModel.company_id == company_id)
+    return criteria
+
+async def _get_product(db: AsyncSession, product_id: int, company_id: Optional[int], include_deleted: bool = False):
+    """
+    Load a single product (UOM eager loaded) with the pre-built statement from app/db/queries.py.
+    """
+    result = await db.execute(
+        queries.product_by_id(company_id is not None, include_deleted),
+        {"product_id": product_id, "company_id": company_id},
+    )
+    return result.scalar_one_or_none()
+
+def product_list_query(
+    company_id: Optional[int],
+    is_active: Optional[bool],
+    skip: int,
+    limit: int,
+    include_deleted: bool = False,
+):
+    """
+    Statement of read_products and its parameters, for EXPLAIN in app/db/plan_check.py.
+    Urutan (company_id, is_active, id) sesuai index parsial ix_products_company_active.
+    """
+    # Statement registry tidak bisa di-.params(): clone gagal pada opsi soft-delete yang sudah diterapkan
+    return queries.product_list(company_id, is_active, skip, limit, include_deleted)
+
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_in: ProductCreate,
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
 ):
     """
     Create a new Product.
     Requires company_id and stock_uom_id to be valid.
     """
-    # Validate company_id
-    company = await db.execute(
-        select(CompanyModel).where(CompanyModel.id == product_in.company_id, CompanyModel.is_active == True)
-    )
-    if not company.scalar_one_or_none():
+    scope.company(product_in.company_id)
+    # Validate company_id (dari snapshot reference data, tanpa query)
+    if await get_active_company(db, product_in.company_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Company with ID {product_in.company_id} not found or is inactive."
         )
 
-    # Validate stock_uom_id
-    uom = await db.execute(
-        select(UOMModel).where(UOMModel.id == product_in.stock_uom_id, UOMModel.is_active == True)
-    )
-    if not uom.scalar_one_or_none():
+    # Validate stock_uom_id (dari snapshot reference data; dipakai lagi untuk membangun respons)
+    stock_uom = await get_active_uom(db, product_in.stock_uom_id)
+    if stock_uom is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"UOM with ID {product_in.stock_uom_id} not found or is inactive."
         )
 
-    # Check for duplicate product name or SKU within the same company
+    # Check for duplicate product name or SKU within the same company (termasuk yang sudah di-soft-delete)
     existing_product = await db.execute(
-        select(ProductModel).where(
-            ProductModel.company_id == product_in.company_id,
-            (ProductModel.name == product_in.name) | (ProductModel.sku == product_in.sku)
-        )
+        queries.product_name_or_sku_taken(),
+        {"company_id": product_in.company_id, "name": product_in.name, "sku": product_in.sku},
     )
-    if existing_product.scalar_one_or_none():
+    if existing_product.first() is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Product with this name or SKU already exists for this company."
         )
 
-    db_product = ProductModel(**product_in.model_dump())
-    db.add(db_product)
+    # INSERT ... RETURNING: respons dibangun dari baris yang dikembalikan, tanpa refresh/re-select
+    row = await insert_returning(db, ProductModel, product_in.model_dump())
+    publish_catalog_event(db, "product", row["company_id"], row["id"])
     await db.commit()
-    await db.refresh(db_product)
-
-    # <--- MULAI PERUBAHAN DI SINI --->
-    # Query ulang untuk memuat relasi stock_uom dengan eager loading
-    # Ini akan memastikan objek db_product yang dikembalikan memiliki relasi stock_uom yang sudah dimuat
-    loaded_product_result = await db.execute(
-        select(ProductModel)
-        .options(selectinload(ProductModel.stock_uom))
-        .where(ProductModel.id == db_product.id)
-    )
-    loaded_product = loaded_product_result.scalar_one() # Gunakan scalar_one karena kita tahu pasti ada
-    # <--- AKHIR PERUBAHAN --->
-
-    return loaded_product
+    return ProductSchema.model_validate({**row, "stock_uom": stock_uom})
 
 @router.get("/", response_model=List[ProductSchema])
 async def read_products(
     db: AsyncSession = Depends(get_db),
     company_id: Optional[int] = None, # Filter by company_id
     is_active: Optional[bool] = None, # Filter by active status
+    include_deleted: bool = False, # Sertakan produk yang sudah di-soft-delete
     skip: int = 0,
     limit: int = 100,
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
 ):
     """
     Retrieve a list of Products, with optional filtering by company_id and active status.
+    Soft-deleted products are excluded unless include_deleted is set.
+    Callers bound to a company (token) only see that company's products.
     """
-    query = select(ProductModel).options(selectinload(ProductModel.stock_uom)) # Eager load UOM
-    
-    if company_id is not None:
-        query = query.where(ProductModel.company_id == company_id)
-    if is_active is not None:
-        query = query.where(ProductModel.is_active == is_active)
-
-    result = await db.execute(query.offset(skip).limit(limit))
+    statement, params = queries.product_list(scope.company(company_id), is_active, skip, limit, include_deleted)
+    result = await db.execute(statement, params)
     products = result.scalars().unique().all() # .unique() needed when using selectinload
     return products
 
+@router.post("/batch-get", response_model=ProductBatchGetResponse)
+async def batch_get_products(
+    batch_in: ProductBatchGetRequest,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Resolve many products by ID and/or SKU at once (basket or receipt hydration).
+    Cached products are served first; all misses are fetched with a single query.
+    Results follow request order (ids, then skus), with found=false for unknown or deleted keys.
+    """
+    company_id = scope.company(batch_in.company_id)
+    by_id = {}
+    by_sku = {}
+
+    # 1. Layani dari cache lokal
+    for product_id, product in local_cache.get_many("product", set(batch_in.ids)).items():
+        if company_id is None or product.company_id == company_id:
+            by_id[product_id] = product
+    for sku in set(batch_in.skus):
+        product_id = local_cache.get("product_sku", (company_id, sku))
+        product = local_cache.get("product", product_id) if product_id is not MISSING else MISSING
+        # Mapping SKU bisa basi jika SKU diganti; validasi terhadap produk yang di-cache
+        if product is not MISSING and product.sku == sku and product.company_id == company_id:
+            by_sku[sku] = product
+
+    # 2. Ambil semua yang belum ada dalam satu round trip (joinedload, bukan selectinload)
+    missing_ids = [i for i in set(batch_in.ids) if i not in by_id]
+    missing_skus = [k for k in set(batch_in.skus) if k not in by_sku]
+    if missing_ids or missing_skus:
+        criteria = []
+        if missing_ids:
+            criteria.append(ProductModel.id == any_(literal(missing_ids, ARRAY(Integer))))
+        if missing_skus:
+            criteria.append(ProductModel.sku == any_(literal(missing_skus, ARRAY(String))))
+        query = select(ProductModel).options(joinedload(ProductModel.stock_uom)).where(or_(*criteria))
+        if company_id is not None:
+            query = query.where(ProductModel.company_id == company_id)
+
+        result = await db.execute(query)
+        for product in result.scalars().unique().all():
+            product_out = ProductSchema.model_validate(product)
+            local_cache.set("product", product.id, product_out)
+            local_cache.set("product_sku", (product.company_id, product.sku), product.id)
+            if product.id in missing_ids:
+                by_id[product.id] = product_out
+            if product.sku in missing_skus:
+                by_sku[product.sku] = product_out
+
+    results = [
+        ProductBatchGetItem(id=product_id, found=product_id in by_id, product=by_id.get(product_id))
+        for product_id in batch_in.ids
+    ]
+    results += [
+        ProductBatchGetItem(sku=sku, found=sku in by_sku, product=by_sku.get(sku))
+        for sku in batch_in.skus
+    ]
+    return ProductBatchGetResponse(results=results)
+
+# Satu statement set-based per jenis kunci; unnest() membuat parameter tetap 7 berapa pun jumlah barisnya
+_BULK_UPDATE_SQL = """
+    UPDATE products AS p SET
+        base_price = COALESCE(v.base_price, p.base_price),
+        is_active = COALESCE(v.is_active, p.is_active),
+        description = COALESCE(v.description, p.description),
+        image_url = COALESCE(v.image_url, p.image_url),
+        updated_at = now()
+    FROM unnest(
+        CAST(:keys AS {key_type}[]),
+        CAST(:base_prices AS double precision[]),
+        CAST(:is_actives AS boolean[]),
+        CAST(:descriptions AS varchar[]),
+        CAST(:image_urls AS varchar[])
+    ) AS v(key, base_price, is_active, description, image_url)
+    , products AS o -- Baris sebelum UPDATE (snapshot statement), untuk nilai lama di audit log
+    WHERE p.company_id = :company_id
+      AND p.deleted_at IS NULL
+      AND p.{key_column} = v.key
+      AND o.company_id = :company_id
+      AND o.id = p.id
+    RETURNING p.id, p.{key_column},
+        o.base_price, p.base_price, o.is_active, p.is_active,
+        o.description, p.description, o.image_url, p.image_url
+"""
+_BULK_AUDIT_FIELDS = ("base_price", "is_active", "description", "image_url")
+_BULK_UPDATE_BY_ID = text(_BULK_UPDATE_SQL.format(key_type="integer", key_column="id"))
+_BULK_UPDATE_BY_SKU = text(_BULK_UPDATE_SQL.format(key_type="varchar", key_column="sku"))
+
+@router.post("/bulk-update", response_model=ProductBulkUpdateResponse)
+async def bulk_update_products(
+    bulk_in: ProductBulkUpdateRequest,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Update many products of one company in a single transaction.
+    Either a list of (id or sku, fields) items, where null fields are left unchanged,
+    or a price rule (multiplier/delta with optional filters). Cache invalidations are
+    published in bulk on commit.
+    """
+    company_id = scope.company(bulk_in.company_id)
+    updated_ids = []
+    not_found_ids, not_found_skus = [], []
+
+    if bulk_in.rule is not None:
+        rule = bulk_in.rule
+        products = ProductModel.__table__
+        old = products.alias("o") # Baris sebelum UPDATE, untuk harga lama di audit log
+        new_price = cast(
+            func.round(cast(products.c.base_price * rule.price_multiplier + rule.price_delta, Numeric), rule.round_to),
+            Float,
+        )
+        query = (
+            update(products)
+            .where(
+                products.c.company_id == company_id,
+                products.c.deleted_at.is_(None),
+                new_price > 0, # Harga tersimpan (setelah pembulatan) harus tetap > 0, sama dengan validasi ProductUpdate
+                old.c.company_id == company_id,
+                old.c.id == products.c.id,
+            )
+            .values(
+                base_price=new_price,
+                updated_at=func.now(),
+            )
+            .returning(products.c.id, old.c.base_price, products.c.base_price)
+        )
+        if rule.is_active is not None:
+            query = query.where(products.c.is_active == rule.is_active)
+        if rule.sku_prefix:
+            query = query.where(products.c.sku.startswith(rule.sku_prefix, autoescape=True))
+        if rule.product_ids:
+            query = query.where(products.c.id == any_(literal(rule.product_ids, ARRAY(Integer))))
+        result = await db.execute(query)
+        for product_id, old_price, stored_price in result:
+            updated_ids.append(product_id)
+            record_update(
+                db, ProductModel, {"base_price": old_price},
+                {"id": product_id, "company_id": company_id, "base_price": stored_price},
+            )
+    else:
+        for statement, key_field, not_found in (
+            (_BULK_UPDATE_BY_ID, "id", not_found_ids),
+            (_BULK_UPDATE_BY_SKU, "sku", not_found_skus),
+        ):
+            rows = [item for item in bulk_in.items if getattr(item, key_field) is not None]
+            if not rows:
+                continue
+            result = await db.execute(statement, {
+                "company_id": company_id,
+                "keys": [getattr(item, key_field) for item in rows],
+                "base_prices": [item.base_price for item in rows],
+                "is_actives": [item.is_active for item in rows],
+                "descriptions": [item.description for item in rows],
+                "image_urls": [item.image_url for item in rows],
+            })
+            matched = result.all()
+            updated_ids.extend(row[0] for row in matched)
+            seen = {row[1] for row in matched}
+            for row in matched:
+                # Kolom RETURNING: id, kunci, lalu pasangan (lama, baru) per field
+                before = dict(zip(_BULK_AUDIT_FIELDS, row[2::2]))
+                after = dict(zip(_BULK_AUDIT_FIELDS, row[3::2]), id=row[0], company_id=company_id)
+                record_update(db, ProductModel, before, after)
+            not_found.extend(dict.fromkeys(getattr(item, key_field) for item in rows if getattr(item, key_field) not in seen))
+
+    if updated_ids:
+        mark_stale(db, "product", *updated_ids)
+        publish_catalog_event(db, "product", company_id, *updated_ids)
+    await db.commit()
+
+    return ProductBulkUpdateResponse(
+        updated=len(set(updated_ids)),
+        not_found_ids=not_found_ids,
+        not_found_skus=not_found_skus,
+    )
+
+@router.get("/lookup", response_model=ProductSchema)
+async def lookup_product(
+    company_id: int,
+    sku: Optional[str] = None,
+    barcode: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Find a live product of a company by SKU or barcode (e.g. a barcode scanned at the till).
+    Exactly one of sku and barcode must be given.
+    """
+    company_id = scope.company(company_id)
+    if (sku is None) == (barcode is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of sku or barcode."
+        )
+    if sku is not None:
+        result = await db.execute(queries.product_by_sku(), {"company_id": company_id, "sku": sku})
+    else:
+        result = await db.execute(queries.product_by_barcode(), {"company_id": company_id, "barcode": barcode})
+    product = result.scalar_one_or_none()
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    product_out = ProductSchema.model_validate(product)
+    local_cache.set("product", product.id, product_out)
+    return product_out
+
 @router.get("/{product_id}", response_model=ProductSchema)
 async def read_product_by_id(
     product_id: int,
+    company_id: Optional[int] = None, # Kunci partisi, agar partition pruning berlaku
+    include_deleted: bool = False, # Izinkan mengambil produk yang sudah di-soft-delete
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
 ):
     """
     Retrieve a single Product by its ID.
+    Served from the local cache when possible; entries are evicted by the cache bus on writes.
     """
-    result = await db.execute(
-        select(ProductModel)
-        .options(selectinload(ProductModel.stock_uom)) # Eager load UOM
-        .where(ProductModel.id == product_id)
-    )
-    product = result.scalar_one_or_none()
+    company_id = scope.company(company_id) # Produk company lain tidak akan ditemukan
+    # Cache hanya berisi produk yang masih hidup
+    cached = local_cache.get("product", product_id)
+    if cached is not MISSING and (company_id is None or cached.company_id == company_id):
+        return cached
+
+    product = await _get_product(db, product_id, company_id, include_deleted)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return product
+    product_out = ProductSchema.model_validate(product)
+    if product.deleted_at is None:
+        local_cache.set("product", product_id, product_out)
+    return product_out
 
 @router.put("/{product_id}", response_model=ProductSchema)
 async def update_product(
     product_id: int,
     product_in: ProductUpdate,
+    company_id: Optional[int] = None, # Kunci partisi (company saat ini), agar partition pruning berlaku
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
 ):
     """
     Update an existing Product.
     """
+    scope.company(product_in.company_id) # Tidak boleh memindahkan produk ke company lain
+    # UOM produk diambil dari snapshot reference data, jadi tidak perlu eager load di sini.
+    # Produk di luar scope pemanggil diperlakukan sebagai tidak ada
     result = await db.execute(
-        select(ProductModel)
-        .options(selectinload(ProductModel.stock_uom)) # Eager load UOM
-        .where(ProductModel.id == product_id)
+        scope.apply(select(ProductModel).where(*_product_key(product_id, company_id)), ProductModel)
     )
     product = result.scalar_one_or_none()
     if not product:
@@ -144,10 +399,7 @@ async def update_product(
 
     # Validate company_id if provided and changed
     if product_in.company_id is not None and product_in.company_id != product.company_id:
-        company = await db.execute(
-            select(CompanyModel).where(CompanyModel.id == product_in.company_id, CompanyModel.is_active == True)
-        )
-        if not company.scalar_one_or_none():
+        if await get_active_company(db, product_in.company_id) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Company with ID {product_in.company_id} not found or is inactive."
@@ -155,10 +407,7 @@ async def update_product(
 
     # Validate stock_uom_id if provided and changed
     if product_in.stock_uom_id is not None and product_in.stock_uom_id != product.stock_uom_id:
-        uom = await db.execute(
-            select(UOMModel).where(UOMModel.id == product_in.stock_uom_id, UOMModel.is_active == True)
-        )
-        if not uom.scalar_one_or_none():
+        if await get_active_uom(db, product_in.stock_uom_id) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"UOM with ID {product_in.stock_uom_id} not found or is inactive."
@@ -167,13 +416,10 @@ async def update_product(
     # Check for duplicate name or SKU within the same company, excluding current product
     if product_in.name is not None and product_in.name != product.name:
         existing_name = await db.execute(
-            select(ProductModel).where(
-                ProductModel.company_id == product.company_id,
-                ProductModel.name == product_in.name,
-                ProductModel.id != product_id
-            )
+            queries.product_name_taken(),
+            {"company_id": product.company_id, "name": product_in.name, "product_id": product_id},
         )
-        if existing_name.scalar_one_or_none():
+        if existing_name.first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Product with this name already exists for this company."
@@ -181,37 +427,46 @@ async def update_product(
 
     if product_in.sku is not None and product_in.sku != product.sku:
         existing_sku = await db.execute(
-            select(ProductModel).where(
-                ProductModel.company_id == product.company_id,
-                ProductModel.sku == product_in.sku,
-                ProductModel.id != product_id
-            )
+            queries.product_sku_taken(),
+            {"company_id": product.company_id, "sku": product_in.sku, "product_id": product_id},
         )
-        if existing_sku.scalar_one_or_none():
+        if existing_sku.first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Product with this SKU already exists for this company."
             )
 
-    # Update attributes that are provided in the request
-    for field, value in product_in.model_dump(exclude_unset=True).items():
-        setattr(product, field, value)
+    # Update attributes that are provided in the request (UPDATE ... RETURNING, tanpa refresh)
+    row = await update_returning(
+        db,
+        ProductModel,
+        [ProductModel.id == product_id, ProductModel.company_id == product.company_id],
+        product_in.model_dump(exclude_unset=True),
+        before=product,
+    )
+    stock_uom = await get_uom(db, row["stock_uom_id"])
 
+    mark_stale(db, "product", product_id)
+    publish_catalog_event(db, "product", product.company_id, product_id)
+    if row["company_id"] != product.company_id: # Pindah company: kedua pihak perlu tahu
+        publish_catalog_event(db, "product", row["company_id"], product_id)
     await db.commit()
-    await db.refresh(product)
-    return product
+    return ProductSchema.model_validate({**row, "stock_uom": stock_uom})
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: int,
+    company_id: Optional[int] = None, # Kunci partisi, agar partition pruning berlaku
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
 ):
     """
     Deactivate (soft delete) a Product.
     """
+    # Produk di luar scope pemanggil diperlakukan sebagai tidak ada
     result = await db.execute(
-        select(ProductModel).where(ProductModel.id == product_id)
+        scope.apply(select(ProductModel).where(*_product_key(product_id, company_id)), ProductModel)
     )
     product = result.scalar_one_or_none()
     if not product:
@@ -222,5 +477,7 @@ async def delete_product(
 
     product.is_active = False
     product.deleted_at = func.now()
+    mark_stale(db, "product", product_id)
+    publish_catalog_event(db, "product", product.company_id, product_id)
     await db.commit()
     return {"message": "Product deactivated successfully"}
\ No newline at end of file
@@ -0,0 +1,96 @@
+# app/api/v1/endpoints/receipts.py
+
+import base64
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from app.api.deps import Scope, get_scope
+from app.schemas.receipt import ReceiptFormat, ReceiptRenderRequest, ReprintRequest, ReprintResult
+from app.services.receipts import ReceiptError, RenderedReceipt, receipt_renderer
+
+router = APIRouter()
+
+def _receipt_response(rendered: RenderedReceipt) -> Response:
+    return Response(
+        content=rendered.content,
+        media_type=rendered.media_type,
+        headers={
+            "X-Receipt-Hash": rendered.content_hash,
+            "X-Receipt-Cache": "hit" if rendered.cached else "miss",
+        },
+    )
+
+@router.post("/render")
+async def render_receipt(
+    render_in: ReceiptRenderRequest,
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Render a receipt at checkout: ESC/POS bytes for the thermal printer, a PDF
+    for email, or plain text. The receipt is remembered for reprints by its
+    transaction_id; rendering the same content again is served from cache.
+    """
+    scope.company(render_in.receipt.company_id)
+    try:
+        rendered = await receipt_renderer.render(
+            render_in.receipt.model_dump(mode="json"), render_in.format, render_in.template
+        )
+    except ReceiptError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return _receipt_response(rendered)
+
+@router.post("/reprint", response_model=List[ReprintResult])
+async def reprint_receipts(
+    reprint_in: ReprintRequest,
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Batch reprint by transaction id (e.g. end-of-day or after a printer jam),
+    results in request order. Reprints use their own, smaller share of the
+    render processes, so a large batch does not delay checkout.
+    """
+    company_id = scope.company(reprint_in.company_id)
+    results = await receipt_renderer.reprint(
+        company_id, [(item.transaction_id, item.format, item.template) for item in reprint_in.items]
+    )
+    return [
+        ReprintResult(
+            transaction_id=transaction_id,
+            format=fmt,
+            status=error or "ok",
+            content_hash=rendered.content_hash if rendered else None,
+            cached=rendered.cached if rendered else False,
+            content_base64=base64.b64encode(rendered.content).decode("ascii") if rendered else None,
+        )
+        for transaction_id, fmt, rendered, error in results
+    ]
+
+@router.get("/renderer")
+async def read_renderer_stats(
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+) -> Dict[str, Any]:
+    """Render throughput, queue waits (checkout vs reprint) and cache usage of this worker."""
+    return receipt_renderer.stats()
+
+@router.get("/{transaction_id}")
+async def reprint_receipt(
+    transaction_id: str,
+    company_id: int,
+    format: ReceiptFormat = "escpos",
+    template: Optional[str] = None,
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """Reprint a single receipt rendered earlier by this worker."""
+    company_id = scope.company(company_id)
+    [(_, _, rendered, error)] = await receipt_renderer.reprint(company_id, [(transaction_id, format, template)])
+    if error == "not_found":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Receipt for transaction {transaction_id} not found."
+        )
+    if error is not None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Receipt could not be rendered.")
+    return _receipt_response(rendered)
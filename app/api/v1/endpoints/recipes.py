@@ -0,0 +1,282 @@
+# app/api/v1/endpoints/recipes.py
+
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import Integer, any_, delete, insert, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.api.deps import Scope, get_scope
+from app.db import queries
+from app.db.connection import get_db
+from app.models.product import Product as ProductModel
+from app.models.product_uom_conversion import ProductUOMConversion as ProductUOMConversionModel
+from app.models.recipe_material import RecipeMaterial as RecipeMaterialModel
+from app.schemas.recipe import (
+    BasketExplosionRequest,
+    Explosion,
+    MaterialQuantity,
+    ProductUOMConversionCreate,
+    ProductUOMConversion as ProductUOMConversionSchema,
+    Recipe,
+    RecipeMaterial as RecipeMaterialSchema,
+    RecipeUpdate,
+)
+from app.services.cache_bus import mark_stale
+from app.services import recipes as recipe_service
+from app.services.recipes import RECIPE_NAMESPACE, RecipeError, recipe_book
+from app.services.reference_data import get_active_uom
+
+router = APIRouter()
+
+async def _get_live_product(db: AsyncSession, company_id: int, product_id: int) -> ProductModel:
+    result = await db.execute(queries.product_by_id(True), {"product_id": product_id, "company_id": company_id})
+    product = result.scalar_one_or_none()
+    if product is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {product_id} not found for company {company_id}."
+        )
+    return product
+
+def _explosion(explosion: recipe_service.Explosion) -> Explosion:
+    return Explosion(
+        company_id=explosion.company_id,
+        materials=[
+            MaterialQuantity(product_id=material_id, quantity=quantity, uom_id=explosion.stock_uoms[material_id])
+            for material_id, quantity in sorted(explosion.materials.items())
+        ],
+    )
+
+# --- UOM conversions ---
+
+@router.get("/conversions", response_model=List[ProductUOMConversionSchema])
+async def read_uom_conversions(
+    company_id: int,
+    product_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Retrieve the UOM conversions of a company, optionally for one product.
+    """
+    query = select(ProductUOMConversionModel).where(ProductUOMConversionModel.company_id == scope.company(company_id))
+    if product_id is not None:
+        query = query.where(ProductUOMConversionModel.product_id == product_id)
+    result = await db.execute(query.order_by(ProductUOMConversionModel.product_id, ProductUOMConversionModel.uom_id))
+    return result.scalars().all()
+
+@router.put("/conversions", response_model=ProductUOMConversionSchema)
+async def upsert_uom_conversion(
+    conversion_in: ProductUOMConversionCreate,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Create or update how many stock units of a product one UOM is.
+    """
+    scope.company(conversion_in.company_id)
+    product = await _get_live_product(db, conversion_in.company_id, conversion_in.product_id)
+    if await get_active_uom(db, conversion_in.uom_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"UOM with ID {conversion_in.uom_id} not found or is inactive."
+        )
+    if conversion_in.uom_id == product.stock_uom_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The stock UOM of a product needs no conversion."
+        )
+
+    result = await db.execute(
+        select(ProductUOMConversionModel).where(
+            ProductUOMConversionModel.company_id == conversion_in.company_id,
+            ProductUOMConversionModel.product_id == conversion_in.product_id,
+            ProductUOMConversionModel.uom_id == conversion_in.uom_id,
+        )
+    )
+    conversion = result.scalar_one_or_none()
+    if conversion is None:
+        conversion = ProductUOMConversionModel(**conversion_in.model_dump())
+        db.add(conversion)
+    else:
+        conversion.factor = conversion_in.factor
+
+    # Resep yang memakai produk ini ikut dihitung ulang (dependensi terbalik)
+    mark_stale(db, RECIPE_NAMESPACE, conversion_in.product_id)
+    await db.commit()
+    await db.refresh(conversion)
+    return conversion
+
+@router.delete("/conversions/{conversion_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_uom_conversion(
+    conversion_id: int,
+    company_id: int,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Delete a UOM conversion. Recipes that still need it fail to explode until it is replaced.
+    """
+    result = await db.execute(
+        select(ProductUOMConversionModel).where(
+            ProductUOMConversionModel.id == conversion_id,
+            ProductUOMConversionModel.company_id == scope.company(company_id),
+        )
+    )
+    conversion = result.scalar_one_or_none()
+    if conversion is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="UOM conversion not found")
+
+    await db.delete(conversion)
+    mark_stale(db, RECIPE_NAMESPACE, conversion.product_id)
+    await db.commit()
+
+# --- Explosion ---
+
+@router.post("/explode", response_model=Explosion)
+async def explode_basket(
+    basket_in: BasketExplosionRequest,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Total raw materials (in their stock UOM) a basket consumes, through all
+    levels of sub-recipes; the amounts to deduct from stock at checkout.
+    The whole basket is exploded in one computation, mostly from memory.
+    """
+    company_id = scope.company(basket_in.company_id)
+    items: Dict[int, float] = {}
+    for item in basket_in.items:
+        items[item.product_id] = items.get(item.product_id, 0.0) + item.quantity
+    try:
+        explosion = await recipe_book.explode_basket(db, company_id, items)
+    except RecipeError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return _explosion(explosion)
+
+@router.get("/engine")
+async def read_recipe_engine_stats(
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+) -> Dict[str, Any]:
+    """Memoized explosions and hit/miss counters of this worker."""
+    return recipe_book.stats()
+
+# --- Recipes ---
+
+@router.get("/{product_id}", response_model=Recipe)
+async def read_recipe(
+    product_id: int,
+    company_id: int,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Retrieve the direct materials of a product (one level; see /explosion for raw materials).
+    """
+    company_id = scope.company(company_id)
+    result = await db.execute(
+        select(RecipeMaterialModel)
+        .where(RecipeMaterialModel.company_id == company_id, RecipeMaterialModel.product_id == product_id)
+        .order_by(RecipeMaterialModel.id)
+    )
+    return Recipe(
+        company_id=company_id,
+        product_id=product_id,
+        materials=[RecipeMaterialSchema.model_validate(row) for row in result.scalars().all()],
+    )
+
+@router.put("/{product_id}", response_model=Recipe)
+async def replace_recipe(
+    product_id: int,
+    recipe_in: RecipeUpdate,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Replace the recipe of a product as a whole. Rejected when it would create
+    a cycle or needs a UOM conversion that does not exist.
+    """
+    company_id = scope.company(recipe_in.company_id)
+    await _get_live_product(db, company_id, product_id)
+
+    material_ids = [material.material_product_id for material in recipe_in.materials]
+    if product_id in material_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A product cannot be its own material.")
+    if material_ids:
+        result = await db.execute(
+            select(ProductModel.id).where(
+                ProductModel.company_id == company_id,
+                ProductModel.id == any_(literal(material_ids, ARRAY(Integer))),
+            )
+        )
+        unknown = set(material_ids) - set(result.scalars().all())
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Material product(s) {sorted(unknown)} not found for company {company_id}."
+            )
+    for uom_id in {material.uom_id for material in recipe_in.materials}:
+        if await get_active_uom(db, uom_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"UOM with ID {uom_id} not found or is inactive."
+            )
+
+    await db.execute(
+        delete(RecipeMaterialModel).where(
+            RecipeMaterialModel.company_id == company_id, RecipeMaterialModel.product_id == product_id
+        )
+    )
+    rows = []
+    if recipe_in.materials:
+        # Satu INSERT multi-row; RETURNING memberi id dan timestamp tanpa refresh per baris
+        result = await db.execute(
+            insert(RecipeMaterialModel.__table__)
+            .values([
+                {"company_id": company_id, "product_id": product_id, **material.model_dump()}
+                for material in recipe_in.materials
+            ])
+            .returning(*RecipeMaterialModel.__table__.c)
+        )
+        rows = result.mappings().all()
+
+    # Validasi di dalam transaksi, tanpa memo: siklus lewat sub-resep dan konversi UOM yang hilang
+    try:
+        await recipe_book.explode_many(db, company_id, [product_id], use_memo=False)
+    except RecipeError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+    mark_stale(db, RECIPE_NAMESPACE, product_id)
+    await db.commit()
+    return Recipe(
+        company_id=company_id,
+        product_id=product_id,
+        materials=[RecipeMaterialSchema.model_validate(row) for row in rows],
+    )
+
+@router.get("/{product_id}/explosion", response_model=Explosion)
+async def read_explosion(
+    product_id: int,
+    company_id: int,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Raw materials (in their stock UOM) consumed by one stock unit of the product.
+    """
+    company_id = scope.company(company_id)
+    try:
+        explosion = await recipe_book.explode(db, company_id, product_id)
+    except RecipeError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return _explosion(explosion)
@@ -0,0 +1,38 @@
+# app/api/v1/endpoints/scheduler.py
+
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.connection import get_db
+from app.models.scheduler_lease import SchedulerLease as SchedulerLeaseModel
+from app.services.scheduler import scheduler
+
+router = APIRouter()
+
+@router.get("/jobs")
+async def read_scheduler_jobs(
+    db: AsyncSession = Depends(get_db),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+) -> Dict[str, Any]:
+    """
+    Metrics of the periodic jobs on this worker, plus the cluster-wide lease
+    state (owner, next run, last outcome) of the exclusive jobs.
+    """
+    result = await db.execute(select(SchedulerLeaseModel).order_by(SchedulerLeaseModel.job_name))
+    leases = {
+        lease.job_name: {
+            "owner": lease.owner,
+            "lease_until": lease.lease_until,
+            "next_run_at": lease.next_run_at,
+            "last_started_at": lease.last_started_at,
+            "last_finished_at": lease.last_finished_at,
+            "last_status": lease.last_status,
+            "last_error": lease.last_error,
+            "last_duration_seconds": lease.last_duration_seconds,
+            "run_count": lease.run_count,
+        }
+        for lease in result.scalars().all()
+    }
+    return {"worker": scheduler.owner, "jobs": scheduler.stats(), "leases": leases}
@@ -0,0 +1,175 @@
+# app/api/v1/endpoints/terminals.py
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.api.deps import Scope, get_scope
+from app.core.security import generate_pin_key, generate_terminal_secret, hash_terminal_secret
+from app.db.connection import get_db
+from app.models.outlet import Outlet as OutletModel
+from app.models.terminal import Terminal as TerminalModel, TerminalUserPin as TerminalUserPinModel
+from app.models.user import User as UserModel
+from app.schemas.terminal import (
+    TerminalCreate,
+    Terminal as TerminalSchema,
+    TerminalRegistered,
+    TerminalPinSet,
+    TerminalRoster as TerminalRosterSchema,
+    RosterUser,
+)
+from app.services.cache_bus import mark_stale
+from app.services.reference_data import get_active_company
+from app.services.terminals import ROSTER_NAMESPACE, PinLoginError, authenticate_terminal, pin_digest_for
+
+router = APIRouter()
+
+async def _get_terminal(db: AsyncSession, terminal_id: int, scope: Scope) -> TerminalModel:
+    result = await db.execute(scope.apply(select(TerminalModel).where(TerminalModel.id == terminal_id), TerminalModel))
+    terminal = result.scalar_one_or_none()
+    if terminal is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Terminal not found")
+    return terminal
+
+@router.post("/", response_model=TerminalRegistered, status_code=status.HTTP_201_CREATED)
+async def register_terminal(
+    terminal_in: TerminalCreate,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Register a POS terminal for an outlet.
+    The returned terminal_secret is shown only once; the terminal sends it with every PIN login.
+    """
+    scope.company(terminal_in.company_id)
+    scope.outlet(terminal_in.outlet_id)
+    if await get_active_company(db, terminal_in.company_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Company with ID {terminal_in.company_id} not found or is inactive."
+        )
+    outlet = await db.execute(
+        select(OutletModel.id).where(
+            OutletModel.id == terminal_in.outlet_id,
+            OutletModel.company_id == terminal_in.company_id,
+            OutletModel.is_active == True,
+        )
+    )
+    if outlet.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Outlet with ID {terminal_in.outlet_id} not found for this company or is inactive."
+        )
+
+    terminal_secret = generate_terminal_secret()
+    db_terminal = TerminalModel(
+        **terminal_in.model_dump(),
+        secret_hash=hash_terminal_secret(terminal_secret),
+        pin_key=generate_pin_key(),
+    )
+    db.add(db_terminal)
+    await db.flush()
+    # ID ini mungkin pernah di-cache sebagai "tidak dikenal"
+    mark_stale(db, ROSTER_NAMESPACE, db_terminal.id)
+    await db.commit()
+    await db.refresh(db_terminal)
+    return TerminalRegistered.model_validate({
+        **TerminalSchema.model_validate(db_terminal).model_dump(),
+        "terminal_secret": terminal_secret,
+    })
+
+@router.get("/", response_model=List[TerminalSchema])
+async def read_terminals(
+    company_id: Optional[int] = None,
+    outlet_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Retrieve the terminals of a company or outlet.
+    """
+    query = select(TerminalModel)
+    company_id, outlet_id = scope.company(company_id), scope.outlet(outlet_id)
+    if company_id is not None:
+        query = query.where(TerminalModel.company_id == company_id)
+    if outlet_id is not None:
+        query = query.where(TerminalModel.outlet_id == outlet_id)
+    result = await db.execute(query.order_by(TerminalModel.id))
+    return result.scalars().all()
+
+@router.put("/{terminal_id}/pins/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def set_terminal_pin(
+    terminal_id: int,
+    user_id: int,
+    pin_in: TerminalPinSet,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Enroll a cashier on a terminal (or change their PIN there).
+    The cashier must belong to the terminal's company.
+    """
+    terminal = await _get_terminal(db, terminal_id, scope)
+    user = await db.execute(
+        select(UserModel.id).where(UserModel.id == user_id, UserModel.company_id == terminal.company_id)
+    )
+    if user.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with ID {user_id} not found in the terminal's company."
+        )
+
+    digest = pin_digest_for(terminal, user_id, pin_in.pin)
+    statement = pg_insert(TerminalUserPinModel).values(terminal_id=terminal_id, user_id=user_id, pin_digest=digest)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[TerminalUserPinModel.terminal_id, TerminalUserPinModel.user_id],
+        set_={"pin_digest": statement.excluded.pin_digest, "updated_at": func.now()},
+    ))
+    mark_stale(db, ROSTER_NAMESPACE, terminal_id)
+    await db.commit()
+
+@router.delete("/{terminal_id}/pins/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_terminal_pin(
+    terminal_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
+    # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
+):
+    """
+    Remove a cashier from a terminal.
+    """
+    await _get_terminal(db, terminal_id, scope)
+    pin = await db.get(TerminalUserPinModel, (terminal_id, user_id))
+    if pin is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cashier is not enrolled on this terminal")
+    await db.delete(pin)
+    mark_stale(db, ROSTER_NAMESPACE, terminal_id)
+    await db.commit()
+
+@router.get("/{terminal_id}/roster", response_model=TerminalRosterSchema)
+async def read_terminal_roster(
+    terminal_id: int,
+    x_terminal_secret: str = Header(...),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Cashiers enrolled on this terminal, for the cashier-switch screen.
+    Called by the terminal itself (X-Terminal-Secret); served from the roster cache.
+    """
+    try:
+        roster = await authenticate_terminal(db, terminal_id, x_terminal_secret)
+    except PinLoginError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown terminal or wrong terminal secret")
+    users = sorted(roster.users.values(), key=lambda entry: entry.username)
+    return TerminalRosterSchema(
+        terminal_id=roster.terminal_id,
+        outlet_id=roster.outlet_id,
+        users=[RosterUser(user_id=e.user_id, username=e.username, full_name=e.full_name) for e in users],
+    )
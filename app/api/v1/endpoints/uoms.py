@@ -1,13 +1,17 @@
 # app/api/v1/endpoints/uoms.py
 
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.db.connection import get_db
 from app.models.uom import UOM as UOMModel # Alias untuk menghindari konflik nama
 from app.schemas.uom import UOMCreate, UOMUpdate, UOM as UOMSchema # Alias untuk skema output
+from app.db.writes import insert_returning
+from app.services.cache_bus import mark_stale
+from app.services.catalog_events import publish_catalog_event
+from app.services.reference_data import get_uom, reference_data
 # from app.core.security import get_current_active_user # Akan kita tambahkan nanti untuk otentikasi
 
 router = APIRouter()
@@ -26,6 +30,9 @@ async def create_uom(
         select(UOMModel).where(
             (UOMModel.name == uom_in.name) | (UOMModel.symbol == uom_in.symbol)
         )
+        # Unique constraint di DB juga mencakup baris yang sudah di-soft-delete
+        .execution_options(include_deleted=True)
+        .limit(1)
     )
     if existing_uom.scalar_one_or_none():
         raise HTTPException(
@@ -33,27 +40,31 @@ async def create_uom(
             detail="UOM with this name or symbol already exists."
         )
 
-    db_uom = UOMModel(**uom_in.model_dump())
-    db.add(db_uom)
+    # INSERT ... RETURNING: respons dibangun dari baris yang dikembalikan, tanpa refresh
+    row = await insert_returning(db, UOMModel, uom_in.model_dump())
+    mark_stale(db, "uom") # Snapshot reference data di semua worker dimuat ulang
+    publish_catalog_event(db, "uom", None, row["id"]) # UOM global: semua company
     await db.commit()
-    await db.refresh(db_uom)
-    return db_uom
+    return UOMSchema.model_validate(row)
 
 @router.get("/", response_model=List[UOMSchema])
 async def read_uoms(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    include_deleted: bool = False, # Sertakan UOM yang sudah di-soft-delete
     skip: int = 0,
     limit: int = 100,
     # current_user: Any = Depends(get_current_active_user) # Aktifkan ini nanti
 ):
     """
     Retrieve a list of all Units of Measure (UOMs).
+    Soft-deleted UOMs are excluded unless include_deleted is set.
+    Served from the in-memory reference data snapshot; no database access.
     """
-    result = await db.execute(
-        select(UOMModel).offset(skip).limit(limit)
-    )
-    uoms = result.scalars().all()
-    return uoms
+    snapshot = reference_data.snapshot
+    uoms = snapshot.uom_list if include_deleted else [uom for uom in snapshot.uom_list if uom.deleted_at is None]
+    # Versi snapshot berubah setiap ada penulisan UOM, jadi aman dipakai sebagai ETag
+    response.headers["ETag"] = f'"uoms-{snapshot.version}-{int(include_deleted)}-{skip}-{limit}"'
+    return uoms[skip:skip + limit]
 
 @router.get("/{uom_id}", response_model=UOMSchema)
 async def read_uom_by_id(
@@ -64,13 +75,10 @@ async def read_uom_by_id(
     """
     Retrieve a single Unit of Measure (UOM) by its ID.
     """
-    result = await db.execute(
-        select(UOMModel).where(UOMModel.id == uom_id)
-    )
-    uom = result.scalar_one_or_none()
-    if not uom:
+    uom = await get_uom(db, uom_id)
+    if uom is None or uom.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="UOM not found"
         )
-    return uom
\ No newline at end of file
+    return uom
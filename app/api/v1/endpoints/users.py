@@ -1,16 +1,22 @@
 # app/api/v1/endpoints/users.py
 
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from passlib.context import CryptContext # Untuk hashing password
 
+from app.api.deps import Scope, get_scope
+from app.db import queries
 from app.db.connection import get_db
+from app.models.outlet import Outlet as OutletModel
 from app.models.user import User as UserModel
-from app.models.company import Company as CompanyModel # Untuk validasi company_id
 from app.schemas.user import UserCreate, UserUpdate, User as UserSchema
+from app.db.writes import insert_returning, update_returning
+from app.services.cache_bus import mark_stale
+from app.services.reference_data import get_active_company, get_company
 
 router = APIRouter()
 
@@ -20,10 +26,76 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _check_assignable(
+    scope: Scope, company_id: Optional[int], outlet_id: Optional[int], is_superuser: Optional[bool]
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    A caller bound to a company may only assign users to that company, one
+    bound to an outlet only to that outlet, and neither may grant superuser.
+    Returns the effective (company_id, outlet_id).
+    """
+    if scope.company_id is not None and is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only a superuser can grant superuser rights."
+        )
+    # Staf outlet tidak boleh membuat user tingkat company (outlet_id NULL berarti scope seluruh company)
+    return scope.company(company_id), scope.outlet(outlet_id)
+
+async def _check_outlet(db: AsyncSession, company_id: Optional[int], outlet_id: Optional[int]) -> None:
+    """The outlet of a user must be an active outlet of the user's company."""
+    if outlet_id is None:
+        return
+    outlet = None
+    if company_id is not None:
+        result = await db.execute(
+            select(OutletModel.id).where(
+                OutletModel.id == outlet_id,
+                OutletModel.company_id == company_id,
+                OutletModel.is_active == True,
+            )
+        )
+        outlet = result.scalar_one_or_none()
+    if outlet is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Outlet with ID {outlet_id} not found for this company or is inactive."
+        )
+
+def user_list_query(
+    company_id: Optional[int],
+    is_active: Optional[bool],
+    is_superuser: Optional[bool],
+    skip: int,
+    limit: int,
+    include_deleted: bool = False,
+    outlet_id: Optional[int] = None,
+):
+    """
+    Query used by read_users (also EXPLAINed by app/db/plan_check.py).
+    Urutan (company_id, is_active, is_superuser, id) sesuai index parsial ix_users_company_active_superuser;
+    dengan outlet_id, index parsial ix_users_outlet_live (outlet_id, id) hanya menyentuh baris outlet itu.
+    """
+    query = select(UserModel).options(selectinload(UserModel.company)) # Eager load company
+    if include_deleted:
+        query = query.execution_options(include_deleted=True)
+
+    if company_id is not None:
+        query = query.where(UserModel.company_id == company_id)
+    if outlet_id is not None:
+        query = query.where(UserModel.outlet_id == outlet_id)
+    if is_active is not None:
+        query = query.where(UserModel.is_active == is_active)
+    if is_superuser is not None:
+        query = query.where(UserModel.is_superuser == is_superuser)
+
+    return query.order_by(UserModel.id).offset(skip).limit(limit)
+
 @router.post("/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_in: UserCreate,
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Akan diaktifkan nanti
 ):
     """
@@ -31,52 +103,44 @@ async def create_user(
     Automatically hashes the password.
     Requires company_id to be valid if provided.
     """
+    company_id, outlet_id = _check_assignable(scope, user_in.company_id, user_in.outlet_id, user_in.is_superuser)
+
     # Validate company_id if provided
-    if user_in.company_id is not None:
-        company = await db.execute(
-            select(CompanyModel).where(CompanyModel.id == user_in.company_id, CompanyModel.is_active == True)
-        )
-        if not company.scalar_one_or_none():
+    company = None
+    if company_id is not None:
+        # Dari snapshot reference data; dipakai lagi untuk membangun respons
+        company = await get_active_company(db, company_id)
+        if company is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Company with ID {user_in.company_id} not found or is inactive."
+                detail=f"Company with ID {company_id} not found or is inactive."
             )
+    await _check_outlet(db, company_id, outlet_id)
 
-    # Check for duplicate username or email
+    # Check for duplicate username or email (termasuk user yang sudah di-soft-delete)
     existing_user = await db.execute(
-        select(UserModel).where(
-            (UserModel.username == user_in.username) | (UserModel.email == user_in.email)
-        )
+        queries.user_username_or_email_taken(), {"username": user_in.username, "email": user_in.email}
     )
-    if existing_user.scalar_one_or_none():
+    if existing_user.first() is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User with this username or email already exists."
         )
 
     hashed_password = get_password_hash(user_in.password)
-    db_user = UserModel(
-        username=user_in.username,
-        email=user_in.email,
-        hashed_password=hashed_password,
-        full_name=user_in.full_name,
-        company_id=user_in.company_id,
-        is_active=user_in.is_active,
-        is_superuser=user_in.is_superuser
-    )
-    db.add(db_user)
+    # INSERT ... RETURNING: respons dibangun dari baris yang dikembalikan, tanpa refresh/re-select
+    row = await insert_returning(db, UserModel, {
+        "username": user_in.username,
+        "email": user_in.email,
+        "hashed_password": hashed_password,
+        "full_name": user_in.full_name,
+        "company_id": company_id,
+        "outlet_id": outlet_id,
+        "is_active": user_in.is_active,
+        "is_superuser": user_in.is_superuser,
+    })
     await db.commit()
-    await db.refresh(db_user)
-    
-    # Eager load the company relationship for the response
-    loaded_user_result = await db.execute(
-        select(UserModel)
-        .options(selectinload(UserModel.company))
-        .where(UserModel.id == db_user.id)
-    )
-    loaded_user = loaded_user_result.scalar_one()
-
-    return loaded_user
+    return UserSchema.model_validate({**row, "company": company})
 
 @router.get("/", response_model=List[UserSchema])
 async def read_users(
@@ -84,39 +148,42 @@ async def read_users(
     company_id: Optional[int] = None,
     is_active: Optional[bool] = None,
     is_superuser: Optional[bool] = None,
+    outlet_id: Optional[int] = None,
+    include_deleted: bool = False, # Sertakan user yang sudah di-soft-delete
     skip: int = 0,
     limit: int = 100,
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Akan diaktifkan nanti
 ):
     """
     Retrieve a list of Users, with optional filters.
+    Soft-deleted users are excluded unless include_deleted is set.
+    Callers bound to a company/outlet (token) only see users of that company/outlet.
     """
-    query = select(UserModel).options(selectinload(UserModel.company)) # Eager load company
-    
-    if company_id is not None:
-        query = query.where(UserModel.company_id == company_id)
-    if is_active is not None:
-        query = query.where(UserModel.is_active == is_active)
-    if is_superuser is not None:
-        query = query.where(UserModel.is_superuser == is_superuser)
-
-    result = await db.execute(query.offset(skip).limit(limit))
+    query = user_list_query(
+        scope.company(company_id), is_active, is_superuser, skip, limit, include_deleted, scope.outlet(outlet_id)
+    )
+    result = await db.execute(query)
     users = result.scalars().unique().all()
     return users
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user_by_id(
     user_id: int,
+    include_deleted: bool = False, # Izinkan mengambil user yang sudah di-soft-delete
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Akan diaktifkan nanti
 ):
     """
     Retrieve a single User by ID.
     """
+    # User di luar scope pemanggil diperlakukan sebagai tidak ada
+    query = scope.apply(select(UserModel).where(UserModel.id == user_id), UserModel)
     result = await db.execute(
-        select(UserModel)
+        query
         .options(selectinload(UserModel.company)) # Eager load company
-        .where(UserModel.id == user_id)
+        .execution_options(include_deleted=include_deleted)
     )
     user = result.scalar_one_or_none()
     if not user:
@@ -131,16 +198,18 @@ async def update_user(
     user_id: int,
     user_in: UserUpdate,
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Akan diaktifkan nanti
 ):
     """
     Update an existing User.
     Password will be re-hashed if provided.
     """
+    company_id, outlet_id = _check_assignable(scope, user_in.company_id, user_in.outlet_id, user_in.is_superuser)
+    # Company user diambil dari snapshot reference data, jadi tidak perlu eager load di sini.
+    # User di luar scope pemanggil diperlakukan sebagai tidak ada
     result = await db.execute(
-        select(UserModel)
-        .options(selectinload(UserModel.company)) # Eager load company
-        .where(UserModel.id == user_id)
+        scope.apply(select(UserModel).where(UserModel.id == user_id), UserModel)
     )
     user = result.scalar_one_or_none()
     if not user:
@@ -151,24 +220,30 @@ async def update_user(
 
     # Validate company_id if provided and changed
     if user_in.company_id is not None and user_in.company_id != user.company_id:
-        company = await db.execute(
-            select(CompanyModel).where(CompanyModel.id == user_in.company_id, CompanyModel.is_active == True)
-        )
-        if not company.scalar_one_or_none():
+        company = await get_active_company(db, user_in.company_id)
+        if company is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Company with ID {user_in.company_id} not found or is inactive."
             )
 
+    # Jangan pernah menyimpan raw password; hanya hash-nya
+    values = user_in.model_dump(exclude_unset=True, exclude={"password"})
+    if "outlet_id" in values:
+        # outlet_id: null dari staf outlet tetap outletnya sendiri
+        values["outlet_id"] = outlet_id
+    if "company_id" in values:
+        values["company_id"] = company_id
+    # Outlet harus milik company user (juga saat hanya company-nya yang berubah)
+    if {"company_id", "outlet_id"} & values.keys():
+        await _check_outlet(db, values.get("company_id", user.company_id), values.get("outlet_id", user.outlet_id))
+
     # Check for duplicate username or email, excluding current user
     if user_in.username is not None and user_in.username != user.username:
         existing_username = await db.execute(
-            select(UserModel).where(
-                UserModel.username == user_in.username,
-                UserModel.id != user_id
-            )
+            queries.user_username_taken(), {"username": user_in.username, "user_id": user_id}
         )
-        if existing_username.scalar_one_or_none():
+        if existing_username.first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="User with this username already exists."
@@ -176,43 +251,38 @@ async def update_user(
     
     if user_in.email is not None and user_in.email != user.email:
         existing_email = await db.execute(
-            select(UserModel).where(
-                UserModel.email == user_in.email,
-                UserModel.id != user_id
-            )
+            queries.user_email_taken(), {"email": user_in.email, "user_id": user_id}
         )
-        if existing_email.scalar_one_or_none():
+        if existing_email.first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="User with this email already exists."
             )
 
-    # Update password if provided
     if user_in.password:
-        user.hashed_password = get_password_hash(user_in.password)
-        # Jangan set user_in.password ke user, karena itu adalah raw password
-        del user_in.password # Hapus dari objek user_in agar tidak disalin langsung
+        values["hashed_password"] = get_password_hash(user_in.password)
 
-    # Update other attributes
-    for field, value in user_in.model_dump(exclude_unset=True).items():
-        if field != "password": # Pastikan password tidak disalin jika ada di user_in
-            setattr(user, field, value)
+    # UPDATE ... RETURNING, tanpa refresh/re-select
+    row = await update_returning(db, UserModel, [UserModel.id == user_id], values, before=user)
+    company = await get_company(db, row["company_id"]) if row["company_id"] is not None else None
 
+    mark_stale(db, "user", user_id)
     await db.commit()
-    await db.refresh(user)
-    return user
+    return UserSchema.model_validate({**row, "company": company})
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
     db: AsyncSession = Depends(get_db),
+    scope: Scope = Depends(get_scope),
     # current_user: Any = Depends(get_current_active_user) # Akan diaktifkan nanti
 ):
     """
     Deactivate (soft delete) a User.
     """
+    # User di luar scope pemanggil diperlakukan sebagai tidak ada
     result = await db.execute(
-        select(UserModel).where(UserModel.id == user_id)
+        scope.apply(select(UserModel).where(UserModel.id == user_id), UserModel)
     )
     user = result.scalar_one_or_none()
     if not user:
@@ -223,5 +293,6 @@ async def delete_user(
 
     user.is_active = False
     user.deleted_at = func.now()
+    mark_stale(db, "user", user_id)
     await db.commit()
     return {"message": "User deactivated successfully"}
\ No newline at end of file
@@ -0,0 +1,74 @@
+# app/core/cache.py
+
+import logging
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentinel untuk membedakan "tidak ada di cache" dari nilai None yang memang di-cache
+MISSING = object()
+
+
+class LocalCache:
+    """
+    Simple per-process cache, grouped by namespace (e.g. "product", "uom", "user").
+
+    Entries have no TTL: they live until an invalidation arrives through the
+    cache bus (see app/services/cache_bus.py), which keeps every worker's copy
+    within a bounded staleness of the database.
+    """
+
+    def __init__(self, max_entries_per_namespace: int = 50_000):
+        self.max_entries_per_namespace = max_entries_per_namespace
+        self._data: Dict[str, Dict[Hashable, Any]] = {}
+        # Callback yang dipanggil setiap kali ada eviction (mis. untuk snapshot turunan)
+        self._listeners: List[Callable[[str, Optional[Hashable]], None]] = []
+
+    def get(self, namespace: str, key: Hashable, default: Any = MISSING) -> Any:
+        return self._data.get(namespace, {}).get(key, default)
+
+    def get_many(self, namespace: str, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Return the cached subset of `keys` (misses are simply absent)."""
+        bucket = self._data.get(namespace, {})
+        return {key: bucket[key] for key in keys if key in bucket}
+
+    def set(self, namespace: str, key: Hashable, value: Any) -> None:
+        bucket = self._data.setdefault(namespace, {})
+        if key not in bucket and len(bucket) >= self.max_entries_per_namespace:
+            # Buang entri tertua (dict menjaga urutan insert)
+            bucket.pop(next(iter(bucket)))
+        bucket[key] = value
+
+    def evict(self, namespace: str, key: Optional[Hashable] = None) -> None:
+        """Evict a single key, or the whole namespace when `key` is None."""
+        if key is None:
+            self._data.pop(namespace, None)
+        else:
+            self._data.get(namespace, {}).pop(key, None)
+        self._notify(namespace, key)
+
+    def evict_many(self, keys: Iterable[Tuple[str, Optional[Hashable]]]) -> None:
+        for namespace, key in keys:
+            self.evict(namespace, key)
+
+    def flush(self) -> None:
+        """Drop everything. Used when invalidations may have been missed."""
+        namespaces = list(self._data.keys())
+        self._data.clear()
+        logger.info("Local cache flushed (%d namespaces).", len(namespaces))
+        self._notify("*", None)
+
+    def add_listener(self, callback: Callable[[str, Optional[Hashable]], None]) -> None:
+        """Register a callback(namespace, key) fired on every eviction; namespace '*' means full flush."""
+        self._listeners.append(callback)
+
+    def _notify(self, namespace: str, key: Optional[Hashable]) -> None:
+        for callback in self._listeners:
+            try:
+                callback(namespace, key)
+            except Exception:
+                logger.exception("Cache eviction listener failed for %s:%s", namespace, key)
+
+
+# Instance global per proses worker
+local_cache = LocalCache()
@@ -0,0 +1,435 @@
+# app/core/compression.py
+
+"""
+Response compression middleware (pure ASGI).
+
+Negotiates zstd, brotli and gzip from Accept-Encoding. brotli and zstd are
+optional: they are used when the `brotli` / `zstandard` packages are
+installed and are skipped otherwise, so gzip (stdlib) always works.
+
+- Small bodies (below `minimum_size`) and already-encoded or non-compressible
+  content types are passed through untouched.
+- Per-route policies (longest path prefix wins) can disable compression or
+  change the threshold/encodings, e.g. for /auth where responses carry
+  secrets (BREACH).
+- Streaming responses are compressed chunk by chunk and flushed per chunk,
+  so terminals start parsing before the response is complete.
+- Complete bodies are cached in an LRU keyed by (path and query, ETag or
+  content hash, encoding): a hot catalog page is compressed once, later
+  hits cost a hash.
+
+Benchmark of the CPU/bytes tradeoff on a synthetic catalog page:
+
+    python -m app.core.compression --products 100
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try: # Opsional
+    import brotli
+except ImportError: # pragma: no cover
+    brotli = None
+
+try: # Opsional
+    import zstandard
+except ImportError: # pragma: no cover
+    zstandard = None
+
+# Tipe konten yang layak dikompres
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+    "text/",
+)
+
+
+# --- Encoders ---
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+@dataclass(frozen=True)
+class Encoder:
+    name: str
+    level: int
+
+    def compress(self, body: bytes) -> bytes:
+        if self.name == "gzip":
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            return compressor.compress(body) + compressor.flush()
+        if self.name == "br":
+            return brotli.compress(body, quality=self.level)
+        return zstandard.ZstdCompressor(level=self.level).compress(body)
+
+    def stream(self):
+        if self.name == "gzip":
+            return _GzipStream(self.level)
+        if self.name == "br":
+            return _BrotliStream(self.level)
+        return _ZstdStream(self.level)
+
+
+def available_encoders(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> Dict[str, Encoder]:
+    """Installed encoders in server preference order (best ratio per CPU first)."""
+    encoders: Dict[str, Encoder] = {}
+    if zstandard is not None:
+        encoders["zstd"] = Encoder("zstd", zstd_level)
+    if brotli is not None:
+        encoders["br"] = Encoder("br", brotli_quality)
+    encoders["gzip"] = Encoder("gzip", gzip_level)
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[token] = quality
+    return accepted
+
+
+def negotiate(header: str, offered: Sequence[str]) -> Optional[str]:
+    """Pick the offered encoding with the highest q; ties go to server preference (offered order)."""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in offered:
+        quality = accepted.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+@dataclass(frozen=True)
+class CompressionPolicy:
+    enabled: bool = True
+    minimum_size: Optional[int] = None
+    # Batasi ke subset encoding tertentu (mis. ("gzip",) untuk klien lama)
+    encodings: Optional[Tuple[str, ...]] = None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key: Tuple[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes // 4: # Jangan biarkan satu body mendominasi cache
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = body
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return _without(headers, b"vary") + [(b"vary", vary + b", Accept-Encoding")]
+
+
+def _encoded_etag(etag: bytes, encoding: str) -> bytes:
+    # Representasi terkompresi berbeda byte-nya, jadi ETag kuat harus dibedakan per encoding
+    if etag.startswith(b"W/"):
+        return etag
+    return etag[:-1] + b"-" + encoding.encode() + b'"' if etag.endswith(b'"') else etag + b"-" + encoding.encode()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        route_policies: Optional[Dict[str, CompressionPolicy]] = None,
+        cache_entries: int = 256,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders(gzip_level, brotli_quality, zstd_level)
+        # Prefix terpanjang dicek lebih dulu
+        self.route_policies = sorted((route_policies or {}).items(), key=lambda item: -len(item[0]))
+        self.cache = CompressedBodyCache(cache_entries, cache_max_bytes) if cache_entries else None
+
+    def policy_for(self, path: str) -> CompressionPolicy:
+        for prefix, policy in self.route_policies:
+            if path.startswith(prefix):
+                return policy
+        return CompressionPolicy()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.policy_for(scope.get("path", ""))
+        if not policy.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        offered = [name for name in self.encoders if policy.encodings is None or name in policy.encodings]
+        accept = _header(list(scope.get("headers", [])), b"accept-encoding")
+        encoding = negotiate(accept.decode("latin-1"), offered) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(
+            send,
+            self.encoders[encoding],
+            policy.minimum_size if policy.minimum_size is not None else self.minimum_size,
+            self.cache,
+            # ETag hanya unik per resource: path + query ikut menjadi bagian kunci cache
+            scope.get("path", "") + "?" + scope.get("query_string", b"").decode("latin-1"),
+        )
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    """Wraps `send` for one response; decides on the first body chunk."""
+
+    def __init__(self, send, encoder: Encoder, minimum_size: int, cache: Optional[CompressedBodyCache], resource: str = ""):
+        self.send = send
+        self.encoder = encoder
+        self.minimum_size = minimum_size
+        self.cache = cache
+        self.resource = resource
+        self.start_message = None
+        self.stream = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = list(message.get("headers", []))
+            content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+            if (
+                _header(headers, b"content-encoding") is not None
+                or message["status"] in (204, 206, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            chunk = self.stream.compress(body) if body else b""
+            if not more_body:
+                chunk += self.stream.finish()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        headers = list(self.start_message.get("headers", []))
+        if not more_body:
+            await self._send_complete(headers, body)
+            return
+
+        # Streaming: kompres per chunk kecuali Content-Length sudah menyatakan body kecil
+        content_length = _header(headers, b"content-length")
+        if content_length is not None and int(content_length) < self.minimum_size:
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        self.stream = self.encoder.stream()
+        await self.send(self._start(headers))
+        await self.send({"type": "http.response.body", "body": self.stream.compress(body), "more_body": True})
+
+    def _start(self, headers: List[Tuple[bytes, bytes]], length: Optional[int] = None):
+        etag = _header(headers, b"etag")
+        headers = _without(headers, b"content-length", b"etag")
+        headers.append((b"content-encoding", self.encoder.name.encode()))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        if etag is not None:
+            headers.append((b"etag", _encoded_etag(etag, self.encoder.name)))
+        return {**self.start_message, "headers": _add_vary(headers)}
+
+    async def _send_complete(self, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        if len(body) < self.minimum_size:
+            await self.send({**self.start_message, "headers": _add_vary(headers)})
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        compressed = None
+        key = None
+        if self.cache is not None:
+            etag = _header(headers, b"etag")
+            # Tanpa ETag: hash isi body (jauh lebih murah daripada mengompres ulang)
+            identity = etag.decode("latin-1") if etag is not None else hashlib.blake2b(body, digest_size=16).hexdigest()
+            key = (self.resource, identity, f"{self.encoder.name}:{self.encoder.level}")
+            compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = self.encoder.compress(body)
+            if key is not None:
+                self.cache.set(key, compressed)
+
+        if len(compressed) >= len(body): # Tidak menguntungkan (mis. data acak)
+            await self.send({**self.start_message, "headers": _add_vary(headers)})
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        await self.send(self._start(headers, len(compressed)))
+        await self.send({"type": "http.response.body", "body": compressed})
+
+
+# --- Benchmark ---
+
+def sample_catalog_page(products: int = 100, seed: int = 42) -> bytes:
+    """A GET /products/ page shaped like ProductSchema JSON (with nested stock_uom)."""
+    rng = random.Random(seed)
+    uoms = [
+        {"id": i + 1, "name": name, "symbol": symbol, "is_active": True,
+         "created_at": "2025-07-01T08:00:00Z", "updated_at": "2025-07-01T08:00:00Z", "deleted_at": None}
+        for i, (name, symbol) in enumerate([("Pieces", "pcs"), ("Kilogram", "kg"), ("Cup", "cup"), ("Box", "box")])
+    ]
+    words = ["Classic", "Spicy", "Iced", "Hot", "Large", "Latte", "Fried Rice", "Noodle", "Tea", "Chicken", "Toast"]
+    page = []
+    for n in range(products):
+        uom = rng.choice(uoms)
+        page.append({
+            "company_id": 7,
+            "name": f"{rng.choice(words)} {rng.choice(words)} {n:05d}",
+            "description": rng.choice([None, "House favourite, served with sambal and crackers."]),
+            "sku": f"{rng.choice(['BEV', 'FOOD', 'SNK'])}-{n:06d}",
+            "barcode": "".join(str(rng.randrange(10)) for _ in range(13)) if rng.random() < 0.7 else None,
+            "stock_uom_id": uom["id"],
+            "base_price": round(rng.lognormvariate(10.3, 0.6), -2),
+            "is_active": rng.random() > 0.05,
+            "image_url": f"https://cdn.example.com/products/{rng.getrandbits(64):016x}.jpg",
+            "id": 100000 + n,
+            "created_at": f"2025-0{rng.randint(1, 6)}-{rng.randint(10, 28)}T{rng.randint(10, 23)}:00:00Z",
+            "updated_at": "2025-07-01T08:00:00Z",
+            "deleted_at": None,
+            "stock_uom": uom,
+        })
+    return json.dumps(page).encode()
+
+
+def benchmark(body: bytes, rounds: int = 50) -> List[Tuple[str, int, int, float]]:
+    """(encoding, level, compressed bytes, ms per compression) for every installed encoder and a few levels."""
+    levels = {"gzip": (1, 4, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 6, 12)}
+    results = []
+    for name in available_encoders():
+        for level in levels[name]:
+            encoder = Encoder(name, level)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                compressed = encoder.compress(body)
+            results.append((name, level, len(compressed), (time.perf_counter() - started) * 1000 / rounds))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU vs bytes of response compression on a catalog page.")
+    parser.add_argument("--products", type=int, default=100, help="Products per page (GET /products/?limit=...)")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    body = sample_catalog_page(args.products)
+    print(f"Catalog page: {args.products} products, {len(body)} bytes uncompressed")
+    print(f"{'encoding':8} {'level':>5} {'bytes':>8} {'ratio':>6} {'ms':>7}")
+    for name, level, size, ms in benchmark(body, args.rounds):
+        print(f"{name:8} {level:>5} {size:>8} {len(body) / size:>6.1f} {ms:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,10 +16,90 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     DATABASE_ASYNC_URL: str # Untuk dukungan asyncpg di masa depan
 
+    # Cache statement: compiled cache SQLAlchemy dan prepared statement asyncpg (per koneksi)
+    DB_COMPILED_CACHE_SIZE: int = 1000 # Default SQLAlchemy 500
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500 # Default asyncpg 100; 0 jika lewat pgbouncer mode transaction
+
     # Security settings
     SECRET_KEY: SecretStr
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 # Default 60 menit
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_SYNC_SECONDS: float = 30.0 # Sinkronisasi periodik daftar family token yang dicabut
+    # True = endpoint yang memakai scoping (app/api/deps.py) menolak request tanpa token
+    AUTH_REQUIRED: bool = False
+
+    # Cache invalidation bus (PostgreSQL LISTEN/NOTIFY antar worker)
+    CACHE_BUS_ENABLED: bool = True
+    CACHE_BUS_CHANNEL: str = "dwc_cache_invalidation"
+    CACHE_BUS_MAX_KEYS_PER_NAMESPACE: int = 500 # Lebih dari ini, seluruh namespace di-evict
+    CACHE_BUS_KEEPALIVE_SECONDS: float = 10.0
+    CACHE_BUS_GAP_GRACE_SECONDS: float = 2.0
+    CACHE_BUS_RECONNECT_MIN_SECONDS: float = 0.5
+    CACHE_BUS_RECONNECT_MAX_SECONDS: float = 30.0
+
+    # Proteksi brute-force dan admission control untuk /auth/login
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_BACKEND: str = "memory" # "memory" atau "postgres" (dibagi antar worker/host)
+    LOGIN_USERNAME_BURST: int = 5
+    LOGIN_USERNAME_REFILL_PER_MINUTE: float = 2.0
+    LOGIN_IP_BURST: int = 50
+    LOGIN_IP_REFILL_PER_MINUTE: float = 120.0
+    LOGIN_MAX_CONCURRENT_HASHES: int = 2 # Per worker; bcrypt memakan CPU penuh
+    LOGIN_HASH_QUEUE_TIMEOUT_SECONDS: float = 0.05
+
+    # Login PIN kasir di terminal terdaftar (per worker)
+    PIN_LOGIN_USER_BURST: int = 5 # Per kasir per terminal
+    PIN_LOGIN_USER_REFILL_PER_MINUTE: float = 2.0
+    PIN_LOGIN_TERMINAL_BURST: int = 30
+    PIN_LOGIN_TERMINAL_REFILL_PER_MINUTE: float = 30.0
+
+    # Kode verifikasi login dan link aktivasi akun
+    VERIFICATION_BACKEND: str = "memory" # "memory" (satu node) atau "postgres" (dibagi antar worker/host)
+    VERIFICATION_CODE_TTL_SECONDS: int = 600
+    VERIFICATION_LINK_TTL_SECONDS: int = 86400
+    VERIFICATION_MAX_ATTEMPTS: int = 5
+    VERIFICATION_SWEEP_TICK_SECONDS: float = 1.0 # Resolusi timing wheel backend memory
+    VERIFICATION_PURGE_BATCH_SIZE: int = 1000 # Backend postgres: baris kedaluwarsa per DELETE
+    VERIFICATION_LINK_BASE_URL: str = "http://localhost:3000/verify-email" # Halaman frontend; ?token=... ditambahkan
+
+    # Audit log perubahan entitas (ditulis asinkron, batch multi-row)
+    AUDIT_ENABLED: bool = True
+    AUDIT_BATCH_SIZE: int = 500 # Baris per INSERT multi-row (dibatasi 32767 parameter per statement); antrean sepanjang ini memicu flush segera
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 2.0 # Batas waktu tunggu sebelum flush
+    AUDIT_QUEUE_MAX: int = 100_000 # Lebih dari ini (mis. DB mati lama) record baru dibuang dan dihitung
+    AUDIT_PARTITION_MONTHS_AHEAD: int = 2 # Partisi bulanan yang disiapkan di depan bulan berjalan
+    AUDIT_RETENTION_MONTHS: int = 0 # 0 = simpan selamanya; selain itu partisi yang lebih tua di-drop
+    AUDIT_DEFAULT_LOOKBACK_DAYS: int = 30 # GET /audit/ tanpa `since`
+
+    # Render struk (ESC/POS, PDF) di process pool
+    RECEIPT_RENDER_WORKERS: int = 2 # Slot render per worker aplikasi (checkout + reprint); 0 = render di thread
+    RECEIPT_REPRINT_CONCURRENCY: int = 1 # Slot untuk reprint (maks. RECEIPT_RENDER_WORKERS - 1); sisanya untuk checkout
+    RECEIPT_RENDER_TIMEOUT_SECONDS: float = 10.0
+    RECEIPT_CACHE_ENTRIES: int = 2048 # Hasil render (per transaksi, hash isi, format)
+    RECEIPT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RECEIPT_PAYLOAD_ENTRIES: int = 20_000 # Payload struk terakhir yang bisa di-reprint lewat ID transaksi
+
+    # Scheduler job periodik (lease di tabel scheduler_leases agar tepat sekali antar worker)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LEASE_MARGIN_SECONDS: float = 30.0 # Ditambahkan ke timeout job untuk masa lease
+
+    # Event perubahan katalog untuk terminal (WebSocket)
+    CATALOG_EVENTS_ENABLED: bool = True
+    CATALOG_EVENTS_CHANNEL: str = "dwc_catalog_events"
+    CATALOG_EVENTS_BUFFER_SIZE: int = 10_000 # Event terakhir yang bisa di-replay saat resume
+    CATALOG_EVENTS_MAX_IDS: int = 500 # Lebih dari ini per jenis, dikirim sebagai "*" (semua)
+    CATALOG_EVENTS_COALESCE_SECONDS: float = 0.1
+    CATALOG_EVENTS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # Kompresi respons (gzip; brotli/zstd jika paketnya terpasang)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024 # Byte; body lebih kecil dikirim apa adanya
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_CACHE_ENTRIES: int = 256 # 0 = tanpa cache body terkompresi
+    COMPRESSION_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
 
     # Pydantic settings configuration to load from .env file
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -0,0 +1,186 @@
+# app/core/rate_limit.py
+
+"""
+Login throttling: token buckets per username and client IP (in memory,
+optionally shared through Postgres) and a cap on concurrent password
+hashes per worker. Excess attempts get 429 before any hashing.
+
+Catalog latency during a login flood: app/core/rate_limit_bench.py.
+"""
+
+import asyncio
+import math
+import time
+import zlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller has used up its attempts. `retry_after` is in seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class AdmissionRejected(Exception):
+    """Raised when the worker is already running its maximum number of password hashes."""
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated_at: float
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token bucket, keyed by an arbitrary string (e.g. "user:alice" or "ip:10.0.0.1").
+
+    Buckets are spread across shards so that pruning idle buckets only ever
+    walks one small dict at a time instead of the whole key space.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, shards: int = 16, max_keys_per_shard: int = 10_000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards: List[Dict[str, _Bucket]] = [{} for _ in range(shards)]
+
+    def _shard(self, key: str) -> Dict[str, _Bucket]:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    def try_acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take `cost` tokens. Returns (allowed, seconds until enough tokens are available)."""
+        now = time.monotonic()
+        shard = self._shard(key)
+        bucket = shard.get(key)
+        if bucket is None:
+            if len(shard) >= self.max_keys_per_shard:
+                self._prune(shard, now)
+            bucket = shard[key] = _Bucket(tokens=self.capacity, updated_at=now)
+        else:
+            bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.refill_per_second)
+            bucket.updated_at = now
+
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return True, 0.0
+        return False, (cost - bucket.tokens) / self.refill_per_second
+
+    def _prune(self, shard: Dict[str, _Bucket], now: float) -> None:
+        # Bucket yang sudah penuh kembali identik dengan bucket baru, jadi aman dibuang
+        full_after = self.capacity / self.refill_per_second
+        for key in [k for k, b in shard.items() if now - b.updated_at >= full_after]:
+            del shard[key]
+        while len(shard) >= self.max_keys_per_shard:
+            shard.pop(next(iter(shard)))
+
+
+class PostgresTokenBucket:
+    """
+    Token bucket shared by all workers and hosts, stored in `login_throttle_buckets`.
+
+    A single upsert refills and consumes atomically. A denied attempt still
+    drains the bucket (down to -1), so hammering keeps the key locked out.
+    """
+
+    _SQL = text(
+        """
+        INSERT INTO login_throttle_buckets (key, tokens, updated_at)
+        VALUES (:key, :capacity - 1, now())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = GREATEST(
+                LEAST(
+                    :capacity,
+                    login_throttle_buckets.tokens
+                    + EXTRACT(EPOCH FROM (now() - login_throttle_buckets.updated_at)) * :rate
+                ) - 1,
+                -1
+            ),
+            updated_at = now()
+        RETURNING tokens
+        """
+    )
+
+    def __init__(self, engine: AsyncEngine, capacity: float, refill_per_second: float):
+        self.engine = engine
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    async def try_acquire(self, key: str) -> Tuple[bool, float]:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                self._SQL, {"key": key, "capacity": self.capacity, "rate": self.refill_per_second}
+            )
+            tokens = result.scalar_one()
+        if tokens >= 0:
+            return True, 0.0
+        return False, (0 - tokens) / self.refill_per_second
+
+
+class HashAdmissionGate:
+    """
+    Caps how many password verifications a worker runs at once.
+
+    Callers that cannot get a slot within `queue_timeout` are rejected instead
+    of queueing, so a login flood cannot starve the rest of the API of CPU.
+    """
+
+    def __init__(self, max_concurrent: int, queue_timeout: float):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class LoginThrottle:
+    """Combines per-username and per-IP buckets (local first, then optionally shared)."""
+
+    def __init__(
+        self,
+        username_limiter: TokenBucketLimiter,
+        ip_limiter: TokenBucketLimiter,
+        shared_username: Optional[PostgresTokenBucket] = None,
+        shared_ip: Optional[PostgresTokenBucket] = None,
+    ):
+        self.username_limiter = username_limiter
+        self.ip_limiter = ip_limiter
+        self.shared_username = shared_username
+        self.shared_ip = shared_ip
+
+    async def check(self, username: str, client_ip: Optional[str]) -> None:
+        """Raise RateLimitExceeded if either the username or the client IP is over its limit."""
+        keys = [("user:" + username.strip().lower(), self.username_limiter, self.shared_username)]
+        if client_ip:
+            keys.append(("ip:" + client_ip, self.ip_limiter, self.shared_ip))
+
+        # Cek lokal dulu: murah dan tidak menyentuh database sama sekali
+        for key, local, _shared in keys:
+            allowed, retry_after = local.try_acquire(key)
+            if not allowed:
+                raise RateLimitExceeded(math.ceil(retry_after))
+
+        for key, _local, shared in keys:
+            if shared is None:
+                continue
+            allowed, retry_after = await shared.try_acquire(key)
+            if not allowed:
+                raise RateLimitExceeded(math.ceil(retry_after))
+
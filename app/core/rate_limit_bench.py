@@ -0,0 +1,190 @@
+# app/core/rate_limit_bench.py
+
+"""
+Catalog latency of one worker during a login flood, measured through the
+real app: GET /products/ and POST /auth/login run against app.main.app
+(lifespan included) over httpx.ASGITransport on one event loop, with the
+database of DATABASE_ASYNC_URL. Needs httpx and users to flood, e.g. the
+synthetic tenants of app/seed_data.py:
+
+    python -m app.seed_data --companies 5 --products-per-company 2000 --users 500 --reset
+    python -m app.core.rate_limit_bench --login-rate 500 --duration 10
+
+The flood guesses wrong passwords for existing usernames from a handful of
+client IPs, so every admitted attempt costs a database lookup and a bcrypt
+verification. Printed are catalog p50/p99/max in milliseconds, failed
+catalog requests (e.g. pool timeouts), and login status codes for three scenarios: no flood, the flood with the
+throttle and hash admission gate switched off, and the flood with the
+limits of app/core/config.py (in-memory backend).
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import random
+import sys
+import time
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import httpx
+except ImportError: # pragma: no cover
+    httpx = None
+
+from sqlalchemy import text
+
+from app.api.v1.endpoints import auth
+from app.core.config import settings
+from app.core.rate_limit import HashAdmissionGate, LoginThrottle, TokenBucketLimiter
+from app.core.security import create_access_token
+from app.db.connection import engine
+from app.main import app
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+def _client(ip: str) -> "httpx.AsyncClient":
+    # Satu client per IP: ASGITransport mengirim alamat ini sebagai request.client.
+    # Exception app (mis. pool koneksi habis) menjadi 500 dan dihitung, bukan menghentikan benchmark
+    transport = httpx.ASGITransport(app=app, client=(ip, 50000), raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+def _configure(protected: bool) -> None:
+    """Login protection of the app for one scenario; buckets start full every time."""
+    settings.LOGIN_RATE_LIMIT_ENABLED = protected
+    auth.login_throttle = LoginThrottle(
+        username_limiter=TokenBucketLimiter(settings.LOGIN_USERNAME_BURST, settings.LOGIN_USERNAME_REFILL_PER_MINUTE / 60),
+        ip_limiter=TokenBucketLimiter(settings.LOGIN_IP_BURST, settings.LOGIN_IP_REFILL_PER_MINUTE / 60),
+    )
+    if protected:
+        auth.password_hash_gate = HashAdmissionGate(
+            settings.LOGIN_MAX_CONCURRENT_HASHES, settings.LOGIN_HASH_QUEUE_TIMEOUT_SECONDS
+        )
+    else:
+        auth.password_hash_gate = HashAdmissionGate(1_000_000, math.inf)
+
+
+async def _targets() -> Tuple[int, List[str]]:
+    """The company with the most live products, and usernames of active users to flood."""
+    async with engine.connect() as conn:
+        company_id = (await conn.execute(text(
+            "SELECT company_id FROM products WHERE deleted_at IS NULL "
+            "GROUP BY company_id ORDER BY count(*) DESC LIMIT 1"
+        ))).scalar_one_or_none()
+        usernames = (await conn.execute(text(
+            "SELECT username FROM users WHERE is_active AND deleted_at IS NULL ORDER BY id LIMIT 1000"
+        ))).scalars().all()
+    return company_id, list(usernames)
+
+
+async def _catalog_traffic(client: "httpx.AsyncClient", company_id: int, rate: float, duration: float) -> Tuple[List[float], int]:
+    """
+    GET /products/ at a fixed rate. Latency is measured from the scheduled
+    start, so time spent waiting for the event loop or a connection counts.
+    """
+    token = create_access_token({"sub": "bench", "user_id": 0, "company_id": company_id})
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: List[float] = []
+    errors = 0
+
+    async def request(scheduled: float) -> None:
+        nonlocal errors
+        response = await client.get(
+            f"{settings.API_V1_STR}/products/", params={"company_id": company_id, "limit": 100}, headers=headers
+        )
+        latencies.append(time.perf_counter() - scheduled)
+        errors += response.status_code != 200
+
+    tasks = []
+    started = time.perf_counter()
+    for n in range(int(rate * duration)):
+        scheduled = started + n / rate
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        tasks.append(asyncio.ensure_future(request(scheduled)))
+    await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+async def _login_flood(
+    clients: Sequence["httpx.AsyncClient"], usernames: List[str], rate: float, duration: float, seed: int
+) -> Dict[int, int]:
+    """Wrong passwords for existing usernames at a fixed rate; status code -> count."""
+    outcomes: Dict[int, int] = {}
+    rng = random.Random(seed)
+
+    async def attempt(client: "httpx.AsyncClient", username: str) -> None:
+        response = await client.post(
+            f"{settings.API_V1_STR}/auth/login", data={"username": username, "password": "wrong password"}
+        )
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+    tasks = []
+    started = time.perf_counter()
+    for n in range(int(rate * duration)):
+        await asyncio.sleep(max(0.0, started + n / rate - time.perf_counter()))
+        tasks.append(asyncio.ensure_future(attempt(rng.choice(clients), rng.choice(usernames))))
+    # Percobaan yang masih antre tidak ditunggu: yang diukur adalah katalog selama flood
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return outcomes
+
+
+async def run(args: argparse.Namespace) -> int:
+    async with app.router.lifespan_context(app):
+        company_id, usernames = await _targets()
+        if company_id is None or not usernames:
+            print("No products or users found; generate data with python -m app.seed_data first.")
+            return 1
+
+        clients = [_client(f"10.0.0.{n + 1}") for n in range(args.ips)]
+        catalog_client = _client("192.168.0.1")
+        scenarios = [("no flood", True, 0.0), ("flood, unprotected", False, args.login_rate), ("flood, protected", True, args.login_rate)]
+        print(f"Catalog: {args.catalog_rate:.0f} req/s for company {company_id}; flood: {args.login_rate:.0f} logins/s "
+              f"from {args.ips} IPs over {len(usernames)} usernames; {args.duration:.0f}s per scenario")
+        print(f"{'scenario':20} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'401':>7} {'429':>7} {'other':>7}")
+        try:
+            for name, protected, login_rate in scenarios:
+                _configure(protected)
+                catalog = asyncio.ensure_future(_catalog_traffic(catalog_client, company_id, args.catalog_rate, args.duration))
+                outcomes: Dict[int, int] = {}
+                if login_rate:
+                    outcomes = await _login_flood(clients, usernames, login_rate, args.duration, args.seed)
+                latencies, errors = await catalog
+                print(
+                    f"{name:20} {_percentile(latencies, 0.5) * 1000:>8.2f} {_percentile(latencies, 0.99) * 1000:>8.2f} "
+                    f"{max(latencies, default=float('nan')) * 1000:>8.2f} {errors:>7} "
+                    f"{outcomes.get(401, 0):>7} {outcomes.get(429, 0):>7} "
+                    f"{sum(outcomes.values()) - outcomes.get(401, 0) - outcomes.get(429, 0):>7}"
+                )
+        finally:
+            for client in [*clients, catalog_client]:
+                await client.aclose()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Catalog latency of one worker during a login flood.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--catalog-rate", type=float, default=50.0, help="Catalog requests per second")
+    parser.add_argument("--login-rate", type=float, default=500.0, help="Login attempts per second during the flood")
+    parser.add_argument("--ips", type=int, default=4, help="Client IPs the flood comes from")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if httpx is None:
+        print("httpx is required: pip install httpx")
+        return 1
+    # Satu baris log per request/statement akan menenggelamkan hasilnya
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    engine.echo = False
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
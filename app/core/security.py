@@ -2,6 +2,8 @@
 
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import hashlib
+import hmac
 import secrets # Untuk token verifikasi acak
 import string # Untuk PIN acak
 
@@ -19,20 +21,27 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-# --- PIN Hashing (Opsional: Jika PIN juga ingin di-hash) ---
-# Jika PIN hanya 6 digit, hashing mungkin tidak sekuat password,
-# tapi tetap lebih baik daripada menyimpan plaintext.
-# Untuk demo ini, kita akan menyimpannya plaintext agar mudah,
-# tetapi dalam produksi, pertimbangkan untuk hashing PIN juga.
-def verify_pin(plain_pin: str, hashed_pin: str) -> bool:
-    # Untuk demo, kita asumsikan PIN disimpan hashed jika diaktifkan.
-    # Jika tidak dihash, cukup 'return plain_pin == stored_pin'
-    return pwd_context.verify(plain_pin, hashed_pin)
+# --- PIN Hashing ---
+# PIN 6 digit hanya punya 10^6 kemungkinan: bcrypt tidak membuatnya aman terhadap brute force offline,
+# hanya membuat pergantian kasir lambat. Digest PIN adalah HMAC dengan kunci per terminal yang
+# diturunkan dari SECRET_KEY, jadi isi database saja tidak cukup untuk menebak PIN; percobaan online dibatasi.
+def _terminal_pin_key(key: str) -> bytes:
+    return hmac.new(_secret_key().encode(), b"pin-key:" + key.encode(), hashlib.sha256).digest()
 
-def get_pin_hash(pin: str) -> str:
-    return pwd_context.hash(pin)
+def get_pin_hash(pin: str, key: str, user_id: int) -> str:
+    return hmac.new(_terminal_pin_key(key), f"{user_id}:{pin}".encode(), hashlib.sha256).hexdigest()
+
+def verify_pin(plain_pin: str, hashed_pin: str, key: str, user_id: int) -> bool:
+    return hmac.compare_digest(get_pin_hash(plain_pin, key, user_id), hashed_pin)
+
+def generate_pin_key() -> str:
+    return secrets.token_hex(32)
 
 # --- JWT (JSON Web Token) ---
+def _secret_key() -> str:
+    # str(SecretStr) menghasilkan '**********', bukan nilai rahasianya
+    return settings.SECRET_KEY.get_secret_value()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -43,16 +52,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, str(settings.SECRET_KEY), algorithm=settings.ALGORITHM)
+    to_encode.setdefault("jti", secrets.token_urlsafe(12)) # ID unik per access token
+    encoded_jwt = jwt.encode(to_encode, _secret_key(), algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def decode_access_token(token: str) -> Optional[dict]:
     try:
-        decoded_payload = jwt.decode(token, str(settings.SECRET_KEY), algorithms=[settings.ALGORITHM])
+        decoded_payload = jwt.decode(token, _secret_key(), algorithms=[settings.ALGORITHM])
         return decoded_payload
     except JWTError:
         return None
 
+# --- Refresh Token ---
+# Token acak 256 bit tidak perlu di-hash lambat (bcrypt); HMAC cukup dan hanya butuh mikrodetik
+def generate_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    key = _secret_key().encode()
+    return hmac.new(key, b"refresh-token:" + token.encode(), hashlib.sha256).hexdigest()
+
+# Secret perangkat terminal (dikirim sekali saat registrasi, disimpan sebagai HMAC)
+def generate_terminal_secret() -> str:
+    return secrets.token_urlsafe(32)
+
+def hash_terminal_secret(secret: str) -> str:
+    return hmac.new(_secret_key().encode(), b"terminal-secret:" + secret.encode(), hashlib.sha256).hexdigest()
+
 # --- Email Verification & PIN Generation ---
 # Untuk token aktivasi akun (link)
 def generate_verification_token() -> str:
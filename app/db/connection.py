@@ -2,6 +2,7 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from app.db.base import Base # Import Base dari lokasi yang benar (app.db.base)
+import app.db.soft_delete # Mendaftarkan filter soft-delete global pada Session
 
 # --- PENTING: IMPOR SEMUA MODEL ANDA DI SINI ---
 # Ini penting agar SQLAlchemy dan Alembic mendeteksi semua model Anda
@@ -15,15 +16,22 @@ import app.models.company
 import app.models.outlet
 import app.models.uom
 import app.models.product
+import app.models.login_throttle
+import app.models.sales_channel
+import app.models.product_channel_price
+import app.models.scheduler_lease
+import app.models.refresh_token
+import app.models.terminal
+import app.models.verification_code
+import app.models.audit_log
+import app.models.recipe_material
+import app.models.product_uom_conversion
 # Jika ada model lain yang akan kita buat nanti, tambahkan juga di sini:
 # import app.models.product
-# import app.models.product_uom_conversion
 # import app.models.product_variant
 # import app.models.product_outlet
-# import app.models.recipe_material
 # import app.models.production_order
 # import app.models.customer
-# import app.models.sales_channel
 # import app.models.product_variant_channel_price
 # import app.models.add_on
 # import app.models.product_variant_add_on
@@ -41,9 +49,18 @@ from app.core.config import settings
 # Pastikan nama variabel DATABASE_ASYNC_URL di settings.py sudah benar
 DATABASE_URL = settings.DATABASE_ASYNC_URL
 
+# DSN tanpa nama driver SQLAlchemy, untuk koneksi asyncpg langsung (mis. LISTEN/NOTIFY)
+RAW_DATABASE_URL = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
 # Inisialisasi AsyncEngine
 # echo=True akan menampilkan semua query SQL di konsol, berguna untuk debugging
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=True,
+    query_cache_size=settings.DB_COMPILED_CACHE_SIZE,
+    # Semua query endpoint muat di cache prepared statement, jadi tidak ada PREPARE ulang karena eviksi
+    connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+)
 
 # Fungsi untuk mendapatkan sesi database (digunakan oleh dependensi FastAPI)
 async def get_db():
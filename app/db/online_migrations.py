@@ -0,0 +1,292 @@
+# app/db/online_migrations.py
+
+"""
+Helpers for schema changes that must not block the running POS.
+
+Plain Alembic operations take an ACCESS EXCLUSIVE lock for as long as the
+statement runs (index builds, constraint validation, rewrites). On the big
+tables that stalls checkout for the whole deploy. Use these from migration
+scripts instead:
+
+    from app.db import online_migrations as online
+
+    def upgrade() -> None:
+        online.create_index_concurrently('ix_users_outlet_live', 'users', ['outlet_id', 'id'],
+                                         postgresql_where='deleted_at IS NULL')
+        online.add_foreign_key_not_valid('fk_users_outlet_id', 'users', 'outlets', ['outlet_id'], ['id'])
+        online.validate_constraint('users', 'fk_users_outlet_id')
+        online.batched_backfill('users', "is_superuser = FALSE", where="is_superuser IS NULL")
+
+env.py runs every migration in its own transaction with lock_timeout and
+statement_timeout set (see `migration_timeouts`), so a migration that waits
+on a busy table fails fast instead of queueing every request behind it.
+Helpers that cannot run inside a transaction (CONCURRENTLY, batched
+backfills) step out of it with Alembic's autocommit_block(); keep them in a
+migration of their own, or after the transactional part of one.
+"""
+
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+# Child dari logger "alembic" agar ikut tampil di output `alembic upgrade`
+logger = logging.getLogger("alembic.online_migrations")
+
+DEFAULT_LOCK_TIMEOUT = "5s"
+DEFAULT_STATEMENT_TIMEOUT = "5min"
+
+# SQLSTATE lock_not_available (lock_timeout terlampaui)
+LOCK_NOT_AVAILABLE = "55P03"
+
+# Nama identifier PostgreSQL maksimal 63 byte
+_MAX_IDENTIFIER = 63
+
+
+def migration_timeouts(x_args: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Timeouts for a migration run: `alembic -x lock_timeout=2s -x statement_timeout=0 upgrade head`
+    wins over MIGRATION_LOCK_TIMEOUT / MIGRATION_STATEMENT_TIMEOUT, which win over the defaults.
+    """
+    x_args = x_args or {}
+    return {
+        "lock_timeout": x_args.get("lock_timeout", os.getenv("MIGRATION_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)),
+        "statement_timeout": x_args.get(
+            "statement_timeout", os.getenv("MIGRATION_STATEMENT_TIMEOUT", DEFAULT_STATEMENT_TIMEOUT)
+        ),
+    }
+
+
+def timeout_statements(timeouts: Dict[str, str]) -> List[str]:
+    return [f"SET {name} = '{value}'" for name, value in timeouts.items()]
+
+
+def _pgcode(exc: OperationalError) -> Optional[str]:
+    orig = getattr(exc, "orig", None)
+    return getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+
+
+def run_with_lock_retries(
+    statement: Union[str, Callable[[Connection], None]],
+    attempts: int = 5,
+    delay: float = 2.0,
+) -> None:
+    """
+    Run a short DDL statement inside a SAVEPOINT and retry it when it hits
+    lock_timeout. Each attempt holds the lock queue only for lock_timeout,
+    then lets waiting requests through before trying again.
+    """
+    bind = op.get_bind()
+    for attempt in range(1, attempts + 1):
+        try:
+            with bind.begin_nested():
+                if callable(statement):
+                    statement(bind)
+                else:
+                    bind.execute(text(statement))
+            return
+        except OperationalError as exc:
+            if _pgcode(exc) != LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            logger.warning("Lock not available (attempt %d/%d); retrying in %.1fs", attempt, attempts, delay * attempt)
+            time.sleep(delay * attempt)
+
+
+def _is_partitioned(bind: Connection, table: str) -> bool:
+    return bind.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table},
+    ).scalar() or False
+
+
+def _drop_invalid_index(bind: Connection, name: str) -> None:
+    # CREATE INDEX CONCURRENTLY yang gagal meninggalkan index INVALID; bersihkan sebelum mencoba lagi
+    invalid = bind.execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.oid = to_regclass(:name) AND NOT i.indisvalid AND c.relkind = 'i'"
+        ),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        logger.info("Dropping invalid index %s left by an earlier attempt", name)
+        bind.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def _index_sql(name: str, table: str, columns: Sequence[str], unique: bool, where: Optional[str],
+               concurrently: bool = False, only: bool = False) -> str:
+    return (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name} "
+        f"ON {'ONLY ' if only else ''}{table} ({', '.join(columns)})"
+        + (f" WHERE {where}" if where else "")
+    )
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    postgresql_where: Optional[str] = None,
+) -> None:
+    """
+    Build an index without blocking writes. Idempotent: an existing valid
+    index is kept, an invalid leftover from a failed run is rebuilt.
+
+    Partitioned tables (products) do not support CONCURRENTLY directly; the
+    index is created ON ONLY the parent, built concurrently on every leaf
+    partition and then attached, which is equivalent and never locks writes.
+    """
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        previous_timeout = bind.execute(text("SHOW statement_timeout")).scalar()
+        bind.execute(text("SET statement_timeout = 0")) # Build index besar bisa lama; lock_timeout tetap berlaku
+        try:
+            if not _is_partitioned(bind, table):
+                _drop_invalid_index(bind, name)
+                bind.execute(text(_index_sql(name, table, columns, unique, postgresql_where, concurrently=True)))
+                return
+
+            tree = bind.execute(
+                text(
+                    "SELECT relid::regclass::text, parentrelid::regclass::text, isleaf, level "
+                    "FROM pg_partition_tree(to_regclass(:table)) ORDER BY level"
+                ),
+                {"table": table},
+            ).all()
+            index_of = {table: name}
+            for relname, parent, isleaf, level in tree:
+                if level == 0:
+                    bind.execute(text(_index_sql(name, table, columns, unique, postgresql_where, only=True)))
+                    continue
+                child_index = f"{relname}_{name}"[:_MAX_IDENTIFIER]
+                index_of[relname] = child_index
+                if isleaf:
+                    _drop_invalid_index(bind, child_index)
+                    logger.info("Building %s on partition %s", child_index, relname)
+                    bind.execute(text(_index_sql(child_index, relname, columns, unique, postgresql_where, concurrently=True)))
+                else:
+                    bind.execute(text(_index_sql(child_index, relname, columns, unique, postgresql_where, only=True)))
+            # Attach dari level terdalam: index parent menjadi valid setelah semua anaknya ter-attach
+            for relname, parent, isleaf, level in sorted(tree, key=lambda row: -row[3]):
+                if level == 0:
+                    continue
+                attached = bind.execute(
+                    text("SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent)"),
+                    {"child": index_of[relname], "parent": index_of[parent]},
+                ).scalar()
+                if not attached:
+                    bind.execute(text(f"ALTER INDEX {index_of[parent]} ATTACH PARTITION {index_of[relname]}"))
+        finally:
+            bind.execute(text("SELECT set_config('statement_timeout', :value, false)"), {"value": previous_timeout})
+
+
+def drop_index_concurrently(name: str, table: Optional[str] = None) -> None:
+    """Drop an index without blocking reads/writes (for partitioned tables a plain DROP is required)."""
+    if table is not None and _is_partitioned(op.get_bind(), table):
+        run_with_lock_retries(f"DROP INDEX IF EXISTS {name}")
+        return
+    with op.get_context().autocommit_block():
+        op.get_bind().execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def add_foreign_key_not_valid(
+    name: str,
+    source_table: str,
+    referent_table: str,
+    local_cols: Sequence[str],
+    remote_cols: Sequence[str],
+    ondelete: Optional[str] = None,
+) -> None:
+    """
+    Add a foreign key without scanning existing rows (only a brief lock on
+    both tables). New writes are checked immediately; call
+    validate_constraint() afterwards to check the existing rows.
+    """
+    run_with_lock_retries(
+        f"ALTER TABLE {source_table} ADD CONSTRAINT {name} FOREIGN KEY ({', '.join(local_cols)}) "
+        f"REFERENCES {referent_table} ({', '.join(remote_cols)})"
+        + (f" ON DELETE {ondelete}" if ondelete else "")
+        + " NOT VALID"
+    )
+
+
+def add_check_not_valid(name: str, table: str, condition: str) -> None:
+    run_with_lock_retries(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID")
+
+
+def validate_constraint(table: str, name: str) -> None:
+    """VALIDATE only takes SHARE UPDATE EXCLUSIVE, so reads and writes continue while it scans."""
+    bind = op.get_bind()
+    bind.execute(text("SET LOCAL statement_timeout = 0"))
+    run_with_lock_retries(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def set_not_null(table: str, column: str) -> None:
+    """
+    SET NOT NULL without the full-table scan under ACCESS EXCLUSIVE: a
+    validated CHECK (column IS NOT NULL) lets PostgreSQL skip the scan.
+    """
+    check_name = f"{table}_{column}_not_null"[:_MAX_IDENTIFIER]
+    add_check_not_valid(check_name, table, f"{column} IS NOT NULL")
+    validate_constraint(table, check_name)
+    run_with_lock_retries(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+    run_with_lock_retries(f"ALTER TABLE {table} DROP CONSTRAINT {check_name}")
+
+
+def batched_backfill(
+    table: str,
+    set_sql: str,
+    where: Optional[str] = None,
+    key: str = "id",
+    batch_size: int = 5000,
+    pause: float = 0.1,
+    params: Optional[dict] = None,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> int:
+    """
+    UPDATE a large table in key ranges of `batch_size`, committing each
+    batch and sleeping `pause` seconds in between so replication and
+    autovacuum keep up and row locks are held only briefly.
+
+    `where` must make the update idempotent (e.g. "col IS NULL"): an
+    interrupted backfill is resumed simply by running it again. Progress
+    is logged every batch (or passed to `progress(done_rows, last_key, fraction)`).
+    Returns the number of updated rows.
+    """
+    params = dict(params or {})
+    updated = 0
+    started = time.monotonic()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(text(f"SELECT min({key}), max({key}) FROM {table}")).one()
+        if low is None:
+            return 0
+        span = max(high - low + 1, 1)
+        condition = f" AND ({where})" if where else ""
+        statement = text(
+            f"UPDATE {table} SET {set_sql} WHERE {key} >= :_lo AND {key} < :_hi{condition}"
+        )
+
+        lo = low
+        while lo <= high:
+            hi = lo + batch_size
+            result = bind.execute(statement, {**params, "_lo": lo, "_hi": hi})
+            updated += result.rowcount or 0
+            fraction = min((hi - low) / span, 1.0)
+            if progress is not None:
+                progress(updated, hi, fraction)
+            else:
+                elapsed = time.monotonic() - started
+                eta = elapsed / fraction - elapsed if fraction else 0
+                logger.info("%s backfill: %5.1f%% (%d rows, %.0fs elapsed, ~%.0fs left)",
+                            table, fraction * 100, updated, elapsed, eta)
+            lo = hi
+            if pause:
+                time.sleep(pause)
+    return updated
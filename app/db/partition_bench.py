@@ -0,0 +1,144 @@
+# app/db/partition_bench.py
+
+"""
+Per-tenant latency of the product queries on the partitioned `products`
+table, with tenant sizes skewed like production.
+
+The tenants are the synthetic companies of app/seed_data.py, whose product
+counts follow a Zipf curve (--skew). Generate them first, or let this
+script do it with --generate:
+
+    python -m app.seed_data --companies 50 --products-per-company 20000 --skew 1.1 --reset
+    python -m app.db.partition_bench --samples 200
+
+    python -m app.db.partition_bench --generate --companies 50 --products-per-company 2000
+
+For every tenant (largest first) the hot statements of app/db/queries.py
+are executed the way products.py executes them, with the partition key,
+plus product_by_id without it to show what pruning saves. Printed are the
+partition holding the tenant and p50/p99 latencies in milliseconds.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import queries
+from app.db.connection import engine
+from app.seed_data import BENCH_PREFIX, generate_synthetic_data, parse_args as seed_data_args
+
+
+@dataclass
+class TenantReport:
+    rank: int
+    company_id: int
+    products: int
+    partition: str
+    # Nama query -> latency (detik) per eksekusi
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+
+    def percentile(self, name: str, q: float) -> float:
+        samples = sorted(self.latencies.get(name, ()))
+        return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else float("nan")
+
+
+def _cases(company_id: int, product_id: int, sku: str) -> List[Tuple[str, Any, Dict[str, Any]]]:
+    """(name, statement, params) as the endpoints in products.py execute them."""
+    statement, params = queries.product_list(company_id, True, 0, 100)
+    return [
+        ("by_id", queries.product_by_id(True), {"product_id": product_id, "company_id": company_id}),
+        # Tanpa kunci partisi: semua partisi dipindai lewat index id-nya masing-masing
+        ("by_id_no_key", queries.product_by_id(False), {"product_id": product_id, "company_id": None}),
+        ("by_sku", queries.product_by_sku(), {"company_id": company_id, "sku": sku}),
+        ("list", statement, params),
+    ]
+
+
+async def _tenants() -> List[Tuple[int, int, str]]:
+    """(company_id, live products, partition) of the synthetic companies, largest first."""
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT c.id, count(p.id), min(p.tableoid::regclass::text) "
+            "FROM companies c LEFT JOIN products p ON p.company_id = c.id AND p.deleted_at IS NULL "
+            "WHERE c.name LIKE :pattern GROUP BY c.id ORDER BY count(p.id) DESC, c.id"
+        ), {"pattern": f"{BENCH_PREFIX.title()} Company %"})
+        return [(company_id, count, partition or "-") for company_id, count, partition in result.all()]
+
+
+async def bench_tenant(rank: int, company_id: int, products: int, partition: str, samples: int, seed: int) -> TenantReport:
+    report = TenantReport(rank, company_id, products, partition)
+    rng = random.Random(seed * 1_000_003 + company_id)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        result = await session.execute(
+            text("SELECT id, sku FROM products WHERE company_id = :company_id AND deleted_at IS NULL ORDER BY id"),
+            {"company_id": company_id},
+        )
+        keys = result.all()
+        if not keys:
+            return report
+        # Satu putaran pemanasan: rencana query dan cache halaman tidak ikut diukur
+        for _ in range(2):
+            report.latencies.clear()
+            for _ in range(samples):
+                product_id, sku = rng.choice(keys)
+                for name, statement, params in _cases(company_id, product_id, sku):
+                    started = time.perf_counter()
+                    (await session.execute(statement, params)).scalars().all()
+                    report.latencies.setdefault(name, []).append(time.perf_counter() - started)
+                session.expunge_all() # Identity map tidak boleh membuat eksekusi berikutnya lebih murah
+    return report
+
+
+async def run(tenants: Optional[int], samples: int, seed: int) -> List[TenantReport]:
+    rows = [(rank, *row) for rank, row in enumerate(await _tenants(), start=1)]
+    if tenants is not None and len(rows) > tenants:
+        # Terbesar, terkecil, dan yang di antaranya dengan jarak rank yang sama
+        step = (len(rows) - 1) / max(tenants - 1, 1)
+        rows = [rows[round(i * step)] for i in range(tenants)]
+    try:
+        return [await bench_tenant(*row, samples, seed) for row in rows]
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-tenant product query latency with skewed tenant sizes.")
+    parser.add_argument("--samples", type=int, default=200, help="Executions of every query per tenant")
+    parser.add_argument("--tenants", type=int, help="Benchmark this many tenants spread over the size ranking (default: all)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--generate", action="store_true", help="(Re)generate the synthetic tenants first (app/seed_data.py)")
+    parser.add_argument("--companies", type=int, default=50, help="With --generate")
+    parser.add_argument("--products-per-company", type=int, default=2000, help="With --generate")
+    parser.add_argument("--skew", type=float, default=1.1, help="With --generate: Zipf exponent of tenant sizes")
+    args = parser.parse_args()
+
+    if args.generate:
+        asyncio.run(generate_synthetic_data(seed_data_args([
+            "--companies", str(args.companies), "--products-per-company", str(args.products_per_company),
+            "--skew", str(args.skew), "--seed", str(args.seed), "--reset",
+        ])))
+
+    reports = asyncio.run(run(args.tenants, args.samples, args.seed))
+    if not reports:
+        print("No synthetic tenants found; run with --generate or python -m app.seed_data --companies N first.")
+        return 1
+
+    names = [name for name, _, _ in _cases(0, 0, "")]
+    print(f"{'rank':>4} {'company':>8} {'products':>9} {'partition':18}" + "".join(f" {name + ' p50/p99':>22}" for name in names))
+    for report in reports:
+        print(
+            f"{report.rank:>4} {report.company_id:>8} {report.products:>9} {report.partition:18}"
+            + "".join(f" {report.percentile(name, 0.5):>10.2f}/{report.percentile(name, 0.99):<11.2f}" for name in names)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
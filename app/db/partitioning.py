@@ -0,0 +1,154 @@
+# app/db/partitioning.py
+
+"""
+Helpers for the partitioned tables: `products` (by company) and
+`audit_log` (by month).
+
+Layout of `products` (see migration 7c41e0b9d2a3):
+
+    products                    PARTITION BY LIST (company_id)
+    ├── products_c<company_id>  FOR VALUES IN (<company_id>)   -- dedicated, large tenants
+    └── products_default        DEFAULT, PARTITION BY HASH (company_id)
+        ├── products_h0         MODULUS N, REMAINDER 0
+        └── ...
+
+Small tenants share the hash partitions; a tenant that grows large enough to
+hurt its neighbours is promoted to its own LIST partition, typically from an
+Alembic migration:
+
+    from app.db.partitioning import promote_company_partition
+
+    def upgrade() -> None:
+        promote_company_partition(op.get_bind(), company_id=42)
+
+All functions take a synchronous SQLAlchemy Connection (what `op.get_bind()`
+returns) and run inside the caller's transaction.
+
+Per-tenant query latency with Zipf-skewed tenant sizes (to decide which
+tenants to promote): python -m app.db.partition_bench --generate
+"""
+
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+PRODUCTS_HASH_MODULUS = 8
+
+
+def company_partition_name(company_id: int) -> str:
+    return f"products_c{int(company_id)}"
+
+
+def hash_partition_names(modulus: int = PRODUCTS_HASH_MODULUS) -> list:
+    return [f"products_h{remainder}" for remainder in range(modulus)]
+
+
+def create_partition_layout(conn: Connection, modulus: int = PRODUCTS_HASH_MODULUS) -> None:
+    """Create the DEFAULT partition and its HASH sub-partitions under an empty partitioned `products`."""
+    conn.execute(text(
+        "CREATE TABLE products_default PARTITION OF products DEFAULT PARTITION BY HASH (company_id)"
+    ))
+    for remainder, name in enumerate(hash_partition_names(modulus)):
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF products_default "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        ))
+
+
+def promote_company_partition(conn: Connection, company_id: int) -> None:
+    """
+    Move one tenant's products out of the shared hash partitions into a dedicated LIST partition.
+
+    The rows are copied while the new table is still detached, then removed
+    from the default partition, and finally the table is attached. ATTACH
+    re-checks the default partition, so this holds a lock on products_default
+    for the duration of the move.
+    """
+    company_id = int(company_id)
+    name = company_partition_name(company_id)
+    conn.execute(text(
+        f"CREATE TABLE {name} (LIKE products INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    conn.execute(
+        text(f"INSERT INTO {name} SELECT * FROM products_default WHERE company_id = :company_id"),
+        {"company_id": company_id},
+    )
+    conn.execute(
+        text("DELETE FROM products_default WHERE company_id = :company_id"),
+        {"company_id": company_id},
+    )
+    # Constraint CHECK mempercepat ATTACH (PostgreSQL tidak perlu memindai partisi baru)
+    conn.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_company_check CHECK (company_id = {company_id})"
+    ))
+    conn.execute(text(f"ALTER TABLE products ATTACH PARTITION {name} FOR VALUES IN ({company_id})"))
+    conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_company_check"))
+
+
+def demote_company_partition(conn: Connection, company_id: int) -> None:
+    """Reverse of promote_company_partition: fold a dedicated partition back into the hash partitions."""
+    name = company_partition_name(company_id)
+    conn.execute(text(f"ALTER TABLE products DETACH PARTITION {name}"))
+    conn.execute(text(f"INSERT INTO products SELECT * FROM {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
+
+
+# --- audit_log ---
+#
+#     audit_log                  PARTITION BY RANGE (changed_at)
+#     ├── audit_log_y2025m07     FOR VALUES FROM ('2025-07-01 UTC') TO ('2025-08-01 UTC')
+#     ├── ...
+#     └── audit_log_default      DEFAULT -- jaring pengaman jika job partisi terlambat
+#
+# Partisi bulan depan dibuat lebih awal oleh job scheduler `maintain_audit_partitions`,
+# sehingga partisi DEFAULT normalnya kosong. Retensi = DROP partisi lama, bukan DELETE.
+
+AUDIT_DEFAULT_PARTITION = "audit_log_default"
+
+
+def month_start(day: date, months_ahead: int = 0) -> date:
+    """First day of the month `months_ahead` months after `day`'s month (negative goes back)."""
+    index = day.year * 12 + day.month - 1 + months_ahead
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def audit_partition_name(month: date) -> str:
+    return f"audit_log_y{month.year:04d}m{month.month:02d}"
+
+
+def create_audit_partitions(conn: Connection, first_month: date, count: int) -> List[str]:
+    """Create the monthly partitions starting at `first_month` that do not exist yet; returns the new names."""
+    existing = {
+        name for (name,) in conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'audit_log'::regclass"
+        ))
+    }
+    created = []
+    for offset in range(count):
+        start = month_start(first_month, offset)
+        name = audit_partition_name(start)
+        if name in existing:
+            continue
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF audit_log "
+            f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{month_start(start, 1).isoformat()} 00:00:00+00')"
+        ))
+        created.append(name)
+    return created
+
+
+def drop_audit_partitions_before(conn: Connection, month: date) -> List[str]:
+    """Drop the monthly partitions older than `month` (retention); returns the dropped names."""
+    dropped = []
+    for (name,) in conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'audit_log'::regclass AND c.relname LIKE 'audit_log_y%' ORDER BY c.relname"
+    )).all():
+        if name >= audit_partition_name(month):
+            break
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
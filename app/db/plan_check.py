@@ -0,0 +1,490 @@
+# app/db/plan_check.py
+
+"""
+EXPLAIN-based plan checks for the endpoint queries, with a stored baseline.
+
+Run against a database loaded with a large seed (small tables are always
+seq-scanned because that is genuinely cheaper, so the check is meaningless
+on a near-empty DB):
+
+    python -m app.db.plan_check --analyze                      # check against the baseline
+    python -m app.db.plan_check --analyze --update-baseline    # accept the current plans
+
+Two kinds of checks:
+  - statement checks (CHECKS) build the same statement the endpoint
+    executes and assert that the expected index is used;
+  - endpoint checks (ENDPOINT_CHECKS) call the endpoint in-process through
+    the ASGI app and capture every SELECT it sends to the database
+    (before_cursor_execute), so queries added later to an endpoint are
+    covered without writing a check for them. Their baseline entries are
+    keyed by a fingerprint of the SQL text (bind values and the length of
+    expanded IN lists left out), not by execution order, so a query added
+    to an endpoint shows up as new without shifting the others.
+Every query is EXPLAINed with representative parameters taken from the
+data. A query fails when it seq-scans a large table (CHECKS' `tables`, or
+any table with at least --large-table-rows rows), when its estimated cost
+exceeds its `max_cost` or --max-cost, or when the cost grew by more than
+--cost-tolerance over the baseline. Plan shapes (node types with the
+relations and indexes they touch) are compared with the baseline and
+printed as a unified diff when they changed; --strict fails on that too.
+
+Index and relation names of partitions are resolved to their partitioned
+parent, so `products_h3_company_id_is_active_id_idx` counts as
+`ix_products_company_active`.
+"""
+
+import argparse
+import asyncio
+import difflib
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+from sqlalchemy import event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.connection import engine
+from app.db.soft_delete import INCLUDE_DELETED, SOFT_DELETE_APPLIED, exclude_deleted
+from app.models.product import Product as ProductModel
+from app.api.v1.endpoints.products import product_list_query
+from app.api.v1.endpoints.users import user_list_query
+
+
+@dataclass
+class SampleParams:
+    company_id: int
+    product_id: int
+    user_company_id: Optional[int]
+    # Outlet dengan staf terbanyak (dan company-nya)
+    user_outlet_company_id: Optional[int] = None
+    user_outlet_id: Optional[int] = None
+
+
+DEFAULT_BASELINE = Path("plan_baseline.json")
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    # Statement, atau (statement registry, parameter) untuk app/db/queries.py
+    build: Optional[Callable[[SampleParams], Any]]
+    # Tabel besar yang tidak boleh di-seq-scan
+    tables: Set[str]
+    # Minimal salah satu index ini harus dipakai (kosong = tidak diperiksa)
+    expect_indexes: Set[str]
+    max_cost: Optional[float] = None
+
+
+@dataclass
+class EndpointCheck:
+    name: str
+    # Path beserta query string, mis. f"/products/?company_id={p.company_id}"
+    path: Callable[[SampleParams], str]
+    tables: Set[str] = field(default_factory=set)
+    max_cost: Optional[float] = None
+
+
+@dataclass
+class PlanReport:
+    check: PlanCheck
+    sql: str
+    indexes: Set[str] = field(default_factory=set)
+    seq_scans: Set[str] = field(default_factory=set)
+    total_cost: float = 0.0
+    shape: List[str] = field(default_factory=list)
+    failures: List[str] = field(default_factory=list)
+    # Unified diff bentuk plan terhadap baseline (kosong = sama atau belum ada baseline)
+    diff: List[str] = field(default_factory=list)
+    baseline_cost: Optional[float] = None
+
+
+CHECKS: List[PlanCheck] = [
+    PlanCheck(
+        "read_products?company_id",
+        lambda p: product_list_query(p.company_id, None, 0, 100),
+        {"products"},
+        {"ix_products_company_active", "ix_products_company_live"},
+    ),
+    PlanCheck(
+        "read_products?company_id&is_active",
+        lambda p: product_list_query(p.company_id, True, 0, 100),
+        {"products"},
+        {"ix_products_company_active"},
+    ),
+    PlanCheck(
+        "read_product_by_id?company_id",
+        lambda p: select(ProductModel).where(ProductModel.id == p.product_id, ProductModel.company_id == p.company_id),
+        {"products"},
+        {"products_pkey"},
+    ),
+    PlanCheck(
+        "read_users?company_id&is_active&is_superuser",
+        lambda p: user_list_query(p.user_company_id, True, False, 0, 100),
+        {"users"},
+        {"ix_users_company_active_superuser"},
+    ),
+    PlanCheck(
+        "read_users (outlet scope)",
+        lambda p: user_list_query(p.user_outlet_company_id, None, None, 0, 100, outlet_id=p.user_outlet_id),
+        {"users"},
+        {"ix_users_outlet_live"},
+    ),
+]
+
+
+ENDPOINT_CHECKS: List[EndpointCheck] = [
+    EndpointCheck("GET /products/?company_id", lambda p: f"/products/?company_id={p.company_id}", {"products"}),
+    EndpointCheck(
+        "GET /products/?company_id&is_active",
+        lambda p: f"/products/?company_id={p.company_id}&is_active=true",
+        {"products"},
+    ),
+    EndpointCheck(
+        "GET /products/{id}?company_id",
+        lambda p: f"/products/{p.product_id}?company_id={p.company_id}",
+        {"products"},
+    ),
+    EndpointCheck(
+        "GET /users/?company_id&is_active",
+        lambda p: f"/users/?company_id={p.user_company_id}&is_active=true&is_superuser=false",
+        {"users"},
+    ),
+    EndpointCheck("GET /pricing/prices?company_id", lambda p: f"/pricing/prices?company_id={p.company_id}"),
+    EndpointCheck("GET /audit/?company_id", lambda p: f"/audit/?company_id={p.company_id}", {"audit_log"}),
+]
+
+def compile_sql(statement: Any) -> str:
+    """Render a statement with literal parameters so it can be EXPLAINed verbatim."""
+    # Filter soft-delete biasanya ditambahkan oleh Session; di sini kita compile tanpa Session
+    options = statement.get_execution_options()
+    if not options.get(INCLUDE_DELETED, False) and not options.get(SOFT_DELETE_APPLIED, False):
+        statement = exclude_deleted(statement)
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def walk_plan(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+async def _root_names(conn: AsyncConnection, names: Set[str]) -> Dict[str, str]:
+    """Map partition tables/indexes to their top-level partitioned parent."""
+    if not names:
+        return {}
+    result = await conn.execute(
+        text(
+            "SELECT n, COALESCE(pg_partition_root(to_regclass(n))::text, n) "
+            "FROM unnest(CAST(:names AS text[])) AS n"
+        ),
+        {"names": sorted(names)},
+    )
+    return {row[0]: row[1] for row in result}
+
+
+async def explain(conn: AsyncConnection, sql: str) -> Dict[str, Any]:
+    result = await conn.execute(text("EXPLAIN (FORMAT JSON) " + sql))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def sample_params(conn: AsyncConnection) -> SampleParams:
+    """Pick the largest tenant, where a bad plan hurts the most."""
+    row = (await conn.execute(text(
+        "SELECT company_id, min(id) FROM products GROUP BY company_id ORDER BY count(*) DESC LIMIT 1"
+    ))).first()
+    if row is None:
+        raise RuntimeError("products is empty; load a large seed first")
+    user_company_id = (await conn.execute(text(
+        "SELECT company_id FROM users WHERE company_id IS NOT NULL GROUP BY company_id ORDER BY count(*) DESC LIMIT 1"
+    ))).scalar()
+    user_outlet = (await conn.execute(text(
+        "SELECT company_id, outlet_id FROM users WHERE outlet_id IS NOT NULL "
+        "GROUP BY company_id, outlet_id ORDER BY count(*) DESC LIMIT 1"
+    ))).first()
+    return SampleParams(
+        company_id=row[0],
+        product_id=row[1],
+        user_company_id=user_company_id,
+        user_outlet_company_id=user_outlet[0] if user_outlet else None,
+        user_outlet_id=user_outlet[1] if user_outlet else None,
+    )
+
+
+def render_shape(node: Dict[str, Any], roots: Dict[str, str], depth: int = 0) -> List[str]:
+    """
+    Plan tree as indented lines: node type plus the relation/index it touches,
+    without costs. Identical sibling subtrees (e.g. one per partition) are
+    collapsed into one line marked "xN".
+    """
+    label = node["Node Type"]
+    if "Index Name" in node:
+        label += f" using {roots.get(node['Index Name'], node['Index Name'])}"
+    if "Relation Name" in node:
+        label += f" on {roots.get(node['Relation Name'], node['Relation Name'])}"
+    lines = ["  " * depth + label]
+
+    children: List[Tuple[List[str], int]] = []
+    for child in node.get("Plans", []):
+        rendered = render_shape(child, roots, depth + 1)
+        if children and children[-1][0] == rendered:
+            children[-1] = (rendered, children[-1][1] + 1)
+        else:
+            children.append((rendered, 1))
+    for rendered, count in children:
+        if count > 1:
+            rendered = [rendered[0] + f"  x{count}"] + rendered[1:]
+        lines.extend(rendered)
+    return lines
+
+
+async def large_tables(conn: AsyncConnection, min_rows: int) -> Set[str]:
+    """Tables (partitioned tables summed over their partitions) with at least `min_rows` estimated rows."""
+    result = await conn.execute(
+        text(
+            "SELECT COALESCE(pg_partition_root(c.oid), c.oid)::regclass::text "
+            "FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relkind = 'r' AND n.nspname = current_schema() "
+            "GROUP BY 1 HAVING sum(greatest(c.reltuples, 0)) >= :min_rows"
+        ),
+        {"min_rows": min_rows},
+    )
+    return set(result.scalars().all())
+
+
+async def check_plan(
+    conn: AsyncConnection, check: PlanCheck, sql: str, plan: Dict[str, Any], big_tables: Set[str] = frozenset()
+) -> PlanReport:
+    report = PlanReport(check=check, sql=sql, total_cost=plan.get("Total Cost", 0.0))
+
+    nodes = list(walk_plan(plan))
+    raw_names = {n["Index Name"] for n in nodes if "Index Name" in n}
+    raw_names |= {n["Relation Name"] for n in nodes if "Relation Name" in n}
+    roots = await _root_names(conn, raw_names)
+    report.shape = render_shape(plan, roots)
+
+    for node in nodes:
+        if "Index Name" in node:
+            report.indexes.add(roots.get(node["Index Name"], node["Index Name"]))
+        if node["Node Type"] == "Seq Scan":
+            relation = roots.get(node.get("Relation Name"), node.get("Relation Name"))
+            if relation in check.tables or relation in big_tables:
+                report.seq_scans.add(relation)
+
+    if report.seq_scans:
+        report.failures.append(f"Seq Scan on {', '.join(sorted(report.seq_scans))}")
+    if check.expect_indexes and not report.indexes & check.expect_indexes:
+        report.failures.append(
+            f"expected one of {sorted(check.expect_indexes)}, used {sorted(report.indexes) or 'none'}"
+        )
+    if check.max_cost is not None and report.total_cost > check.max_cost:
+        report.failures.append(f"cost {report.total_cost:.1f} exceeds max_cost {check.max_cost:.1f}")
+    return report
+
+
+async def run_check(
+    conn: AsyncConnection, check: PlanCheck, params: SampleParams, big_tables: Set[str] = frozenset()
+) -> PlanReport:
+    built = check.build(params)
+    if isinstance(built, tuple):
+        # Statement registry berisi bindparam(): parameter dikirim ke driver seperti di endpoint
+        statement, values = built
+        compiled = statement.compile(dialect=conn.dialect)
+        bound = compiled.construct_params(values)
+        sql = str(compiled)
+        plan = await explain_driver_sql(conn, sql, tuple(bound[name] for name in compiled.positiontup))
+        return await check_plan(conn, check, sql, plan, big_tables)
+    sql = compile_sql(built)
+    return await check_plan(conn, check, sql, await explain(conn, sql), big_tables)
+
+
+class SqlCapture:
+    """before_cursor_execute listener collecting the SELECTs sent while `active`."""
+
+    def __init__(self):
+        self.active = False
+        self.statements: List[Tuple[str, Any]] = []
+
+    def on_execute(self, _conn, _cursor, statement, parameters, _context, executemany) -> None:
+        if self.active and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append((statement, parameters))
+
+
+async def capture_endpoint_sql(check: EndpointCheck, params: SampleParams) -> List[Tuple[str, Any]]:
+    """Call the endpoint in-process and return the (statement, parameters) it executed."""
+    from app.core.cache import local_cache
+    from app.main import app # Baru dimuat di sini: pemeriksaan statement tidak butuh seluruh aplikasi
+
+    capture = SqlCapture()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture.on_execute)
+    try:
+        # Tanpa cache lokal, agar query endpoint benar-benar dikirim ke database
+        local_cache.flush()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://plan-check") as client:
+            capture.active = True
+            response = await client.get(settings.API_V1_STR + check.path(params))
+            capture.active = False
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture.on_execute)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{check.name}: HTTP {response.status_code} {response.text[:200]}")
+    return capture.statements
+
+
+async def explain_driver_sql(conn: AsyncConnection, statement: str, parameters: Any) -> Dict[str, Any]:
+    """EXPLAIN a captured statement with its original bind parameters (driver paramstyle)."""
+    result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters or ())
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def sql_fingerprint(statement: str) -> str:
+    """Stable id of a captured statement: its text without bind values or IN-list lengths."""
+    normalized = re.sub(r"\$\d+", "?", statement) # Placeholder asyncpg ($1, $2, ...)
+    normalized = re.sub(r"\?(\s*,\s*\?)+", "?", normalized) # IN (...) yang diekspansi sesuai jumlah nilai
+    normalized = " ".join(normalized.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+async def run_endpoint_check(
+    conn: AsyncConnection, check: EndpointCheck, params: SampleParams, big_tables: Set[str]
+) -> List[PlanReport]:
+    reports = []
+    seen: Dict[str, int] = {}
+    for statement, parameters in await capture_endpoint_sql(check, params):
+        # Statement yang sama dua kali dalam satu request mendapat nomor urut di antara kembarannya saja
+        fingerprint = sql_fingerprint(statement)
+        seen[fingerprint] = seen.get(fingerprint, 0) + 1
+        if seen[fingerprint] > 1:
+            fingerprint += f"/{seen[fingerprint]}"
+        query_check = PlanCheck(f"{check.name} [{fingerprint}]", None, check.tables, set(), check.max_cost)
+        plan = await explain_driver_sql(conn, statement, parameters)
+        reports.append(await check_plan(conn, query_check, statement, plan, big_tables))
+    return reports
+
+
+async def run_all(
+    analyze: bool = False,
+    checks: Optional[List[PlanCheck]] = None,
+    endpoint_checks: Optional[List[EndpointCheck]] = None,
+    large_table_rows: int = 10_000,
+) -> List[PlanReport]:
+    async with engine.connect() as conn:
+        if analyze:
+            await conn.execute(text("ANALYZE products"))
+            await conn.execute(text("ANALYZE users"))
+            await conn.execute(text("ANALYZE product_channel_prices"))
+            await conn.execute(text("ANALYZE audit_log"))
+        params = await sample_params(conn)
+        big_tables = await large_tables(conn, large_table_rows)
+        reports = [await run_check(conn, check, params, big_tables) for check in (checks if checks is not None else CHECKS)]
+        for check in (endpoint_checks if endpoint_checks is not None else ENDPOINT_CHECKS):
+            reports.extend(await run_endpoint_check(conn, check, params, big_tables))
+        return reports
+
+
+def load_baseline(path: Path) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8")).get("queries", {})
+
+
+def save_baseline(path: Path, reports: List[PlanReport]) -> None:
+    queries = {
+        report.check.name: {"sql": report.sql, "cost": round(report.total_cost, 2), "shape": report.shape}
+        for report in reports
+    }
+    path.write_text(json.dumps({"version": 1, "queries": queries}, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare_baseline(
+    reports: List[PlanReport], baseline: Dict[str, Dict[str, Any]], cost_tolerance: float, strict: bool = False
+) -> List[str]:
+    """Fill in diffs and cost regressions on the reports; returns baseline entries no longer seen."""
+    for report in reports:
+        entry = baseline.get(report.check.name)
+        if entry is None:
+            continue
+        report.baseline_cost = entry["cost"]
+        if entry["shape"] != report.shape:
+            report.diff = list(difflib.unified_diff(
+                entry["shape"], report.shape, fromfile="baseline", tofile="current", lineterm="",
+            ))
+            if strict:
+                report.failures.append("plan shape changed")
+        if report.baseline_cost > 0 and report.total_cost > report.baseline_cost * (1 + cost_tolerance):
+            growth = (report.total_cost / report.baseline_cost - 1) * 100
+            report.failures.append(
+                f"cost {report.total_cost:.1f} is {growth:.0f}% above baseline {report.baseline_cost:.1f}"
+            )
+    seen = {report.check.name for report in reports}
+    return sorted(name for name in baseline if name not in seen)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check endpoint query plans against indexes, cost limits and a baseline.")
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE on the checked tables first")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline file (JSON)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the current plans as the new baseline")
+    parser.add_argument("--max-cost", type=float, default=None, help="Fail any query whose estimated cost is higher")
+    parser.add_argument("--cost-tolerance", type=float, default=0.5,
+                        help="Allowed cost growth over the baseline (0.5 = +50%%)")
+    parser.add_argument("--large-table-rows", type=int, default=10_000,
+                        help="Tables with at least this many rows must not be seq-scanned")
+    parser.add_argument("--strict", action="store_true", help="Also fail when a plan shape differs from the baseline")
+    parser.add_argument("--no-endpoints", action="store_true", help="Only run the statement checks")
+    args = parser.parse_args()
+
+    reports = asyncio.run(run_all(
+        analyze=args.analyze,
+        endpoint_checks=[] if args.no_endpoints else None,
+        large_table_rows=args.large_table_rows,
+    ))
+    if args.max_cost is not None:
+        for report in reports:
+            if report.total_cost > args.max_cost:
+                report.failures.append(f"cost {report.total_cost:.1f} exceeds --max-cost {args.max_cost:.1f}")
+
+    if args.update_baseline:
+        save_baseline(args.baseline, reports)
+        print(f"Baseline with {len(reports)} queries written to {args.baseline}")
+    baseline = {} if args.update_baseline else load_baseline(args.baseline)
+    missing = compare_baseline(reports, baseline, args.cost_tolerance, args.strict)
+
+    failed = 0
+    for report in reports:
+        status = "FAIL" if report.failures else "ok"
+        cost = f"cost={report.total_cost:.1f}"
+        if report.baseline_cost is not None:
+            cost += f" (baseline {report.baseline_cost:.1f})"
+        elif baseline:
+            cost += " (new)"
+        print(f"[{status:4}] {report.check.name}  {cost}  indexes={sorted(report.indexes)}")
+        for failure in report.failures:
+            failed += 1
+            print(f"       - {failure}")
+        if report.failures:
+            print(f"       SQL: {report.sql}")
+        for line in report.diff:
+            print(f"       {line}")
+    for name in missing:
+        print(f"[gone] {name}  (in baseline, not executed any more)")
+        print(f"       SQL: {baseline[name]['sql']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
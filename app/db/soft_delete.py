@@ -0,0 +1,54 @@
+# app/db/soft_delete.py
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, event
+from sqlalchemy.orm import Mapped, Session, mapped_column, with_loader_criteria
+
+# Execution option untuk ikut mengambil baris yang sudah di-soft-delete:
+#   select(Product).execution_options(include_deleted=True)
+INCLUDE_DELETED = "include_deleted"
+# Statement yang kriteria soft-delete-nya sudah dipasang saat dibangun (app/db/queries.py)
+SOFT_DELETE_APPLIED = "soft_delete_applied"
+
+
+class SoftDeleteMixin:
+    """
+    Marker for models with a `deleted_at` column.
+
+    SELECTs issued through an ORM Session exclude rows whose deleted_at is set,
+    unless the statement carries execution_options(include_deleted=True).
+    Related objects loaded through relationships (e.g. Product.stock_uom) are
+    not filtered, so a live product still shows its UOM after that UOM is
+    soft-deleted.
+    """
+
+    # Dideklarasikan di mixin juga: lambda kriteria di exclude_deleted() dievaluasi terhadap mixin ini
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+def exclude_deleted(statement):
+    """Apply the soft-delete criteria to a statement explicitly (e.g. to compile or EXPLAIN it outside a Session)."""
+    return statement.options(
+        with_loader_criteria(
+            SoftDeleteMixin,
+            lambda cls: cls.deleted_at.is_(None),
+            include_aliases=True,
+            propagate_to_loaders=False,
+        )
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_soft_deleted(execute_state) -> None:
+    if (
+        not execute_state.is_select
+        or execute_state.is_column_load
+        or execute_state.is_relationship_load
+        or execute_state.execution_options.get(INCLUDE_DELETED, False)
+        or execute_state.execution_options.get(SOFT_DELETE_APPLIED, False)
+    ):
+        return
+
+    execute_state.statement = exclude_deleted(execute_state.statement)
@@ -0,0 +1,57 @@
+# app/db/writes.py
+
+"""
+Single-round-trip write helpers.
+
+`db.add(obj); await db.commit(); await db.refresh(obj)` followed by a
+re-select for relationships costs three round trips per write. These
+helpers issue one INSERT/UPDATE ... RETURNING and hand back the stored row
+(server defaults such as created_at/updated_at included) as a mapping, so
+the endpoint can build its response without touching the database again.
+Related reference data (UOM, company) comes from the in-memory snapshot in
+app/services/reference_data.py.
+
+They are Core statements on the mapped table: no ORM instance is created,
+so there is nothing to refresh or expire after commit. For the same reason
+the ORM flush events never see these writes; the helpers record them in the
+audit trail themselves (app/services/audit.py).
+"""
+
+from typing import Any, Dict, Iterable, Optional, Type
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.audit import record_insert, record_update
+
+
+async def insert_returning(db: AsyncSession, model: Type[Any], values: Dict[str, Any]) -> Dict[str, Any]:
+    """INSERT one row and return all its columns."""
+    table = model.__table__
+    result = await db.execute(insert(table).values(**values).returning(*table.c))
+    row = dict(result.mappings().one())
+    record_insert(db, model, row)
+    return row
+
+
+async def update_returning(
+    db: AsyncSession, model: Type[Any], criteria: Iterable[Any], values: Dict[str, Any], before: Any = None
+) -> Optional[Dict[str, Any]]:
+    """
+    UPDATE the row matching `criteria` and return all its columns, or None if nothing matched.
+    `before` (the row as loaded before the update) lets the audit trail show old values.
+    """
+    table = model.__table__
+    statement = update(table).where(*criteria).returning(*table.c)
+    if values:
+        statement = statement.values(**values)
+    else:
+        # Tidak ada field yang berubah; tetap satu statement agar updated_at & RETURNING konsisten
+        statement = statement.values(updated_at=table.c.updated_at)
+    result = await db.execute(statement)
+    row = result.mappings().one_or_none()
+    if row is None:
+        return None
+    row = dict(row)
+    record_update(db, model, before, row, fields=values.keys())
+    return row
@@ -4,7 +4,17 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.db.connection import engine, Base
+from app.db import queries
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware, CompressionPolicy
+from app.services.audit import audit_writer
+from app.services.cache_bus import cache_bus
+from app.services.pricing import price_book
+from app.services.receipts import receipt_renderer
+from app.services.reference_data import reference_data
+from app.services.scheduler import scheduler
+from app.services.tokens import revocation_list
+from app.services.verification import verification_store
 import logging
 
 # Import the main API router for v1
@@ -20,8 +30,33 @@ async def lifespan(app: FastAPI):
     logging.info("Application startup...")
     # Optional: If you want to create tables automatically on startup (less common with Alembic)
     # Base.metadata.create_all(bind=engine)
+
+    # Statement hot query dibangun sekarang: yang rusak menghentikan startup dengan pesan jelas
+    logging.info("Hot queries built: %d.", queries.build_all())
+    # Mulai listener invalidasi cache lintas worker (LISTEN/NOTIFY)
+    await cache_bus.start()
+    # Muat override harga channel ke memori sebelum menerima request
+    await price_book.load()
+    # Snapshot UOM dan company untuk validasi FK dan GET /uoms/
+    await reference_data.load()
+    # Family token yang dicabut, agar access token yang sudah di-logout langsung ditolak
+    await revocation_list.sync()
+    # Penulis audit log (antrean in-process, INSERT multi-row)
+    await audit_writer.start()
+    # Sweeper kode verifikasi kedaluwarsa (backend memory)
+    await verification_store.start()
+    # Process pool render struk (ESC/POS, PDF)
+    await receipt_renderer.start()
+    # Job periodik (tepat sekali di antara semua worker/host)
+    await scheduler.start()
     yield
     # Shutdown event: Perform cleanup (e.g., close database connections if not handled by SQLAlchemy itself)
+    await scheduler.stop()
+    await receipt_renderer.stop()
+    await verification_store.stop()
+    # Setelah semua pekerjaan berhenti: tulis sisa antrean audit
+    await audit_writer.stop()
+    await cache_bus.stop()
     logging.info("Application shutdown.")
 
 # Initialize FastAPI app
@@ -51,6 +86,22 @@ app.add_middleware(
     allow_headers=["*"],            # Allow all headers in cross-origin requests
 )
 
+# Kompresi respons untuk terminal di jaringan lambat
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        route_policies={
+            # Respons auth berisi token/rahasia: jangan dikompres (BREACH)
+            f"{settings.API_V1_STR}/auth": CompressionPolicy(enabled=False),
+        },
+        cache_entries=settings.COMPRESSION_CACHE_ENTRIES,
+        cache_max_bytes=settings.COMPRESSION_CACHE_MAX_BYTES,
+    )
+
 # Include the main API router for version 1
 # All routes defined in api_router will be prefixed with /api/v1
 app.include_router(api_router, prefix=settings.API_V1_STR)
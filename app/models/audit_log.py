@@ -0,0 +1,38 @@
+# app/models/audit_log.py
+
+from typing import Any, Dict, Optional
+from sqlalchemy import BigInteger, Integer, String, DateTime, Index, Sequence
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class AuditLog(Base):
+    """
+    One change of an audited entity (append-only). Written in batches by
+    app/services/audit.py; partitioned by month on changed_at, see
+    app/db/partitioning.py.
+    """
+    __tablename__ = "audit_log"
+
+    # Tabel terpartisi: sequence biasa (bukan IDENTITY), dan kunci partisi wajib ada di primary key
+    id: Mapped[int] = mapped_column(BigInteger, Sequence("audit_log_id_seq"), primary_key=True)
+    changed_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True, nullable=False)
+
+    entity: Mapped[str] = mapped_column(String(50), nullable=False) # mis. "product", "user"
+    entity_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Tanpa foreign key: riwayat tetap utuh walaupun company/user dihapus
+    company_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    action: Mapped[str] = mapped_column(String(20), nullable=False) # insert / update / soft_delete / delete
+    actor_user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # {field: [lama, baru]}
+    changes: Mapped[Dict[str, Any]] = mapped_column(JSONB, nullable=False)
+
+    __table_args__ = (
+        # Riwayat satu entitas, dan audit satu company, terbaru lebih dulu
+        Index('ix_audit_log_entity', 'entity', 'entity_id', 'changed_at'),
+        Index('ix_audit_log_company', 'company_id', 'changed_at'),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
+
+    def __repr__(self):
+        return f"<AuditLog(id={self.id}, entity='{self.entity}', entity_id='{self.entity_id}', action='{self.action}')>"
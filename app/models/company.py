@@ -4,8 +4,9 @@ from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship # Tambahkan relationship di sini
 from typing import List # Tambahkan ini
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
-class Company(Base):
+class Company(SoftDeleteMixin, Base):
     __tablename__ = "companies"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
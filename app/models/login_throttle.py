@@ -0,0 +1,16 @@
+# app/models/login_throttle.py
+
+from sqlalchemy import String, Float, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class LoginThrottleBucket(Base):
+    __tablename__ = "login_throttle_buckets"
+
+    # Kunci bucket, mis. "user:alice" atau "ip:10.0.0.1"
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<LoginThrottleBucket(key='{self.key}', tokens={self.tokens})>"
@@ -5,8 +5,9 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
-class Outlet(Base):
+class Outlet(SoftDeleteMixin, Base):
     __tablename__ = "outlets"
 
     id = Column(Integer, primary_key=True, index=True)
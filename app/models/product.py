@@ -1,18 +1,20 @@
 # app/models/product.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, func, UniqueConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
-class Product(Base):
+class Product(SoftDeleteMixin, Base):
     __tablename__ = "products"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True) # PK (id, company_id) sudah meng-index id
+    # company_id adalah kunci partisi, jadi wajib menjadi bagian dari primary key
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), primary_key=True, nullable=False)
     name: Mapped[str] = mapped_column(String, index=True, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
-    sku: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False) # Stock Keeping Unit
-    barcode: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=True) # Optional barcode
+    sku: Mapped[str] = mapped_column(String, index=True, nullable=False) # Stock Keeping Unit (unik per company)
+    barcode: Mapped[str] = mapped_column(String, index=True, nullable=True) # Optional barcode (unik per company)
 
     # Foreign key to UOM for the standard stock unit of this product
     stock_uom_id: Mapped[int] = mapped_column(Integer, ForeignKey("uoms.id"), nullable=False)
@@ -29,10 +31,16 @@ class Product(Base):
     company: Mapped["Company"] = relationship("Company", back_populates="products")
     stock_uom: Mapped["UOM"] = relationship("UOM", back_populates="products") # Assuming UOM will have 'products' back_populates
 
-    # Unique constraint for name and sku within a company (if needed, otherwise remove company_id from this)
+    # Unique constraint for name, sku and barcode within a company.
+    # Tabel dipartisi LIST (company_id) dengan partisi DEFAULT ber-HASH, lihat app/db/partitioning.py.
     __table_args__ = (
         UniqueConstraint('name', 'company_id', name='_name_company_uc'),
         UniqueConstraint('sku', 'company_id', name='_sku_company_uc'),
+        UniqueConstraint('barcode', 'company_id', name='_barcode_company_uc'),
+        # Index sesuai bentuk query read_products; hanya baris hidup (soft-delete dikecualikan secara default)
+        Index('ix_products_company_active', 'company_id', 'is_active', 'id', postgresql_where=text('deleted_at IS NULL')),
+        Index('ix_products_company_live', 'company_id', 'id', postgresql_where=text('deleted_at IS NULL')),
+        {"postgresql_partition_by": "LIST (company_id)"},
     )
 
 
@@ -0,0 +1,47 @@
+# app/models/product_channel_price.py
+
+from typing import Optional
+from sqlalchemy import Integer, Boolean, DateTime, Float, ForeignKey, ForeignKeyConstraint, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
+
+class ProductChannelPrice(SoftDeleteMixin, Base):
+    """
+    Price override for a product on a sales channel, optionally limited to one
+    outlet and/or a validity window. Without a matching override the product's
+    base_price applies. Resolution happens in memory, see app/services/pricing.py.
+    """
+    __tablename__ = "product_channel_prices"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    sales_channel_id: Mapped[int] = mapped_column(Integer, ForeignKey("sales_channels.id"), nullable=False)
+    outlet_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("outlets.id"), nullable=True) # NULL = semua outlet
+
+    price: Mapped[float] = mapped_column(Float, nullable=False)
+    valid_from: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True) # NULL = sejak awal
+    valid_to: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True) # NULL = tanpa batas (eksklusif)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    deleted_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    sales_channel = relationship("SalesChannel", back_populates="prices")
+
+    __table_args__ = (
+        # products dipartisi per company, jadi FK harus memuat company_id
+        ForeignKeyConstraint(['product_id', 'company_id'], ['products.id', 'products.company_id'],
+                             name='fk_product_channel_prices_product'),
+        # Reload incremental per produk
+        Index('ix_product_channel_prices_product', 'product_id', postgresql_where=text('deleted_at IS NULL')),
+        # read_channel_prices per company, dipersempit ke outlet pemanggil
+        Index('ix_product_channel_prices_company_outlet', 'company_id', 'outlet_id', 'id',
+              postgresql_where=text('deleted_at IS NULL')),
+    )
+
+    def __repr__(self):
+        return f"<ProductChannelPrice(product_id={self.product_id}, channel={self.sales_channel_id}, price={self.price})>"
@@ -0,0 +1,33 @@
+# app/models/product_uom_conversion.py
+
+from sqlalchemy import Integer, DateTime, Float, ForeignKey, ForeignKeyConstraint, CheckConstraint, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class ProductUOMConversion(Base):
+    """
+    How many stock units of a product one `uom_id` is (e.g. sugar stocked in kg:
+    1 gram = 0.001). Needed wherever a recipe uses a product in a UOM other than
+    its stock UOM.
+    """
+    __tablename__ = "product_uom_conversions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    uom_id: Mapped[int] = mapped_column(Integer, ForeignKey("uoms.id"), nullable=False)
+    factor: Mapped[float] = mapped_column(Float, nullable=False) # Satuan stok per 1 uom_id
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # products dipartisi per company, jadi FK harus memuat company_id
+        ForeignKeyConstraint(['product_id', 'company_id'], ['products.id', 'products.company_id'],
+                             name='fk_product_uom_conversions_product'),
+        UniqueConstraint('company_id', 'product_id', 'uom_id', name='_product_uom_conversion_uc'),
+        CheckConstraint('factor > 0', name='ck_product_uom_conversions_factor_positive'),
+    )
+
+    def __repr__(self):
+        return f"<ProductUOMConversion(product_id={self.product_id}, uom_id={self.uom_id}, factor={self.factor})>"
@@ -0,0 +1,41 @@
+# app/models/recipe_material.py
+
+from sqlalchemy import Integer, DateTime, Float, ForeignKey, ForeignKeyConstraint, Index, CheckConstraint, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class RecipeMaterial(Base):
+    """
+    One line of a product's bill of materials: `quantity` of `material_product_id`,
+    expressed in `uom_id`, consumed per one stock unit of `product_id`. A material
+    that has a recipe of its own is a sub-recipe (e.g. a syrup made in-house) and
+    is exploded further, see app/services/recipes.py.
+    """
+    __tablename__ = "recipe_materials"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False) # Menu / sub-resep yang dibuat
+    material_product_id: Mapped[int] = mapped_column(Integer, nullable=False) # Bahan yang dipakai
+    quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    uom_id: Mapped[int] = mapped_column(Integer, ForeignKey("uoms.id"), nullable=False) # Satuan `quantity`
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # products dipartisi per company, jadi FK harus memuat company_id
+        ForeignKeyConstraint(['product_id', 'company_id'], ['products.id', 'products.company_id'],
+                             name='fk_recipe_materials_product'),
+        ForeignKeyConstraint(['material_product_id', 'company_id'], ['products.id', 'products.company_id'],
+                             name='fk_recipe_materials_material'),
+        # Juga index untuk memuat resep per produk (company_id, product_id)
+        UniqueConstraint('company_id', 'product_id', 'material_product_id', name='_recipe_material_uc'),
+        CheckConstraint('quantity > 0', name='ck_recipe_materials_quantity_positive'),
+        CheckConstraint('material_product_id <> product_id', name='ck_recipe_materials_not_self'),
+        # "Dipakai di mana": produk induk dari sebuah bahan
+        Index('ix_recipe_materials_material', 'company_id', 'material_product_id'),
+    )
+
+    def __repr__(self):
+        return f"<RecipeMaterial(product_id={self.product_id}, material={self.material_product_id}, quantity={self.quantity})>"
@@ -0,0 +1,35 @@
+# app/models/refresh_token.py
+
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class RefreshToken(Base):
+    """
+    One issued refresh token. Only an HMAC of the token is stored; the token
+    itself is known to the client alone. Every refresh rotates the token: the
+    row is marked rotated and a new row in the same family is inserted.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Semua token hasil rotasi dari satu login berbagi family; reuse mencabut seluruh family
+    family_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True) # HMAC-SHA256 (hex)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    rotated_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    revoked_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Sinkronisasi daftar pencabutan hanya membaca pencabutan terbaru
+        Index('ix_refresh_tokens_revoked_at', 'revoked_at', postgresql_where=text('revoked_at IS NOT NULL')),
+        # Pembersihan token kedaluwarsa
+        Index('ix_refresh_tokens_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<RefreshToken(id={self.id}, user_id={self.user_id}, family_id='{self.family_id}')>"
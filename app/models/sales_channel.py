@@ -0,0 +1,29 @@
+# app/models/sales_channel.py
+
+from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, func, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
+
+class SalesChannel(SoftDeleteMixin, Base):
+    __tablename__ = "sales_channels"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), nullable=False)
+    code: Mapped[str] = mapped_column(String(50), nullable=False) # mis. "dine_in", "takeaway", "gofood"
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    deleted_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    prices = relationship("ProductChannelPrice", back_populates="sales_channel")
+
+    __table_args__ = (
+        UniqueConstraint('code', 'company_id', name='_channel_code_company_uc'),
+    )
+
+    def __repr__(self):
+        return f"<SalesChannel(code='{self.code}', company_id={self.company_id})>"
@@ -0,0 +1,25 @@
+# app/models/scheduler_lease.py
+
+from typing import Optional
+from sqlalchemy import String, Integer, Float, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    # Satu baris per job periodik; siapa pun yang memegang lease menjalankan job tersebut
+    job_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    owner: Mapped[Optional[str]] = mapped_column(String(255), nullable=True) # WORKER_ID pemegang lease
+    lease_until: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    next_run_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    last_started_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_finished_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_status: Mapped[Optional[str]] = mapped_column(String(20), nullable=True) # "ok", "error", "timeout"
+    last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    last_duration_seconds: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    run_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return f"<SchedulerLease(job_name='{self.job_name}', owner='{self.owner}')>"
@@ -0,0 +1,53 @@
+# app/models/terminal.py
+
+from typing import List, Optional
+from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
+
+class Terminal(SoftDeleteMixin, Base):
+    """
+    A registered POS terminal (device) of an outlet. The terminal proves its
+    identity with `secret` (issued once at registration, stored as an HMAC)
+    and cashiers log in on it with a PIN, see app/services/terminals.py.
+    """
+    __tablename__ = "terminals"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("companies.id"), nullable=False)
+    outlet_id: Mapped[int] = mapped_column(Integer, ForeignKey("outlets.id"), nullable=False)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+
+    secret_hash: Mapped[str] = mapped_column(String(64), nullable=False) # HMAC-SHA256 (hex) dari secret terminal
+    # Kunci HMAC untuk digest PIN di terminal ini; tidak pernah dikirim ke klien
+    pin_key: Mapped[str] = mapped_column(String(64), nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    deleted_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    pins: Mapped[List["TerminalUserPin"]] = relationship("TerminalUserPin", back_populates="terminal")
+
+    __table_args__ = (
+        Index('ix_terminals_outlet_live', 'outlet_id', 'id', postgresql_where=text('deleted_at IS NULL')),
+    )
+
+    def __repr__(self):
+        return f"<Terminal(id={self.id}, name='{self.name}', outlet_id={self.outlet_id})>"
+
+
+class TerminalUserPin(Base):
+    """A cashier enrolled on a terminal: HMAC(terminal.pin_key, user_id:pin)."""
+    __tablename__ = "terminal_user_pins"
+
+    terminal_id: Mapped[int] = mapped_column(Integer, ForeignKey("terminals.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    pin_digest: Mapped[str] = mapped_column(String(64), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    terminal: Mapped["Terminal"] = relationship("Terminal", back_populates="pins")
+
+    def __repr__(self):
+        return f"<TerminalUserPin(terminal_id={self.terminal_id}, user_id={self.user_id})>"
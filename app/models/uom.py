@@ -4,8 +4,9 @@ from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, UniqueC
 from sqlalchemy.orm import Mapped, mapped_column, relationship # Tambahkan relationship di sini
 from typing import List # Tambahkan ini jika belum ada
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
-class UOM(Base):
+class UOM(SoftDeleteMixin, Base):
     __tablename__ = "uoms"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
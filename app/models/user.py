@@ -1,11 +1,12 @@
 # app/models/user.py
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List, Optional
 from app.db.base import Base
+from app.db.soft_delete import SoftDeleteMixin
 
-class User(Base):
+class User(SoftDeleteMixin, Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -35,5 +36,13 @@ class User(Base):
     outlet: Mapped[Optional["Outlet"]] = relationship("Outlet", back_populates="users")
     # -----------------------------
 
+    # Index sesuai bentuk query read_users; hanya baris hidup (soft-delete dikecualikan secara default)
+    __table_args__ = (
+        Index('ix_users_company_active_superuser', 'company_id', 'is_active', 'is_superuser', 'id',
+              postgresql_where=text('deleted_at IS NULL')),
+        # read_users untuk staf outlet (scoping dari token): hanya baris outlet itu yang disentuh
+        Index('ix_users_outlet_live', 'outlet_id', 'id', postgresql_where=text('deleted_at IS NULL')),
+    )
+
     def __repr__(self):
         return f"<User(username='{self.username}', email='{self.email}')>"
\ No newline at end of file
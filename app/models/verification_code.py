@@ -0,0 +1,31 @@
+# app/models/verification_code.py
+
+from sqlalchemy import String, Integer, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class VerificationCode(Base):
+    """
+    Pending verification (login code or activation link) for
+    VERIFICATION_BACKEND=postgres; see app/services/verification.py.
+    Subject and secret are stored only as HMACs.
+    """
+    __tablename__ = "verification_codes"
+
+    key_hash: Mapped[str] = mapped_column(String(64), primary_key=True) # HMAC(purpose, subject)
+    purpose: Mapped[str] = mapped_column(String(32), nullable=False)
+    secret_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default="{}")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Pembersihan batch baris kedaluwarsa
+        Index('ix_verification_codes_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<VerificationCode(purpose='{self.purpose}', expires_at={self.expires_at})>"
@@ -0,0 +1,20 @@
+# app/schemas/audit.py
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+class AuditLogEntry(BaseModel):
+    id: int
+    changed_at: datetime
+    entity: str = Field(..., description="Audited entity type, e.g. 'product', 'user', 'channel_price'")
+    entity_id: str
+    company_id: Optional[int] = None
+    action: str = Field(..., description="insert, update, soft_delete or delete")
+    actor_user_id: Optional[int] = Field(None, description="User who made the change (None if unknown)")
+    changes: Dict[str, Any] = Field(..., description="Changed fields as {field: [old, new]}")
+
+    model_config = {
+        "from_attributes": True
+    }
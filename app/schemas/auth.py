@@ -37,4 +37,8 @@ class VerifyLoginCode(BaseModel):
 
 class UserPinLogin(BaseModel):
     username_or_email: str = Field(..., example="cashier_user" or "cashier@example.com")
-    pin: str = Field(..., min_length=6, max_length=6, example="543210")
\ No newline at end of file
+    pin: str = Field(..., min_length=6, max_length=6, example="543210")
+
+class TerminalPinLogin(UserPinLogin):
+    terminal_id: int = Field(..., example=1)
+    terminal_secret: str = Field(..., example="secret_issued_at_terminal_registration")
@@ -0,0 +1,91 @@
+# app/schemas/pricing.py
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamp tanpa zona waktu dianggap UTC: aturan harga dari DB selalu tz-aware
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+# --- Sales Channel ---
+class SalesChannelBase(BaseModel):
+    company_id: int = Field(..., description="ID of the company this channel belongs to")
+    code: str = Field(..., max_length=50, description="Channel code (e.g., 'dine_in', 'takeaway', 'gofood')")
+    name: str = Field(..., max_length=100, description="Display name of the channel")
+    is_active: bool = Field(True, description="Is the channel active?")
+
+class SalesChannelCreate(SalesChannelBase):
+    pass
+
+class SalesChannel(SalesChannelBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+# --- Product Channel Price ---
+class ProductChannelPriceBase(BaseModel):
+    company_id: int = Field(..., description="ID of the company (partition key of the product)")
+    product_id: int = Field(..., description="ID of the product")
+    sales_channel_id: int = Field(..., description="ID of the sales channel")
+    outlet_id: Optional[int] = Field(None, description="Limit the override to one outlet (null = all outlets)")
+    price: float = Field(..., gt=0, description="Selling price on this channel (must be greater than 0)")
+    valid_from: Optional[datetime] = Field(None, description="Start of validity (inclusive, null = always)")
+    valid_to: Optional[datetime] = Field(None, description="End of validity (exclusive, null = open-ended)")
+    is_active: bool = Field(True, description="Is the override active?")
+
+    @field_validator("valid_from", "valid_to")
+    @classmethod
+    def assume_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return _as_utc(value)
+
+    @model_validator(mode="after")
+    def check_window(self):
+        if self.valid_from and self.valid_to and self.valid_to <= self.valid_from:
+            raise ValueError("valid_to must be after valid_from.")
+        return self
+
+class ProductChannelPriceCreate(ProductChannelPriceBase):
+    pass
+
+class ProductChannelPrice(ProductChannelPriceBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+# --- Price resolution (cart pricing) ---
+class PriceResolveRequest(BaseModel):
+    company_id: int
+    sales_channel_id: int
+    outlet_id: Optional[int] = None
+    at: Optional[datetime] = Field(None, description="Point in time to price at (default: now; without a timezone: UTC)")
+    product_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+    @field_validator("at")
+    @classmethod
+    def assume_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return _as_utc(value)
+
+class ResolvedPrice(BaseModel):
+    product_id: int
+    found: bool
+    price: Optional[float] = None
+    source: Optional[str] = Field(None, description="'channel' when an override applied, 'base' otherwise")
+    price_rule_id: Optional[int] = None
+
+class PriceResolveResponse(BaseModel):
+    price_book_version: int
+    results: List[ResolvedPrice]
@@ -1,9 +1,9 @@
 # app/schemas/product.py
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 # Impor skema UOM yang baru kita buat
 from app.schemas.uom import UOMInDB # Menggunakan UOMInDB untuk representasi nested UOM
@@ -53,4 +53,80 @@ class ProductInDB(ProductBase):
 
 # Additional properties to return via API (same as ProductInDB for now)
 class Product(ProductInDB):
-    pass
\ No newline at end of file
+    pass
+
+# Batas jumlah id + SKU per request batch-get
+PRODUCT_BATCH_GET_MAX_ITEMS = 200
+
+# Request body for POST /products/batch-get (cart & receipt hydration)
+class ProductBatchGetRequest(BaseModel):
+    company_id: Optional[int] = Field(None, description="Company scope; required when resolving SKUs")
+    ids: List[int] = Field(default_factory=list, description="Product IDs to resolve")
+    skus: List[str] = Field(default_factory=list, description="SKUs to resolve within company_id")
+
+    @model_validator(mode="after")
+    def check_items(self):
+        total = len(self.ids) + len(self.skus)
+        if total == 0:
+            raise ValueError("Provide at least one id or sku.")
+        if total > PRODUCT_BATCH_GET_MAX_ITEMS:
+            raise ValueError(f"At most {PRODUCT_BATCH_GET_MAX_ITEMS} ids and skus per request.")
+        if self.skus and self.company_id is None:
+            raise ValueError("company_id is required when resolving by sku.")
+        return self
+
+# One result per requested key, in request order (ids first, then skus)
+class ProductBatchGetItem(BaseModel):
+    id: Optional[int] = None
+    sku: Optional[str] = None
+    found: bool
+    product: Optional[Product] = None
+
+class ProductBatchGetResponse(BaseModel):
+    results: List[ProductBatchGetItem]
+
+
+# Batas jumlah baris per request bulk-update
+PRODUCT_BULK_UPDATE_MAX_ITEMS = 50_000
+
+# One row of a bulk update; identify by id or sku, null fields are left unchanged
+class ProductBulkUpdateItem(BaseModel):
+    id: Optional[int] = None
+    sku: Optional[str] = Field(None, max_length=50)
+    base_price: Optional[float] = Field(None, gt=0)
+    is_active: Optional[bool] = None
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_key(self):
+        if (self.id is None) == (self.sku is None):
+            raise ValueError("Each item needs exactly one of id or sku.")
+        return self
+
+# Rule-based price change, e.g. +5% on all active products whose SKU starts with "BEV-"
+class ProductBulkPriceRule(BaseModel):
+    price_multiplier: float = Field(1.0, gt=0, description="New price = old price * multiplier + delta")
+    price_delta: float = Field(0.0, description="Added after the multiplier")
+    round_to: int = Field(2, ge=0, le=6, description="Decimal places of the resulting price")
+    is_active: Optional[bool] = Field(None, description="Only products with this active status")
+    sku_prefix: Optional[str] = Field(None, max_length=50, description="Only products whose SKU starts with this")
+    product_ids: Optional[List[int]] = Field(None, description="Only these product IDs")
+
+class ProductBulkUpdateRequest(BaseModel):
+    company_id: int = Field(..., description="All updated products belong to this company")
+    items: List[ProductBulkUpdateItem] = Field(default_factory=list)
+    rule: Optional[ProductBulkPriceRule] = None
+
+    @model_validator(mode="after")
+    def check_mode(self):
+        if bool(self.items) == (self.rule is not None):
+            raise ValueError("Provide either items or rule, not both.")
+        if len(self.items) > PRODUCT_BULK_UPDATE_MAX_ITEMS:
+            raise ValueError(f"At most {PRODUCT_BULK_UPDATE_MAX_ITEMS} items per request.")
+        return self
+
+class ProductBulkUpdateResponse(BaseModel):
+    updated: int
+    not_found_ids: List[int] = []
+    not_found_skus: List[str] = []
@@ -0,0 +1,61 @@
+# app/schemas/receipt.py
+
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+# text: teks polos (layar/preview), escpos: byte stream printer thermal, pdf: lampiran email
+ReceiptFormat = Literal["text", "escpos", "pdf"]
+
+# --- Receipt payload (dikirim oleh checkout) ---
+class ReceiptLine(BaseModel):
+    name: str = Field(..., max_length=255, description="Product name as printed")
+    quantity: float = Field(..., gt=0)
+    unit_price: float = Field(..., ge=0)
+    discount: float = Field(0, ge=0, description="Discount amount on this line")
+    total: float = Field(..., ge=0, description="Line total after discount")
+
+class ReceiptPayment(BaseModel):
+    method: str = Field(..., max_length=50, description="Payment method (e.g., 'cash', 'qris', 'card')")
+    amount: float = Field(..., gt=0)
+
+class Receipt(BaseModel):
+    transaction_id: str = Field(..., max_length=64, description="ID of the sales transaction")
+    company_id: int
+    outlet_id: Optional[int] = None
+    store_name: str = Field(..., max_length=255)
+    store_address: List[str] = Field(default_factory=list, max_length=4, description="Address lines under the store name")
+    cashier: Optional[str] = Field(None, max_length=100)
+    issued_at: datetime
+    lines: List[ReceiptLine] = Field(..., min_length=1, max_length=500)
+    subtotal: float = Field(..., ge=0)
+    discount: float = Field(0, ge=0)
+    tax: float = Field(0, ge=0)
+    total: float = Field(..., ge=0)
+    payments: List[ReceiptPayment] = Field(default_factory=list)
+    change: float = Field(0, ge=0)
+    footer: List[str] = Field(default_factory=list, max_length=4, description="Closing lines (e.g., 'Terima kasih')")
+
+class ReceiptRenderRequest(BaseModel):
+    receipt: Receipt
+    format: ReceiptFormat = "escpos"
+    template: str = Field("roll_58mm", description="Layout template (see app/services/receipt_layout.py)")
+
+# --- Reprint ---
+class ReprintItem(BaseModel):
+    transaction_id: str = Field(..., max_length=64)
+    format: ReceiptFormat = "escpos"
+    template: Optional[str] = Field(None, description="Default: the template of the original render")
+
+class ReprintRequest(BaseModel):
+    company_id: int
+    items: List[ReprintItem] = Field(..., min_length=1, max_length=200)
+
+class ReprintResult(BaseModel):
+    transaction_id: str
+    format: ReceiptFormat
+    status: Literal["ok", "not_found", "failed"]
+    content_hash: Optional[str] = None
+    cached: bool = False
+    content_base64: Optional[str] = None
@@ -0,0 +1,74 @@
+# app/schemas/recipe.py
+
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field, model_validator
+
+# --- Recipe (bill of materials) ---
+class RecipeMaterialBase(BaseModel):
+    material_product_id: int = Field(..., description="ID of the material (raw material or sub-recipe product)")
+    quantity: float = Field(..., gt=0, description="Quantity per one stock unit of the recipe's product")
+    uom_id: int = Field(..., description="UOM of the quantity (converted to the material's stock UOM)")
+
+class RecipeMaterial(RecipeMaterialBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
+
+class RecipeUpdate(BaseModel):
+    company_id: int
+    materials: List[RecipeMaterialBase] = Field(..., max_length=200, description="Replaces the whole recipe (empty = no recipe)")
+
+    @model_validator(mode="after")
+    def check_unique_materials(self):
+        material_ids = [material.material_product_id for material in self.materials]
+        if len(material_ids) != len(set(material_ids)):
+            raise ValueError("Each material may appear only once in a recipe.")
+        return self
+
+class Recipe(BaseModel):
+    company_id: int
+    product_id: int
+    materials: List[RecipeMaterial]
+
+# --- UOM conversion ---
+class ProductUOMConversionBase(BaseModel):
+    company_id: int
+    product_id: int
+    uom_id: int = Field(..., description="UOM being converted from")
+    factor: float = Field(..., gt=0, description="Stock units of the product per one uom_id (e.g. gram -> kg: 0.001)")
+
+class ProductUOMConversionCreate(ProductUOMConversionBase):
+    pass
+
+class ProductUOMConversion(ProductUOMConversionBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
+
+# --- Explosion ---
+class MaterialQuantity(BaseModel):
+    product_id: int = Field(..., description="ID of the raw material")
+    quantity: float = Field(..., description="Quantity in the material's stock UOM")
+    uom_id: int = Field(..., description="Stock UOM of the material")
+
+class BasketItem(BaseModel):
+    product_id: int
+    quantity: float = Field(..., gt=0)
+
+class BasketExplosionRequest(BaseModel):
+    company_id: int
+    items: List[BasketItem] = Field(..., min_length=1, max_length=500)
+
+class Explosion(BaseModel):
+    company_id: int
+    materials: List[MaterialQuantity]
@@ -0,0 +1,44 @@
+# app/schemas/terminal.py
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# --- Terminal ---
+class TerminalBase(BaseModel):
+    company_id: int = Field(..., description="ID of the company the terminal belongs to")
+    outlet_id: int = Field(..., description="ID of the outlet the terminal is installed at")
+    name: str = Field(..., max_length=100, description="Display name (e.g., 'Kasir 1')")
+
+class TerminalCreate(TerminalBase):
+    pass
+
+class Terminal(TerminalBase):
+    id: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
+
+class TerminalRegistered(Terminal):
+    # Hanya dikirim sekali saat registrasi; server hanya menyimpan HMAC-nya
+    terminal_secret: str = Field(..., description="Device credential; store it on the terminal")
+
+# --- PIN kasir ---
+class TerminalPinSet(BaseModel):
+    pin: str = Field(..., min_length=6, max_length=6, pattern=r"^\d{6}$", description="6-digit PIN")
+
+class RosterUser(BaseModel):
+    user_id: int
+    username: str
+    full_name: Optional[str] = None
+
+class TerminalRoster(BaseModel):
+    terminal_id: int
+    outlet_id: int
+    users: List[RosterUser]
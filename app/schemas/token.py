@@ -6,10 +6,16 @@ from typing import Optional
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None # Tukar di /auth/refresh; berotasi setiap dipakai
+    expires_in: Optional[int] = None # Umur access token (detik)
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
     # Tambahkan field lain yang mungkin ada di payload token jika diperlukan
     user_id: Optional[int] = None
     is_superuser: Optional[bool] = None
-    company_id: Optional[int] = None
\ No newline at end of file
+    company_id: Optional[int] = None
+    outlet_id: Optional[int] = None
\ No newline at end of file
@@ -14,6 +14,7 @@ class UserCreate(BaseModel):
     password: str = Field(..., min_length=8) # Password raw
     full_name: Optional[str] = Field(None, max_length=100)
     company_id: Optional[int] = None # Opsional, bisa null untuk superadmin
+    outlet_id: Optional[int] = None # NULL = staf tingkat company; default outlet pemanggil untuk staf outlet
     is_active: Optional[bool] = True
     is_superuser: Optional[bool] = False
 
@@ -24,6 +25,7 @@ class UserUpdate(BaseModel):
     password: Optional[str] = Field(None, min_length=8)
     full_name: Optional[str] = Field(None, max_length=100)
     company_id: Optional[int] = None
+    outlet_id: Optional[int] = None
     is_active: Optional[bool] = None
     is_superuser: Optional[bool] = None
 
@@ -31,6 +33,7 @@ class UserUpdate(BaseModel):
 class User(BaseModel):
     id: int
     company_id: Optional[int] = None
+    outlet_id: Optional[int] = None # NULL = staf tingkat company
     username: str
     email: EmailStr
     full_name: Optional[str] = None
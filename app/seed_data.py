@@ -2,10 +2,11 @@
 
 import os
 import sys
+import time
+import random
+import argparse
 import asyncio
-
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
+from datetime import datetime, timedelta, timezone
 
 # Tambahkan root proyek ke sys.path
 # Ini memastikan Python dapat menemukan 'app' sebagai package top-level
@@ -15,157 +16,302 @@ project_root = os.path.abspath(os.path.join(current_dir, '..'))
 sys.path.insert(0, project_root)
 
 # --- Setelah baris sys.path.insert, baru impor-impor lainnya ---
-from app.db.connection import engine, get_db
-from app.db.base import Base
-from app.models.role import Role
-from app.models.permission import Permission
-from app.models.user import User
-from app.models.user_role import UserRole
-from app.models.role_permission import RolePermission # Pastikan ini diimpor
-from app.models.company import Company
-from app.models.outlet import Outlet
+import asyncpg
+
+from app.db.connection import engine, get_db, RAW_DATABASE_URL
 from app.core.security import get_password_hash # Pastikan path ini benar untuk fungsi hashing password Anda
+from app.services.provisioning import INITIAL_SEED_SPEC, apply_seed_spec, load_seed_spec
 
-async def create_initial_data():
+async def create_initial_data(spec_path=INITIAL_SEED_SPEC, update: bool = False):
+    """
+    Apply the declarative seed spec (app/seeds/initial_data.json) in one transaction.
+    Idempotent: re-running it leaves existing rows alone (or updates them with update=True).
+    """
     async for session in get_db(): # Menggunakan generator get_db
         try:
-            print("Starting data seeding process...")
-
-            # --- Seed Companies ---
-            existing_company = await session.execute(select(Company).filter_by(name="Default Company"))
-            if not existing_company.scalar_one_or_none():
-                print("Creating Default Company...")
-                default_company = Company(
-                    name="Default Company",
-                    address="Jl. Raya Utama No. 123",
-                    phone_number="08123456789",
-                    email="info@default.com",
-                    is_active=True
-                )
-                session.add(default_company)
-                await session.flush() # Penting untuk mendapatkan ID perusahaan
-
-            # Dapatkan company_id setelah flush atau jika sudah ada
-            default_company_obj = await session.execute(select(Company).filter_by(name="Default Company"))
-            default_company_obj = default_company_obj.scalar_one()
-
-
-            # --- Seed Outlets ---
-            existing_outlet = await session.execute(select(Outlet).filter_by(name="Main Outlet"))
-            if not existing_outlet.scalar_one_or_none():
-                print("Creating Main Outlet...")
-                default_outlet = Outlet(
-                    company_id=default_company_obj.id,
-                    name="Main Outlet",
-                    address="Jl. Cabang No. 1",
-                    phone_number="08123456780",
-                    email="outlet@default.com",
-                    is_active=True
-                )
-                session.add(default_outlet)
-                await session.flush() # Penting untuk mendapatkan ID outlet
-
-            # Dapatkan outlet_id setelah flush atau jika sudah ada
-            default_outlet_obj = await session.execute(select(Outlet).filter_by(name="Main Outlet"))
-            default_outlet_obj = default_outlet_obj.scalar_one()
-
-
-            # --- Seed Roles ---
-            admin_role = await session.execute(select(Role).filter_by(name="admin"))
-            admin_role_obj = admin_role.scalar_one_or_none()
-            if not admin_role_obj:
-                print("Creating 'admin' role...")
-                admin_role_obj = Role(name="admin", description="Administrator role", is_active=True)
-                session.add(admin_role_obj)
-                await session.flush() # Penting untuk mendapatkan ID
-
-            staff_role = await session.execute(select(Role).filter_by(name="staff"))
-            staff_role_obj = staff_role.scalar_one_or_none()
-            if not staff_role_obj:
-                print("Creating 'staff' role...")
-                staff_role_obj = Role(name="staff", description="Staff role", is_active=True)
-                session.add(staff_role_obj)
-                await session.flush()
-
-
-            # --- Seed Permissions ---
-            create_user_perm = await session.execute(select(Permission).filter_by(name="create_user"))
-            create_user_perm_obj = create_user_perm.scalar_one_or_none()
-            if not create_user_perm_obj:
-                print("Creating 'create_user' permission...")
-                create_user_perm_obj = Permission(name="create_user", description="Allows creating new users")
-                session.add(create_user_perm_obj)
-                await session.flush()
-
-            view_users_perm = await session.execute(select(Permission).filter_by(name="view_users"))
-            view_users_perm_obj = view_users_perm.scalar_one_or_none()
-            if not view_users_perm_obj:
-                print("Creating 'view_users' permission...")
-                view_users_perm_obj = Permission(name="view_users", description="Allows viewing users list")
-                session.add(view_users_perm_obj)
-                await session.flush()
-
-            # --- Connect Roles and Permissions (RolePermission Table) ---
-            print("Connecting roles and permissions...")
-            # Admin role gets create_user and view_users permissions
-            for perm_obj in [create_user_perm_obj, view_users_perm_obj]:
-                if perm_obj: # Only add if permission was created/found
-                    existing_rp = await session.execute(
-                        select(RolePermission).filter_by(
-                            role_id=admin_role_obj.id,
-                            permission_id=perm_obj.id
-                        )
-                    )
-                    if not existing_rp.scalar_one_or_none():
-                        rp = RolePermission(role_id=admin_role_obj.id, permission_id=perm_obj.id)
-                        session.add(rp)
-                        print(f"  Added permission '{perm_obj.name}' to role '{admin_role_obj.name}'")
-
-            # --- Seed Superadmin User ---
-            superadmin_user = await session.execute(select(User).filter_by(email="superadmin@example.com"))
-            superadmin_user_obj = superadmin_user.scalar_one_or_none()
-
-            if not superadmin_user_obj:
-                print("Creating superadmin user...")
-                hashed_password = get_password_hash("supersecretpassword") # Ganti dengan password yang kuat
-
-                superadmin_user_obj = User(
-                    username="superadmin",
-                    email="superadmin@example.com",
-                    hashed_password=hashed_password,
-                    full_name="Super Administrator",
-                    phone_number="08111222333",
-                    pin="1234", # Contoh PIN, sesuaikan jika perlu hashing
-                    is_active=True,
-                    email_verified=True,
-                    access_type="GLOBAL", # Sesuaikan dengan Enum jika perlu
-                    outlet_id=None # Superadmin biasanya GLOBAL, tidak terikat outlet
-                )
-                session.add(superadmin_user_obj)
-                await session.flush() # Penting untuk mendapatkan ID
-
-            # --- Connect Superadmin to Admin Role (UserRole Table) ---
-            print("Connecting superadmin user to admin role...")
-            existing_ur = await session.execute(
-                select(UserRole).filter_by(
-                    user_id=superadmin_user_obj.id,
-                    role_id=admin_role_obj.id
-                )
-            )
-            if not existing_ur.scalar_one_or_none():
-                ur = UserRole(user_id=superadmin_user_obj.id, role_id=admin_role_obj.id)
-                session.add(ur)
-                print(f"  Connected user '{superadmin_user_obj.username}' to role '{admin_role_obj.name}'")
+            print(f"Starting data seeding process from {spec_path}...")
+            result = await apply_seed_spec(session, load_seed_spec(spec_path), update=update)
 
             # Commit semua perubahan ke database
             await session.commit()
-            print("Initial data created/updated successfully!")
+            for entity, count in result.rows.items():
+                print(f"  {entity}: {count} rows")
+            print(f"Initial data created/updated successfully in {result.statements} statements!")
 
         except Exception as e:
             await session.rollback()
             print(f"Error seeding data: {e}")
             raise # Re-raise the exception to see full traceback for debugging
 
+# =====================================================================
+# Synthetic data generator (benchmark / reproduksi skala produksi)
+# =====================================================================
+#
+#   python -m app.seed_data --companies 50 --products-per-company 20000 --users 5000 --seed 42
+#
+# Semua data sintetis memakai prefix BENCH_PREFIX sehingga bisa dihapus dengan --reset.
+# Hasilnya deterministik per --seed, berapa pun --workers: setiap company memakai
+# Random(seed, index company) sendiri, dan id product/user dipesan per company dalam satu
+# blok sequence sebelum COPY paralel dimulai, jadi urutan eksekusi tidak memengaruhi id.
+# Id absolut tetap bergantung pada posisi sequence (sama persis pada database baru).
+
+BENCH_PREFIX = "bench"
+
+# (name, symbol, bobot pemakaian)
+BENCH_UOMS = [
+    ("Pieces", "pcs", 50), ("Kilogram", "kg", 10), ("Gram", "g", 8), ("Liter", "l", 6),
+    ("Milliliter", "ml", 6), ("Box", "box", 6), ("Pack", "pack", 6), ("Cup", "cup", 4),
+    ("Portion", "porsi", 3), ("Bottle", "btl", 1),
+]
+SKU_PREFIXES = ["BEV", "FOOD", "SNK", "DSRT", "COF", "TEA", "RAW", "PKG", "MRC", "ADD"]
+NAME_ADJECTIVES = ["Classic", "Spicy", "Iced", "Hot", "Large", "Mini", "Premium", "Fresh", "Sweet", "Original"]
+NAME_NOUNS = ["Latte", "Fried Rice", "Noodle", "Tea", "Chicken", "Burger", "Toast", "Juice", "Cake", "Soup"]
+
+PRODUCT_COLUMNS = [
+    "id", "company_id", "name", "description", "sku", "barcode", "stock_uom_id", "base_price",
+    "is_active", "image_url", "created_at", "updated_at", "deleted_at",
+]
+USER_COLUMNS = [
+    "id", "company_id", "outlet_id", "username", "email", "hashed_password", "full_name",
+    "is_active", "is_superuser", "created_at", "updated_at", "deleted_at",
+]
+
+
+def skewed_counts(total: int, buckets: int, skew: float, rng: random.Random) -> list:
+    """Split `total` over `buckets` following a Zipf-like curve (bucket 0 is the largest tenant)."""
+    weights = [1.0 / (i + 1) ** skew for i in range(buckets)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    # Sisa pembulatan dibagikan acak tapi deterministik
+    for i in rng.sample(range(buckets), k=min(buckets, total - sum(counts))):
+        counts[i] += 1
+    return counts
+
+
+def ean13(rng: random.Random) -> str:
+    digits = [rng.randrange(10) for _ in range(12)]
+    checksum = (10 - sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return "".join(map(str, digits)) + str(checksum)
+
+
+def product_records(company_id: int, first_id: int, count: int, uom_ids: list, uom_weights: list,
+                    deleted_ratio: float, rng: random.Random, now: datetime) -> list:
+    records, barcodes = [], set()
+    for n in range(count):
+        prefix = SKU_PREFIXES[min(int(rng.paretovariate(1.2)) - 1, len(SKU_PREFIXES) - 1)]
+        barcode = None
+        if rng.random() < 0.7: # Tidak semua produk punya barcode
+            barcode = ean13(rng)
+            while barcode in barcodes:
+                barcode = ean13(rng)
+            barcodes.add(barcode)
+        created_at = now - timedelta(days=rng.randint(0, 720))
+        deleted = rng.random() < deleted_ratio
+        records.append((
+            first_id + n,
+            company_id,
+            f"{rng.choice(NAME_ADJECTIVES)} {rng.choice(NAME_NOUNS)} {n:06d}",
+            None if rng.random() < 0.5 else "Synthetic benchmark product",
+            f"{prefix}-{n:06d}",
+            barcode,
+            rng.choices(uom_ids, weights=uom_weights)[0],
+            round(rng.lognormvariate(10.3, 0.6), -2) or 1000.0, # Rupiah, median ~30rb
+            not deleted and rng.random() > 0.05,
+            None,
+            created_at,
+            created_at + timedelta(days=rng.randint(0, 30)),
+            created_at + timedelta(days=rng.randint(1, 60)) if deleted else None,
+        ))
+    return records
+
+
+async def _insert_returning_ids(conn, sql: str, *arrays) -> list:
+    return [row[0] for row in await conn.fetch(sql, *arrays)]
+
+
+async def _reserve_ids(conn, table: str, counts: list) -> list:
+    """
+    Reserve one block of ids of `table`'s sequence for all counts; returns the
+    first id of each count's sub-block (in order).
+    """
+    total = sum(counts)
+    if not total:
+        return [0] * len(counts)
+    # nextval + setval dalam satu statement: blok [first, last] tidak akan dipakai insert lain
+    last = await conn.fetchval(
+        "SELECT setval(pg_get_serial_sequence($1, 'id'), nextval(pg_get_serial_sequence($1, 'id')) + $2 - 1)",
+        table, total,
+    )
+    firsts, next_id = [], last - total + 1
+    for count in counts:
+        firsts.append(next_id)
+        next_id += count
+    return firsts
+
+
+async def _seed_company(pool, index: int, company_id: int, outlet_ids: list, product_count: int,
+                        user_count: int, first_ids: tuple, uom_ids: list, uom_weights: list, role_ids: dict,
+                        hashed_password: str, args, now: datetime) -> tuple:
+    rng = random.Random(f"{args.seed}:{index}")
+    first_product_id, first_user_id = first_ids
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            records = product_records(company_id, first_product_id, product_count, uom_ids, uom_weights, args.deleted_ratio, rng, now)
+            for start in range(0, len(records), args.batch_size):
+                await conn.copy_records_to_table("products", records=records[start:start + args.batch_size], columns=PRODUCT_COLUMNS)
+
+            users = []
+            for n in range(user_count):
+                deleted = rng.random() < args.deleted_ratio
+                created_at = now - timedelta(days=rng.randint(0, 720))
+                users.append((
+                    first_user_id + n,
+                    company_id,
+                    rng.choice(outlet_ids) if outlet_ids and rng.random() < 0.8 else None, # Sebagian staf tingkat company
+                    f"{BENCH_PREFIX}_c{index:04d}_u{n:05d}",
+                    f"{BENCH_PREFIX}.c{index:04d}.u{n:05d}@example.com",
+                    hashed_password,
+                    f"Bench User {index}-{n}",
+                    not deleted,
+                    False,
+                    created_at,
+                    created_at,
+                    created_at + timedelta(days=rng.randint(1, 60)) if deleted else None,
+                ))
+            if users:
+                await conn.copy_records_to_table("users", records=users, columns=USER_COLUMNS)
+                # ~10% admin, sisanya staff; sebagian kecil punya dua role
+                assignments = set()
+                for user_id in range(first_user_id, first_user_id + user_count):
+                    assignments.add((user_id, role_ids["admin"] if rng.random() < 0.1 else role_ids["staff"]))
+                    if rng.random() < 0.03:
+                        assignments.add((user_id, role_ids["admin"]))
+                await conn.copy_records_to_table("user_roles", records=sorted(assignments), columns=["user_id", "role_id"])
+    return product_count, user_count
+
+
+async def reset_synthetic_data(conn) -> None:
+    company_ids = [row[0] for row in await conn.fetch(
+        "SELECT id FROM companies WHERE name LIKE $1", f"{BENCH_PREFIX.title()} Company %"
+    )]
+    if not company_ids:
+        return
+    print(f"Removing synthetic data of {len(company_ids)} companies...")
+    await conn.execute("DELETE FROM user_roles WHERE user_id IN (SELECT id FROM users WHERE company_id = ANY($1))", company_ids)
+    await conn.execute("DELETE FROM users WHERE company_id = ANY($1)", company_ids)
+    await conn.execute("DELETE FROM products WHERE company_id = ANY($1)", company_ids)
+    await conn.execute("DELETE FROM outlets WHERE company_id = ANY($1)", company_ids)
+    await conn.execute("DELETE FROM companies WHERE id = ANY($1)", company_ids)
+
+
+async def generate_synthetic_data(args) -> None:
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+    now = datetime(2025, 7, 1, tzinfo=timezone.utc) # Tetap, agar timestamp ikut deterministik
+
+    pool = await asyncpg.create_pool(RAW_DATABASE_URL, min_size=1, max_size=args.workers)
+    try:
+        async with pool.acquire() as conn:
+            if args.reset:
+                await reset_synthetic_data(conn)
+            elif await conn.fetchval("SELECT 1 FROM companies WHERE name LIKE $1 LIMIT 1", f"{BENCH_PREFIX.title()} Company %"):
+                raise SystemExit("Synthetic data already exists; rerun with --reset to regenerate it.")
+
+            # UOM & role referensi (idempotent)
+            await conn.executemany(
+                "INSERT INTO uoms (name, symbol, is_active) VALUES ($1, $2, TRUE) ON CONFLICT DO NOTHING",
+                [(name, symbol) for name, symbol, _ in BENCH_UOMS],
+            )
+            uom_rows = {row["symbol"]: row["id"] for row in await conn.fetch("SELECT id, symbol FROM uoms")}
+            uom_ids = [uom_rows[symbol] for _, symbol, _ in BENCH_UOMS]
+            uom_weights = [weight for _, _, weight in BENCH_UOMS]
+            for role in ("admin", "staff"):
+                await conn.execute(
+                    "INSERT INTO roles (name, description, is_active) VALUES ($1, $2, TRUE) ON CONFLICT DO NOTHING",
+                    role, f"{role.title()} role",
+                )
+            role_ids = {row["name"]: row["id"] for row in await conn.fetch("SELECT id, name FROM roles WHERE name IN ('admin', 'staff')")}
+
+            # Companies & outlets, masing-masing satu statement
+            company_ids = await _insert_returning_ids(
+                conn,
+                "INSERT INTO companies (name, email, is_active) "
+                "SELECT * FROM unnest($1::text[], $2::text[], $3::boolean[]) RETURNING id",
+                [f"{BENCH_PREFIX.title()} Company {i:04d}" for i in range(args.companies)],
+                [f"{BENCH_PREFIX}.company{i:04d}@example.com" for i in range(args.companies)],
+                [True] * args.companies,
+            )
+            outlet_counts = skewed_counts(max(args.companies * 3, args.companies), args.companies, args.skew, rng)
+            outlet_company, outlet_names = [], []
+            for i, (company_id, count) in enumerate(zip(company_ids, outlet_counts)):
+                for k in range(max(count, 1)):
+                    outlet_company.append(company_id)
+                    outlet_names.append(f"{BENCH_PREFIX.title()} {i:04d} Outlet {k:03d}")
+            outlet_rows = await conn.fetch(
+                "INSERT INTO outlets (company_id, name, is_active) "
+                "SELECT c, n, TRUE FROM unnest($1::int[], $2::text[]) AS t(c, n) RETURNING id, company_id",
+                outlet_company, outlet_names,
+            )
+            outlets_by_company = {}
+            for row in outlet_rows:
+                outlets_by_company.setdefault(row["company_id"], []).append(row["id"])
+
+        product_counts = skewed_counts(args.companies * args.products_per_company, args.companies, args.skew, rng)
+        user_counts = skewed_counts(args.users, args.companies, args.skew, rng)
+        # Satu hash untuk semua user sintetis: bcrypt per user akan mendominasi waktu generate
+        hashed_password = get_password_hash("benchpassword")
+        async with pool.acquire() as conn:
+            first_ids = list(zip(
+                await _reserve_ids(conn, "products", product_counts),
+                await _reserve_ids(conn, "users", user_counts),
+            ))
+
+        print(f"Generating {sum(product_counts)} products and {sum(user_counts)} users "
+              f"for {args.companies} companies with {args.workers} workers...")
+        semaphore = asyncio.Semaphore(args.workers)
+        done = 0
+
+        async def run(i: int):
+            nonlocal done
+            async with semaphore:
+                await _seed_company(
+                    pool, i, company_ids[i], sorted(outlets_by_company.get(company_ids[i], [])),
+                    product_counts[i], user_counts[i], first_ids[i], uom_ids, uom_weights, role_ids,
+                    hashed_password, args, now,
+                )
+                done += 1
+                print(f"  [{done}/{args.companies}] company {i:04d}: {product_counts[i]} products, {user_counts[i]} users")
+
+        await asyncio.gather(*(run(i) for i in range(args.companies)))
+
+        async with pool.acquire() as conn:
+            await conn.execute("ANALYZE products")
+            await conn.execute("ANALYZE users")
+    finally:
+        await pool.close()
+
+    print(f"Synthetic data generated in {time.perf_counter() - started:.1f}s.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed initial data, or generate deterministic synthetic data for benchmarks.")
+    parser.add_argument("--companies", type=int, help="Number of synthetic companies (enables the generator)")
+    parser.add_argument("--products-per-company", type=int, default=1000, help="Average products per company")
+    parser.add_argument("--users", type=int, default=0, help="Total synthetic users over all companies")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; same seed gives the same data")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of tenant sizes (0 = uniform)")
+    parser.add_argument("--deleted-ratio", type=float, default=0.05, help="Fraction of soft-deleted products/users")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel database connections")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per COPY batch")
+    parser.add_argument("--reset", action="store_true", help="Delete previously generated synthetic data first")
+    parser.add_argument("--spec", default=str(INITIAL_SEED_SPEC), help="Seed spec (JSON/YAML) for the regular initial seed")
+    parser.add_argument("--update", action="store_true", help="Overwrite existing rows with the values in --spec")
+    return parser.parse_args(argv)
+
 # Jalankan fungsi async
 if __name__ == "__main__":
-    asyncio.run(create_initial_data())
\ No newline at end of file
+    cli_args = parse_args()
+    if cli_args.companies:
+        asyncio.run(generate_synthetic_data(cli_args))
+    else:
+        asyncio.run(create_initial_data(cli_args.spec, cli_args.update))
\ No newline at end of file
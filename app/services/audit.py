@@ -0,0 +1,348 @@
+# app/services/audit.py
+
+"""
+Audit trail of entity changes (who changed which fields of prices, users,
+products, ...), written off the request path.
+
+Capture happens in the session, without extra queries:
+  - ORM changes (db.add, attribute assignment, db.delete) are diffed from
+    attribute history in `after_flush`;
+  - Core writes, which never create ORM instances, are recorded by the
+    helpers in app/db/writes.py, or explicitly with record_update() /
+    record_insert() (e.g. bulk updates that RETURN old and new values).
+Records wait in session.info and are handed to `audit_writer` only after
+commit; a rollback discards them, so the trail never shows a change that
+did not happen.
+
+`audit_writer` keeps an in-process queue and writes it with multi-row
+INSERTs into the month-partitioned `audit_log` table: as soon as
+AUDIT_BATCH_SIZE records are waiting, or every AUDIT_FLUSH_INTERVAL_SECONDS
+otherwise. When the database is unreachable the batch stays queued for the
+next attempt; a batch the database rejects (e.g. a value too long) is
+split until the offending rows are found, and those are dropped, so one
+bad record never blocks the queue. stop() (from lifespan) writes whatever
+is still queued. The request never waits
+on the audit write.
+
+The acting user comes from a context variable set per request by the
+`audit_actor` router dependency (app/api/deps.py).
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Mapping, Optional, Type
+
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ClauseElement
+
+from app.core.config import settings
+from app.db.connection import engine
+from app.models.audit_log import AuditLog as AuditLogModel
+from app.models.product import Product as ProductModel
+from app.models.product_channel_price import ProductChannelPrice as ProductChannelPriceModel
+from app.models.sales_channel import SalesChannel as SalesChannelModel
+from app.models.user import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+# Kunci di session.info untuk record audit yang menunggu commit
+_PENDING_KEY = "audit_records"
+
+# Nilai field rahasia tidak pernah ditulis; hanya fakta bahwa field itu berubah
+REDACTED = "[redacted]"
+
+_actor: ContextVar[Optional[int]] = ContextVar("audit_actor", default=None)
+
+
+def set_actor(user_id: Optional[int]) -> None:
+    """Remember the acting user for the records captured in the current request."""
+    _actor.set(user_id)
+
+
+@dataclass(frozen=True)
+class AuditSpec:
+    entity: str
+    redact: FrozenSet[str] = frozenset()
+    # Kolom yang berubah di setiap write tanpa makna bisnis
+    ignore: FrozenSet[str] = frozenset({"created_at", "updated_at"})
+
+
+AUDITED: Dict[type, AuditSpec] = {}
+
+
+def audited(model: Type[Any], entity: str, redact: Iterable[str] = ()) -> None:
+    """Register a model for auditing under an entity name."""
+    AUDITED[model] = AuditSpec(entity=entity, redact=frozenset(redact))
+
+
+audited(ProductModel, "product")
+audited(UserModel, "user", redact=("hashed_password",))
+audited(ProductChannelPriceModel, "channel_price")
+audited(SalesChannelModel, "sales_channel")
+
+
+def _jsonable(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, ClauseElement):
+        return str(value) # Nilai dari sisi server, mis. now()
+    return str(value)
+
+
+def _value(spec: AuditSpec, key: str, value: Any) -> Any:
+    return REDACTED if key in spec.redact and value is not None else _jsonable(value)
+
+
+def _queue(session: Any, spec: AuditSpec, entity_id: Any, company_id: Optional[int], action: str, changes: Dict[str, list]) -> None:
+    if not settings.AUDIT_ENABLED or (not changes and action == "update"):
+        return
+    sync_session = getattr(session, "sync_session", session)
+    sync_session.info.setdefault(_PENDING_KEY, []).append({
+        "changed_at": datetime.now(timezone.utc),
+        "entity": spec.entity,
+        "entity_id": str(entity_id),
+        "company_id": company_id,
+        "action": action,
+        "actor_user_id": _actor.get(),
+        "changes": changes,
+    })
+
+
+def _update_action(changes: Dict[str, list]) -> str:
+    deleted_at = changes.get("deleted_at")
+    if deleted_at is not None and deleted_at[0] is None and deleted_at[1] is not None:
+        return "soft_delete"
+    return "update"
+
+
+def record_insert(session: Any, model: Type[Any], row: Mapping[str, Any]) -> None:
+    """Record a row inserted with a Core statement (no-op for models that are not audited)."""
+    spec = AUDITED.get(model)
+    if spec is None:
+        return
+    changes = {
+        key: [None, _value(spec, key, value)]
+        for key, value in row.items()
+        if key not in spec.ignore and value is not None
+    }
+    _queue(session, spec, row["id"], row.get("company_id"), "insert", changes)
+
+
+def record_update(
+    session: Any, model: Type[Any], before: Any, after: Mapping[str, Any], fields: Optional[Iterable[str]] = None
+) -> None:
+    """
+    Record a row updated with a Core statement. `after` is the stored row
+    (at least id and, if the model has one, company_id); `fields` are the
+    written columns (default: every key of `after`). `before` is the ORM
+    instance or mapping as it was before the UPDATE, or None when the old
+    values are unknown.
+    """
+    spec = AUDITED.get(model)
+    if spec is None:
+        return
+    changes = {}
+    for key in (fields if fields is not None else after.keys()):
+        if key in spec.ignore or key == "id" or key not in after:
+            continue
+        new = after[key]
+        if before is None:
+            old = None
+        elif isinstance(before, Mapping):
+            if key not in before:
+                continue
+            old = before[key]
+        else:
+            old = getattr(before, key, None)
+        if before is not None and old == new:
+            continue
+        changes[key] = [_value(spec, key, old), _value(spec, key, new)]
+    _queue(session, spec, after["id"], after.get("company_id"), _update_action(changes), changes)
+
+
+def _diff_instance(spec: AuditSpec, state: Any, action: str) -> Dict[str, list]:
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if key in spec.ignore:
+            continue
+        history = state.attrs[key].history
+        if action == "insert":
+            value = history.added[0] if history.added else None
+            if value is not None:
+                changes[key] = [None, _value(spec, key, value)]
+        elif action == "delete":
+            value = (history.deleted or history.unchanged or [None])[0]
+            changes[key] = [_value(spec, key, value), None]
+        elif history.has_changes():
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            changes[key] = [_value(spec, key, old), _value(spec, key, new)]
+    return changes
+
+
+@event.listens_for(Session, "after_flush")
+def _capture_orm_changes(session: Session, _flush_context) -> None:
+    # Di after_flush daftar new/dirty/deleted dan history atribut masih utuh
+    if not settings.AUDIT_ENABLED:
+        return
+    for action, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            spec = AUDITED.get(type(obj))
+            if spec is None:
+                continue
+            state = inspect(obj)
+            changes = _diff_instance(spec, state, action)
+            # state.dict, bukan getattr: atribut yang kedaluwarsa tidak boleh memicu lazy load di sini
+            _queue(
+                session, spec, state.dict.get("id"), state.dict.get("company_id"),
+                _update_action(changes) if action == "update" else action, changes,
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session: Session) -> None:
+    records = session.info.pop(_PENDING_KEY, None)
+    if records:
+        audit_writer.enqueue(records)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# PostgreSQL menerima paling banyak 32767 parameter per statement
+_MAX_ROWS_PER_INSERT = 32767 // len(AuditLogModel.__table__.c)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed INSERT is worth retrying as-is (connection trouble) rather than a problem with the rows."""
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+    return isinstance(error, (OSError, asyncio.TimeoutError, PoolTimeoutError, DisconnectionError))
+
+
+class AuditWriter:
+    """In-process queue of audit records, written in multi-row batches."""
+
+    def __init__(self):
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flush_lock = asyncio.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, records: List[Dict[str, Any]]) -> None:
+        room = settings.AUDIT_QUEUE_MAX - len(self._queue)
+        if room < len(records):
+            # Antrean penuh (DB tidak bisa ditulisi cukup lama): jangan sampai memori habis
+            self.dropped += len(records) - max(room, 0)
+            logger.error("Audit queue full; dropped %d record(s) (%d in total).", len(records) - max(room, 0), self.dropped)
+            records = records[:max(room, 0)]
+        self._queue.extend(records)
+        if self._wakeup is not None and len(self._queue) >= settings.AUDIT_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Stop the background flusher and write everything still queued."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+        if self._queue:
+            logger.error("Shutting down with %d unwritten audit record(s).", len(self._queue))
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.AUDIT_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._stopping:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """Write the queued records, AUDIT_BATCH_SIZE rows per INSERT; returns how many were written."""
+        written = 0
+        batch_size = max(1, min(settings.AUDIT_BATCH_SIZE, _MAX_ROWS_PER_INSERT))
+        async with self._flush_lock:
+            while self._queue:
+                # Tumpukan potongan batch; elemen terakhir ditulis lebih dulu
+                pending = [[self._queue.popleft() for _ in range(min(len(self._queue), batch_size))]]
+                try:
+                    while pending:
+                        chunk = pending.pop()
+                        try:
+                            await self._insert(chunk)
+                        except Exception as e:
+                            if _is_transient(e):
+                                pending.append(chunk)
+                                raise
+                            if len(chunk) == 1:
+                                # Baris ini tidak akan pernah bisa ditulis; buang agar antrean tetap jalan
+                                self.dropped += 1
+                                logger.error("Dropped audit record the database rejects: %s (%r)", e, chunk[0])
+                                continue
+                            # Bagi dua sampai baris yang ditolak ditemukan; sisanya tetap ditulis
+                            middle = len(chunk) // 2
+                            pending += [chunk[middle:], chunk[:middle]]
+                            continue
+                        written += len(chunk)
+                except Exception as e:
+                    # Kembalikan yang belum tertulis ke depan antrean dengan urutan semula; dicoba lagi pada flush berikutnya
+                    remaining = [record for chunk in reversed(pending) for record in chunk]
+                    self._queue.extendleft(reversed(remaining))
+                    self.failed_flushes += 1
+                    logger.warning("Audit flush of %d record(s) failed: %s", len(remaining), e)
+                    break
+        self.written += written
+        return written
+
+    async def _insert(self, records: List[Dict[str, Any]]) -> None:
+        async with engine.begin() as conn:
+            # Satu INSERT ... VALUES (...), (...) per batch: satu statement, satu round trip
+            await conn.execute(insert(AuditLogModel.__table__).values(records))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,260 @@
+# app/services/cache_bus.py
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import local_cache
+from app.core.config import settings
+from app.db.connection import RAW_DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Kunci di session.info untuk menampung invalidasi yang menunggu commit
+_PENDING_KEY = "cache_invalidations"
+
+# Batas aman payload NOTIFY (batas PostgreSQL 8000 byte)
+_MAX_PAYLOAD_BYTES = 7000
+
+# Identitas unik worker ini, dipakai untuk deteksi gap per pengirim
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+_sequence = itertools.count(1)
+
+NotificationHandler = Callable[[str], Optional[Awaitable[None]]]
+
+
+def mark_stale(session: Any, namespace: str, *keys: Hashable) -> None:
+    """
+    Queue cache invalidations on a session.
+
+    The keys are published with NOTIFY inside the same transaction, so other
+    workers only see them once the write is committed, and they are evicted
+    from this worker's cache right after commit. Pass no keys to invalidate the
+    whole namespace. Accepts both AsyncSession and Session.
+    """
+    sync_session = getattr(session, "sync_session", session)
+    pending: Set[Tuple[str, Optional[Hashable]]] = sync_session.info.setdefault(_PENDING_KEY, set())
+    if not keys:
+        pending.add((namespace, None))
+        return
+    for key in keys:
+        pending.add((namespace, key))
+
+
+def _collapse(pending: Set[Tuple[str, Optional[Hashable]]]) -> list:
+    """Turn large per-key invalidations into namespace-wide ones."""
+    by_namespace: Dict[str, Set[Optional[Hashable]]] = {}
+    for namespace, key in pending:
+        by_namespace.setdefault(namespace, set()).add(key)
+
+    keys = []
+    for namespace, namespace_keys in by_namespace.items():
+        if None in namespace_keys or len(namespace_keys) > settings.CACHE_BUS_MAX_KEYS_PER_NAMESPACE:
+            keys.append([namespace, None])
+        else:
+            keys.extend([namespace, key] for key in namespace_keys)
+    return keys
+
+
+def _chunk_payloads(keys: list) -> list:
+    """Split the key list into NOTIFY payloads below the PostgreSQL size limit."""
+    payloads, chunk = [], []
+    for item in keys:
+        chunk.append(item)
+        if len(json.dumps(chunk)) > _MAX_PAYLOAD_BYTES - 200:
+            chunk.pop()
+            payloads.append(chunk)
+            chunk = [item]
+    if chunk:
+        payloads.append(chunk)
+    return [
+        json.dumps({"origin": WORKER_ID, "seq": next(_sequence), "keys": chunk}, separators=(",", ":"))
+        for chunk in payloads
+    ]
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_pending(session: Session) -> None:
+    pending = session.info.get(_PENDING_KEY)
+    if not pending or not settings.CACHE_BUS_ENABLED:
+        return
+    # Flush dulu agar kegagalan flush tidak membuang nomor urut yang sudah terkirim
+    session.flush()
+    for payload in _chunk_payloads(_collapse(pending)):
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": settings.CACHE_BUS_CHANNEL, "payload": payload},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_pending_locally(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        local_cache.evict_many(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class CacheInvalidationBus:
+    """
+    Listens on PostgreSQL channels with a dedicated asyncpg connection and
+    applies invalidations to the local cache.
+
+    - Reconnects with exponential backoff; after every (re)connect the local
+      cache is flushed because notifications sent while disconnected are lost.
+    - Tracks a per-origin sequence number; a gap that is not filled within
+      CACHE_BUS_GAP_GRACE_SECONDS also triggers a full flush.
+    - Other modules can register extra channels with `subscribe()`.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._handlers: Dict[str, NotificationHandler] = {settings.CACHE_BUS_CHANNEL: self._on_invalidation}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._connection: Optional[asyncpg.Connection] = None
+        self._last_seq: Dict[str, int] = {}
+        self._gaps: Dict[Tuple[str, int], float] = {}
+        self.connected = False
+        self.flush_count = 0
+
+    def subscribe(self, channel: str, handler: NotificationHandler) -> None:
+        """Register a handler(payload) for another NOTIFY channel. Must be called before start()."""
+        self._handlers[channel] = handler
+
+    async def start(self) -> None:
+        if not settings.CACHE_BUS_ENABLED or self._task is not None:
+            return
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run(), name="cache-invalidation-bus")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=5)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self) -> None:
+        delay = settings.CACHE_BUS_RECONNECT_MIN_SECONDS
+        while not self._stopping.is_set():
+            lost = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                self._connection.add_termination_listener(lambda _conn: lost.set())
+                for channel in self._handlers:
+                    await self._connection.add_listener(channel, self._dispatch)
+
+                # Apa pun yang terjadi sebelum LISTEN aktif tidak terlihat oleh kita
+                self._reset_sequences()
+                local_cache.flush()
+                self.flush_count += 1
+                self.connected = True
+                delay = settings.CACHE_BUS_RECONNECT_MIN_SECONDS
+                logger.info("Cache invalidation bus listening on %s", ", ".join(self._handlers))
+
+                while not self._stopping.is_set() and not lost.is_set():
+                    await self._wait(lost, settings.CACHE_BUS_KEEPALIVE_SECONDS)
+                    if self._stopping.is_set() or lost.is_set():
+                        break
+                    # Keepalive: mendeteksi koneksi mati yang tidak memicu termination listener
+                    await asyncio.wait_for(self._connection.execute("SELECT 1"), timeout=5)
+                    self._check_gaps()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation bus connection error: %s", e)
+            finally:
+                self.connected = False
+                await self._close()
+
+            if not self._stopping.is_set():
+                await self._wait(self._stopping, delay)
+                delay = min(delay * 2, settings.CACHE_BUS_RECONNECT_MAX_SECONDS)
+
+    async def _wait(self, waiter: asyncio.Event, timeout: float) -> None:
+        stop_task = asyncio.create_task(self._stopping.wait())
+        wait_task = asyncio.create_task(waiter.wait())
+        try:
+            await asyncio.wait({stop_task, wait_task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_task.cancel()
+            wait_task.cancel()
+
+    async def _close(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            await asyncio.wait_for(self._connection.close(), timeout=5)
+        except Exception:
+            self._connection.terminate()
+        self._connection = None
+
+    def _dispatch(self, _connection, _pid: int, channel: str, payload: str) -> None:
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            result = handler(payload)
+            if asyncio.iscoroutine(result):
+                asyncio.create_task(result)
+        except Exception:
+            logger.exception("Failed to handle notification on channel %s", channel)
+
+    def _on_invalidation(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed cache invalidation payload.")
+            return
+
+        self._track_sequence(message.get("origin"), message.get("seq"))
+        local_cache.evict_many((namespace, key) for namespace, key in message.get("keys", []))
+
+    def _track_sequence(self, origin: Optional[str], seq: Optional[int]) -> None:
+        if origin is None or seq is None:
+            return
+        last = self._last_seq.get(origin)
+        if last is None or seq > last:
+            if last is not None:
+                # Nomor yang terlewat mungkin hanya datang terlambat (urutan commit), beri waktu tenggang
+                now = time.monotonic()
+                for missing in range(last + 1, seq):
+                    self._gaps[(origin, missing)] = now
+            self._last_seq[origin] = seq
+        else:
+            self._gaps.pop((origin, seq), None)
+
+    def _check_gaps(self) -> None:
+        if not self._gaps:
+            return
+        deadline = time.monotonic() - settings.CACHE_BUS_GAP_GRACE_SECONDS
+        if any(seen_at < deadline for seen_at in self._gaps.values()):
+            logger.warning("Missed cache invalidation message(s); flushing local cache.")
+            self._gaps.clear()
+            local_cache.flush()
+            self.flush_count += 1
+
+    def _reset_sequences(self) -> None:
+        self._last_seq.clear()
+        self._gaps.clear()
+
+
+cache_bus = CacheInvalidationBus(RAW_DATABASE_URL)
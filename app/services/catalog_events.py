@@ -0,0 +1,293 @@
+# app/services/catalog_events.py
+
+"""
+Catalog change events for terminals (WebSocket push instead of polling).
+
+Writers queue events on the session, next to their cache invalidations:
+
+    publish_catalog_event(db, "product", company_id, product_id)
+
+Before commit each queued group becomes one pg_notify() on
+CATALOG_EVENTS_CHANNEL, numbered from the `catalog_event_seq` database
+sequence, so every worker sees the same events in the same (commit) order.
+The hub on every worker keeps the last CATALOG_EVENTS_BUFFER_SIZE events in
+a ring buffer and fans them out to the WebSocket subscriptions of the
+matching company/outlet.
+
+Per connection, changes are coalesced (ids merged per type, collapsed to
+"everything" past CATALOG_EVENTS_MAX_IDS) and sent at most once per
+CATALOG_EVENTS_COALESCE_SECONDS, so a slow terminal holds a bounded amount
+of memory no matter how many events arrive. A terminal that cannot accept
+a message within CATALOG_EVENTS_SEND_TIMEOUT_SECONDS is disconnected and
+resumes later.
+
+Resume: a terminal reconnects with the last `seq` it processed; events that
+arrived after it are replayed from the buffer. If that seq is no longer
+buffered (or the bus lost notifications) the terminal gets a "resync"
+message and re-reads the catalog.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import local_cache
+from app.core.config import settings
+from app.services.cache_bus import cache_bus
+
+logger = logging.getLogger(__name__)
+
+# Jenis perubahan yang dikirim ke terminal
+CATALOG_EVENT_TYPES = ("product", "uom", "price")
+
+# Kunci di session.info untuk event yang menunggu commit
+_PENDING_KEY = "catalog_events"
+
+_NOTIFY_SQL = text(
+    "SELECT pg_notify(:channel, json_build_object("
+    "'seq', nextval('catalog_event_seq'), 'type', CAST(:type AS text), "
+    "'company_id', CAST(:company_id AS integer), 'outlet_id', CAST(:outlet_id AS integer), "
+    "'ids', CAST(:ids AS json))::text)"
+)
+
+
+def publish_catalog_event(
+    session: Any,
+    event_type: str,
+    company_id: Optional[int],
+    *ids: Hashable,
+    outlet_id: Optional[int] = None,
+) -> None:
+    """
+    Queue a catalog change for terminals; it is sent only if the transaction commits.
+    company_id=None reaches every company (global reference data such as UOMs);
+    no ids means "everything of this type changed".
+    """
+    sync_session = getattr(session, "sync_session", session)
+    pending: Dict[Tuple[str, Optional[int], Optional[int]], Optional[Set[Hashable]]] = (
+        sync_session.info.setdefault(_PENDING_KEY, {})
+    )
+    key = (event_type, company_id, outlet_id)
+    if not ids:
+        pending[key] = None
+    elif key not in pending:
+        pending[key] = set(ids)
+    elif pending[key] is not None:
+        pending[key].update(ids)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not settings.CATALOG_EVENTS_ENABLED:
+        return
+    session.flush()
+    for (event_type, company_id, outlet_id), ids in pending.items():
+        if ids is not None and len(ids) > settings.CATALOG_EVENTS_MAX_IDS:
+            ids = None
+        session.execute(_NOTIFY_SQL, {
+            "channel": settings.CATALOG_EVENTS_CHANNEL,
+            "type": event_type,
+            "company_id": company_id,
+            "outlet_id": outlet_id,
+            "ids": json.dumps(sorted(ids) if ids is not None else None),
+        })
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class Subscription:
+    """One terminal connection: filter, coalescing buffer and resume position."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, company_id: int, outlet_id: Optional[int] = None):
+        self.id = next(self._ids)
+        self.company_id = company_id
+        self.outlet_id = outlet_id
+        self.last_seq = 0
+        self.resync = False
+        # type -> ids yang berubah, atau None = semuanya
+        self._changes: Dict[str, Optional[Set[Hashable]]] = {}
+        self._wake = asyncio.Event()
+        self.closed = False
+
+    def matches(self, message: Dict[str, Any]) -> bool:
+        company_id, outlet_id = message.get("company_id"), message.get("outlet_id")
+        if company_id is not None and company_id != self.company_id:
+            return False
+        # Subscription tingkat company menerima event semua outlet-nya
+        return outlet_id is None or self.outlet_id is None or outlet_id == self.outlet_id
+
+    def offer(self, message: Dict[str, Any]) -> None:
+        event_type, ids = message["type"], message.get("ids")
+        if event_type in self._changes and self._changes[event_type] is None:
+            pass
+        elif ids is None:
+            self._changes[event_type] = None
+        else:
+            merged = self._changes.setdefault(event_type, set())
+            merged.update(ids)
+            if len(merged) > settings.CATALOG_EVENTS_MAX_IDS:
+                self._changes[event_type] = None
+        self.last_seq = max(self.last_seq, message["seq"])
+        self._wake.set()
+
+    def request_resync(self, seq: int) -> None:
+        self.resync = True
+        self._changes.clear()
+        self.last_seq = max(self.last_seq, seq)
+        self._wake.set()
+
+    async def next_message(self) -> Dict[str, Any]:
+        """Wait for changes, let a burst settle, and return one compact message."""
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(settings.CATALOG_EVENTS_COALESCE_SECONDS)
+            self._wake.clear()
+            if self.resync:
+                self.resync = False
+                self._changes.clear()
+                return {"type": "resync", "seq": self.last_seq}
+            if self._changes:
+                changes, self._changes = self._changes, {}
+                return {
+                    "type": "changes",
+                    "seq": self.last_seq,
+                    "changes": {key: sorted(ids) if ids is not None else "*" for key, ids in changes.items()},
+                }
+
+
+class CatalogEventHub:
+    def __init__(self, buffer_size: int = 10_000):
+        # Event dalam urutan kedatangan (= urutan commit di PostgreSQL)
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._arrived = 0
+        # seq -> nomor kedatangan (absolut), untuk resume
+        self._positions: Dict[int, int] = {}
+        self._by_company: Dict[int, Set[Subscription]] = {}
+        self.latest_seq = 0
+        self.events_received = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._by_company.values())
+
+    def subscribe(self, company_id: int, outlet_id: Optional[int] = None, since: Optional[int] = None) -> Subscription:
+        subscription = Subscription(company_id, outlet_id)
+        subscription.last_seq = self.latest_seq
+        self._by_company.setdefault(company_id, set()).add(subscription)
+        if since is not None:
+            self._replay(subscription, since)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.closed = True
+        subscriptions = self._by_company.get(subscription.company_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._by_company[subscription.company_id]
+
+    def _replay(self, subscription: Subscription, since: int) -> None:
+        position = self._positions.get(since)
+        first = self._arrived - len(self._buffer)
+        if position is None or position < first:
+            # Seq sudah keluar dari buffer (atau tidak pernah dikenal): terminal harus baca ulang
+            subscription.request_resync(self.latest_seq)
+            return
+        for message in itertools.islice(self._buffer, position - first + 1, None):
+            if subscription.matches(message):
+                subscription.offer(message)
+        subscription.last_seq = self.latest_seq
+
+    def on_notification(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            message["seq"] = int(message["seq"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed catalog event payload.")
+            return
+        self.events_received += 1
+
+        if len(self._buffer) == self._buffer.maxlen:
+            self._positions.pop(self._buffer[0]["seq"], None)
+        self._buffer.append(message)
+        self._positions[message["seq"]] = self._arrived
+        self._arrived += 1
+        self.latest_seq = max(self.latest_seq, message["seq"])
+
+        company_id = message.get("company_id")
+        targets: Iterable[Subscription]
+        if company_id is None:
+            targets = [s for subscriptions in self._by_company.values() for s in subscriptions]
+        else:
+            targets = self._by_company.get(company_id, ())
+        for subscription in targets:
+            if subscription.matches(message):
+                subscription.offer(message)
+
+    def on_cache_evict(self, namespace: str, key: Optional[Hashable]) -> None:
+        """A full cache flush means the bus (re)connected or lost notifications: everyone resyncs."""
+        if namespace != "*":
+            return
+        self._buffer.clear()
+        self._positions.clear()
+        for subscriptions in self._by_company.values():
+            for subscription in subscriptions:
+                subscription.request_resync(self.latest_seq)
+
+
+catalog_hub = CatalogEventHub(settings.CATALOG_EVENTS_BUFFER_SIZE)
+cache_bus.subscribe(settings.CATALOG_EVENTS_CHANNEL, catalog_hub.on_notification)
+local_cache.add_listener(catalog_hub.on_cache_evict)
+
+
+def benchmark_idle_subscriptions(count: int = 5000, events: int = 100) -> Dict[str, float]:
+    """
+    In-process cost of idle terminals: memory per subscription (including its
+    waiting sender task) and fan-out time per event. Run from a shell:
+
+        python -c "from app.services.catalog_events import benchmark_idle_subscriptions as b; print(b())"
+    """
+    import time
+    import tracemalloc
+
+    async def run() -> Dict[str, float]:
+        hub = CatalogEventHub()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        subscriptions = [hub.subscribe(company_id=i % 50) for i in range(count)]
+        waiters = [asyncio.create_task(s._wake.wait()) for s in subscriptions]
+        await asyncio.sleep(0)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        started = time.perf_counter()
+        for seq in range(1, events + 1):
+            hub.on_notification(json.dumps({"seq": seq, "type": "product", "company_id": seq % 50, "ids": [seq]}))
+        per_event_ms = (time.perf_counter() - started) * 1000 / events
+        started = time.perf_counter()
+        hub.on_notification(json.dumps({"seq": events + 1, "type": "uom", "company_id": None, "ids": None}))
+        broadcast_ms = (time.perf_counter() - started) * 1000
+
+        for waiter in waiters:
+            waiter.cancel()
+        return {
+            "subscriptions": count,
+            "bytes_per_subscription": used / count,
+            "company_event_ms": per_event_ms,
+            "broadcast_event_ms": broadcast_ms,
+        }
+
+    return asyncio.run(run())
@@ -0,0 +1,169 @@
+# app/services/pricing.py
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import local_cache
+from app.db.connection import engine
+from app.models.product_channel_price import ProductChannelPrice as ProductChannelPriceModel
+
+logger = logging.getLogger(__name__)
+
+# Namespace cache yang dipakai penulis harga: mark_stale(db, PRICE_NAMESPACE, product_id)
+PRICE_NAMESPACE = "product_price"
+
+
+@dataclass(frozen=True)
+class PriceRule:
+    id: int
+    price: float
+    outlet_id: Optional[int]
+    valid_from: Optional[datetime]
+    valid_to: Optional[datetime]
+
+    def applies(self, outlet_id: Optional[int], at: datetime) -> bool:
+        if self.outlet_id is not None and self.outlet_id != outlet_id:
+            return False
+        if self.valid_from is not None and at < self.valid_from:
+            return False
+        if self.valid_to is not None and at >= self.valid_to:
+            return False
+        return True
+
+
+def _precedence(rule: PriceRule):
+    # Outlet-spesifik mengalahkan semua-outlet; lalu yang valid_from-nya paling baru
+    starts = rule.valid_from.timestamp() if rule.valid_from is not None else float("-inf")
+    return (rule.outlet_id is None, -starts, -rule.id)
+
+
+class PriceBook:
+    """
+    In-memory channel price overrides: product_id -> {sales_channel_id: rules}.
+
+    Each channel holds its rules already sorted by precedence, so resolving a
+    cart line is two dict lookups plus a scan of a (typically one or two
+    element) tuple. The book is loaded at startup and kept current
+    incrementally: price writers call mark_stale(db, "product_price",
+    product_id), the cache bus delivers the eviction to every worker, and only
+    the affected products are reloaded and swapped in, each as a whole new
+    per-product dict, so a price write costs O(rules of that product) no
+    matter how large the catalog is. A full cache flush (bus reconnect or gap)
+    triggers a full reload.
+    """
+
+    def __init__(self):
+        self._rules: Dict[int, Dict[int, Tuple[PriceRule, ...]]] = {}
+        self._pending: Set[Optional[int]] = set()
+        self._reload_task: Optional[asyncio.Task] = None
+        self.version = 0
+        self.loaded = False
+
+    def resolve(
+        self,
+        product_id: int,
+        sales_channel_id: int,
+        outlet_id: Optional[int] = None,
+        at: Optional[datetime] = None,
+    ) -> Optional[PriceRule]:
+        """Return the winning override, or None when the product's base_price applies."""
+        rules = self._rules.get(product_id, {}).get(sales_channel_id)
+        if not rules:
+            return None
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc) # Batas aturan selalu tz-aware
+        for rule in rules:
+            if rule.applies(outlet_id, at):
+                return rule
+        return None
+
+    async def load(self) -> None:
+        """Full (re)load of all live overrides."""
+        rules = await self._fetch(None)
+        self._rules = rules
+        self.version += 1
+        self.loaded = True
+        logger.info("Price book loaded: %d products with overrides (version %d).", len(rules), self.version)
+
+    async def reload_products(self, product_ids: Iterable[int]) -> None:
+        product_ids = list(set(product_ids))
+        if not product_ids:
+            return
+        fresh = await self._fetch(product_ids)
+        # Hanya entri produk yang berubah yang ditukar (tanpa await di antaranya): pembaca melihat
+        # dict per produk yang lama atau yang baru, tidak pernah setengah jadi
+        for product_id in product_ids:
+            if product_id in fresh:
+                self._rules[product_id] = fresh[product_id]
+            else:
+                self._rules.pop(product_id, None)
+        self.version += 1
+
+    async def _fetch(self, product_ids: Optional[list]) -> Dict[int, Dict[int, Tuple[PriceRule, ...]]]:
+        query = select(
+            ProductChannelPriceModel.id,
+            ProductChannelPriceModel.product_id,
+            ProductChannelPriceModel.sales_channel_id,
+            ProductChannelPriceModel.outlet_id,
+            ProductChannelPriceModel.price,
+            ProductChannelPriceModel.valid_from,
+            ProductChannelPriceModel.valid_to,
+        ).where(
+            ProductChannelPriceModel.is_active == True,
+            ProductChannelPriceModel.deleted_at.is_(None),
+        )
+        if product_ids is not None:
+            query = query.where(ProductChannelPriceModel.product_id == any_(literal(product_ids, ARRAY(Integer))))
+
+        grouped: Dict[int, Dict[int, list]] = {}
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            result = await session.execute(query)
+            for row in result:
+                rule = PriceRule(row.id, row.price, row.outlet_id, row.valid_from, row.valid_to)
+                grouped.setdefault(row.product_id, {}).setdefault(row.sales_channel_id, []).append(rule)
+        return {
+            product_id: {channel_id: tuple(sorted(rules, key=_precedence)) for channel_id, rules in channels.items()}
+            for product_id, channels in grouped.items()
+        }
+
+    def on_cache_evict(self, namespace: str, key: Optional[Hashable]) -> None:
+        """LocalCache listener: schedule a (debounced) reload for changed products."""
+        if namespace == "*" or (namespace == PRICE_NAMESPACE and key is None):
+            self._pending.add(None)
+        elif namespace == PRICE_NAMESPACE:
+            self._pending.add(key)
+        else:
+            return
+        if self.loaded and (self._reload_task is None or self._reload_task.done()):
+            try:
+                self._reload_task = asyncio.get_running_loop().create_task(self._apply_pending())
+            except RuntimeError:
+                pass # Tidak ada event loop (mis. skrip sinkron); reload berikutnya akan menangani
+
+    async def _apply_pending(self) -> None:
+        # Loop sampai tidak ada sisa: invalidasi bisa datang selama reload berjalan
+        while self._pending:
+            await asyncio.sleep(0.05) # Gabungkan burst invalidasi
+            pending, self._pending = self._pending, set()
+            try:
+                if None in pending:
+                    await self.load()
+                else:
+                    await self.reload_products(pending)
+            except Exception:
+                logger.exception("Price book reload failed; retrying with a full reload.")
+                self._pending.add(None)
+                await asyncio.sleep(1)
+
+
+price_book = PriceBook()
+local_cache.add_listener(price_book.on_cache_evict)
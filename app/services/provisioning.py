@@ -0,0 +1,305 @@
+# app/services/provisioning.py
+
+"""
+Declarative, idempotent seeding and tenant provisioning.
+
+A seed spec is a JSON (or YAML, when PyYAML is installed) document with one
+list per entity. Rows reference each other by natural key instead of id:
+
+    {
+      "companies": [{"name": "Default Company", "email": "info@default.com"}],
+      "outlets":   [{"name": "Main Outlet", "company": "Default Company"}],
+      "roles":     [{"name": "admin"}],
+      "user_roles": [{"user": "superadmin", "role": "admin"}]
+    }
+
+Each entity is written with one multi-row INSERT ... ON CONFLICT per batch.
+The conflict branch is a no-op DO UPDATE (or a real update with
+update=True), so RETURNING yields ids for new and existing rows alike and
+foreign keys of later entities are resolved in memory. References to rows
+that are not part of the spec (e.g. an existing role) are looked up with a
+single SELECT per entity. Applying the same spec twice changes nothing.
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Table, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_password_hash
+from app.models.company import Company
+from app.models.outlet import Outlet
+from app.models.permission import Permission
+from app.models.role import Role
+from app.models.role_permission import RolePermission
+from app.models.sales_channel import SalesChannel
+from app.models.uom import UOM
+from app.models.user import User
+from app.models.user_role import UserRole
+from app.services.cache_bus import mark_stale
+
+try: # YAML opsional; JSON selalu didukung
+    import yaml
+except ImportError: # pragma: no cover
+    yaml = None
+
+SEED_DIR = Path(__file__).resolve().parent.parent / "seeds"
+INITIAL_SEED_SPEC = SEED_DIR / "initial_data.json"
+TENANT_TEMPLATE_SPEC = SEED_DIR / "tenant_defaults.json"
+
+# Batas baris per INSERT (PostgreSQL membatasi 32767 parameter per statement)
+SEED_BATCH_SIZE = 1000
+
+
+class SeedSpecError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SeedEntity:
+    name: str
+    table: Table
+    # Kolom natural key (harus ber-unique constraint/index); target ON CONFLICT
+    key: Tuple[str, ...]
+    # field di spec -> (entity yang dirujuk, kolom FK)
+    refs: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # Tabel asosiasi tanpa kolom id
+    link: bool = False
+    # Namespace LocalCache yang harus diinvalidasi jika entity ini ditulis
+    cache_namespace: Optional[str] = None
+
+
+# Urutan = urutan penulisan (yang dirujuk lebih dulu)
+SEED_ENTITIES: List[SeedEntity] = [
+    SeedEntity("companies", Company.__table__, ("name",), cache_namespace="company"),
+    SeedEntity("uoms", UOM.__table__, ("name",), cache_namespace="uom"),
+    SeedEntity("outlets", Outlet.__table__, ("name",), {"company": ("companies", "company_id")}),
+    SeedEntity("roles", Role.__table__, ("name",)),
+    SeedEntity("permissions", Permission.__table__, ("name",)),
+    SeedEntity(
+        "role_permissions", RolePermission.__table__, ("role_id", "permission_id"),
+        {"role": ("roles", "role_id"), "permission": ("permissions", "permission_id")}, link=True,
+    ),
+    SeedEntity(
+        "sales_channels", SalesChannel.__table__, ("company_id", "code"),
+        {"company": ("companies", "company_id")},
+    ),
+    SeedEntity(
+        "users", User.__table__, ("username",),
+        {"company": ("companies", "company_id"), "outlet": ("outlets", "outlet_id")},
+        cache_namespace="user",
+    ),
+    SeedEntity(
+        "user_roles", UserRole.__table__, ("user_id", "role_id"),
+        {"user": ("users", "user_id"), "role": ("roles", "role_id")}, link=True,
+    ),
+]
+SEED_ENTITY_BY_NAME = {entity.name: entity for entity in SEED_ENTITIES}
+
+# Kolom yang tidak pernah ditimpa saat update=True (hash bcrypt berbeda setiap kali dibuat)
+_INSERT_ONLY_COLUMNS = {"hashed_password"}
+
+
+@dataclass
+class SeedResult:
+    # entity -> natural key (tuple) -> id
+    ids: Dict[str, Dict[tuple, int]] = field(default_factory=dict)
+    # entity -> jumlah baris di spec yang ditulis
+    rows: Dict[str, int] = field(default_factory=dict)
+    statements: int = 0
+
+    def id_of(self, entity: str, *key: Any) -> Optional[int]:
+        return self.ids.get(entity, {}).get(tuple(key))
+
+
+def load_seed_spec(path: Path) -> Dict[str, List[dict]]:
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise SeedSpecError(f"{path.name}: PyYAML is not installed; use a JSON seed spec")
+        spec = yaml.safe_load(text)
+    else:
+        spec = json.loads(text)
+    unknown = set(spec or {}) - set(SEED_ENTITY_BY_NAME)
+    if unknown:
+        raise SeedSpecError(f"{path.name}: unknown seed entities {sorted(unknown)}")
+    return spec or {}
+
+
+def tenant_spec(company: Dict[str, Any], template: Dict[str, List[dict]]) -> Dict[str, List[dict]]:
+    """
+    Expand a tenant template for one company. String values may use
+    "{company}" as a placeholder for the company name (outlet names, for
+    example, are unique across all tenants).
+    """
+    name = company["name"]
+
+    def expand(value):
+        return value.replace("{company}", name) if isinstance(value, str) else value
+
+    spec: Dict[str, List[dict]] = {"companies": [company]}
+    for entity, rows in template.items():
+        expanded = [{key: expand(value) for key, value in row.items()} for row in rows]
+        if SEED_ENTITY_BY_NAME[entity].refs.get("company") and entity != "companies":
+            for row in expanded:
+                row.setdefault("company", name)
+        spec.setdefault(entity, []).extend(expanded)
+    return spec
+
+
+def merge_specs(specs: Iterable[Dict[str, List[dict]]]) -> Dict[str, List[dict]]:
+    merged: Dict[str, List[dict]] = {}
+    for spec in specs:
+        for entity, rows in spec.items():
+            merged.setdefault(entity, []).extend(rows)
+    return merged
+
+
+async def _lookup_external(
+    session: AsyncSession, entity: SeedEntity, keys: Iterable[Any], known: Dict[tuple, int]
+) -> None:
+    """One SELECT for referenced rows that exist in the DB but not in the spec."""
+    keys = [key for key in set(keys) if (key,) not in known]
+    if not keys:
+        return
+    key_column = entity.table.c[entity.key[0]]
+    result = await session.execute(
+        select(entity.table.c.id, key_column).where(key_column.in_(keys))
+    )
+    for row in result:
+        known[(row[1],)] = row[0]
+
+
+async def _resolve_refs(
+    session: AsyncSession, entity: SeedEntity, rows: List[dict], result: SeedResult
+) -> List[dict]:
+    for ref_field, (target_name, _) in entity.refs.items():
+        target = SEED_ENTITY_BY_NAME[target_name]
+        wanted = [row[ref_field] for row in rows if row.get(ref_field) is not None]
+        await _lookup_external(session, target, wanted, result.ids.setdefault(target_name, {}))
+
+    resolved = []
+    for row in rows:
+        values = {key: value for key, value in row.items() if key not in entity.refs}
+        for ref_field, (target_name, column) in entity.refs.items():
+            if ref_field not in row:
+                continue
+            ref_key = row[ref_field]
+            if ref_key is None:
+                values[column] = None
+                continue
+            ref_id = result.ids[target_name].get((ref_key,))
+            if ref_id is None:
+                raise SeedSpecError(f"{entity.name}: {ref_field} {ref_key!r} does not exist")
+            values[column] = ref_id
+        resolved.append(values)
+    return resolved
+
+
+def _prepare_users(rows: List[dict]) -> None:
+    # Hash satu kali per password unik (bcrypt sengaja lambat)
+    hashes: Dict[str, str] = {}
+    for row in rows:
+        password = row.pop("password", None)
+        if password is not None and "hashed_password" not in row:
+            if password not in hashes:
+                hashes[password] = get_password_hash(password)
+            row["hashed_password"] = hashes[password]
+
+
+async def _write_entity(
+    session: AsyncSession, entity: SeedEntity, rows: List[dict], update: bool, result: SeedResult
+) -> None:
+    table = entity.table
+    unknown = {column for row in rows for column in row} - set(table.c.keys())
+    if unknown:
+        raise SeedSpecError(f"{entity.name}: unknown columns {sorted(unknown)}")
+
+    # Baris duplikat dalam satu statement membuat ON CONFLICT DO UPDATE gagal; yang terakhir menang
+    by_key: Dict[tuple, dict] = {}
+    for row in rows:
+        missing = [column for column in entity.key if column not in row]
+        if missing:
+            raise SeedSpecError(f"{entity.name}: row {row!r} is missing key {missing}")
+        by_key[tuple(row[column] for column in entity.key)] = row
+
+    # Multi-row VALUES butuh kolom yang sama di setiap baris, jadi kelompokkan per set kolom
+    groups: Dict[Tuple[str, ...], List[dict]] = {}
+    for row in by_key.values():
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    ids = result.ids.setdefault(entity.name, {})
+    key_columns = [table.c[column] for column in entity.key]
+    for columns, group in groups.items():
+        for start in range(0, len(group), SEED_BATCH_SIZE):
+            statement = insert(table).values(group[start:start + SEED_BATCH_SIZE])
+            if entity.link:
+                await session.execute(statement.on_conflict_do_nothing(index_elements=list(entity.key)))
+                result.statements += 1
+                continue
+
+            if update:
+                set_ = {
+                    column: statement.excluded[column]
+                    for column in columns
+                    if column not in entity.key and column not in _INSERT_ONLY_COLUMNS
+                }
+            else:
+                set_ = {}
+            # No-op update pada key agar RETURNING juga mengembalikan baris yang sudah ada
+            set_ = set_ or {entity.key[0]: statement.excluded[entity.key[0]]}
+            statement = statement.on_conflict_do_update(
+                index_elements=list(entity.key), set_=set_
+            ).returning(table.c.id, *key_columns)
+            rows_returned = await session.execute(statement)
+            result.statements += 1
+            for row in rows_returned:
+                ids[tuple(row[1:])] = row[0]
+
+    result.rows[entity.name] = len(by_key)
+    if entity.cache_namespace:
+        mark_stale(session, entity.cache_namespace)
+
+
+async def apply_seed_spec(
+    session: AsyncSession, spec: Dict[str, List[dict]], update: bool = False
+) -> SeedResult:
+    """
+    Apply a seed spec in the caller's transaction (the caller commits).
+
+    With update=False existing rows are left as they are; with update=True
+    the columns given in the spec overwrite the stored values.
+    """
+    result = SeedResult()
+    for entity in SEED_ENTITIES:
+        rows = spec.get(entity.name)
+        if not rows:
+            continue
+        rows = [dict(row) for row in rows]
+        if entity.name == "users":
+            _prepare_users(rows)
+        resolved = await _resolve_refs(session, entity, rows, result)
+        await _write_entity(session, entity, resolved, update, result)
+    return result
+
+
+async def provision_tenants(
+    session: AsyncSession,
+    companies: List[Dict[str, Any]],
+    template: Optional[Dict[str, List[dict]]] = None,
+) -> Dict[str, int]:
+    """
+    Create (or complete) many tenants with their default outlets, channels, ...
+    in one pass: every entity is one batched statement for all companies.
+    Returns company name -> company id. The caller commits.
+    """
+    if template is None:
+        template = load_seed_spec(TENANT_TEMPLATE_SPEC)
+    spec = merge_specs(tenant_spec(company, template) for company in companies)
+    result = await apply_seed_spec(session, spec)
+    return {company["name"]: result.id_of("companies", company["name"]) for company in companies}
@@ -0,0 +1,242 @@
+# app/services/receipt_layout.py
+
+"""
+Receipt layout and output encoders, executed in the render worker processes
+(see app/services/receipts.py).
+
+Only the standard library is imported here: the pool starts its workers with
+the "spawn" method, and a worker that imported the app (settings, engine,
+models) would pay for it on every (re)start.
+
+A receipt is laid out once as plain text lines for the template's paper
+width, then encoded:
+  - "text": UTF-8 text (preview, screen);
+  - "escpos": byte stream for thermal printers (bold/centred header,
+    double-height total, paper cut);
+  - "pdf": a single-page PDF in Courier, sized to the receipt (email).
+
+Templates are compiled (paper width, separators) once per worker process
+and kept in an LRU cache; `TEMPLATE_VERSION` is part of the content hash,
+so changing a layout never serves an old cached render.
+"""
+
+import functools
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+# Naikkan setiap kali layout berubah: hasil render lama di cache tidak terpakai lagi
+TEMPLATE_VERSION = 1
+
+MEDIA_TYPES = {
+    "text": "text/plain; charset=utf-8",
+    "escpos": "application/octet-stream",
+    "pdf": "application/pdf",
+}
+
+
+@dataclass(frozen=True)
+class ReceiptTemplate:
+    width: int # Karakter per baris (font A)
+    feed_lines: int = 4 # Baris kosong sebelum potong kertas
+
+
+TEMPLATES: Dict[str, ReceiptTemplate] = {
+    "roll_58mm": ReceiptTemplate(width=32),
+    "roll_80mm": ReceiptTemplate(width=48),
+}
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    template: ReceiptTemplate
+    separator: str
+    double_separator: str
+
+
+@functools.lru_cache(maxsize=32)
+def compile_template(name: str) -> CompiledTemplate:
+    template = TEMPLATES[name]
+    return CompiledTemplate(
+        template=template,
+        separator="-" * template.width,
+        double_separator="=" * template.width,
+    )
+
+
+# --- Layout ---
+
+def money(value: float) -> str:
+    """Rupiah style: thousands separated by '.', decimals (if any) after ','."""
+    if float(value).is_integer():
+        return f"{value:,.0f}".replace(",", ".")
+    return f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def quantity(value: float) -> str:
+    return f"{value:g}"
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    words, lines, current = text.split(), [], ""
+    for word in words:
+        while len(word) > width: # Kata lebih panjang dari kertas: potong paksa
+            if current:
+                lines.append(current)
+                current = ""
+            lines.append(word[:width])
+            word = word[width:]
+        if not current:
+            current = word
+        elif len(current) + 1 + len(word) <= width:
+            current = f"{current} {word}"
+        else:
+            lines.append(current)
+            current = word
+    if current or not lines:
+        lines.append(current)
+    return lines
+
+
+def _pair(compiled: CompiledTemplate, label: str, amount: str) -> str:
+    width = compiled.template.width
+    label = label[:max(width - len(amount) - 1, 0)]
+    return f"{label}{' ' * (width - len(label) - len(amount))}{amount}"
+
+
+def layout(receipt: Dict[str, Any], compiled: CompiledTemplate) -> Tuple[List[str], List[str], List[str]]:
+    """(header lines, body lines, total lines); the header is centred and the total emphasized by the encoders."""
+    width = compiled.template.width
+    header = _wrap(receipt["store_name"], width)
+    for line in receipt.get("store_address") or []:
+        header.extend(_wrap(line, width))
+
+    body = [compiled.separator]
+    issued_at = str(receipt["issued_at"]).replace("T", " ")[:19]
+    body.append(_pair(compiled, "No", receipt["transaction_id"]))
+    body.append(_pair(compiled, "Tanggal", issued_at))
+    if receipt.get("cashier"):
+        body.append(_pair(compiled, "Kasir", receipt["cashier"]))
+    body.append(compiled.separator)
+
+    for line in receipt["lines"]:
+        body.extend(_wrap(line["name"], width))
+        body.append(_pair(
+            compiled, f"  {quantity(line['quantity'])} x {money(line['unit_price'])}", money(line["total"] + line.get("discount", 0))
+        ))
+        if line.get("discount"):
+            body.append(_pair(compiled, "  Diskon", f"-{money(line['discount'])}"))
+    body.append(compiled.separator)
+
+    body.append(_pair(compiled, "Subtotal", money(receipt["subtotal"])))
+    if receipt.get("discount"):
+        body.append(_pair(compiled, "Diskon", f"-{money(receipt['discount'])}"))
+    if receipt.get("tax"):
+        body.append(_pair(compiled, "Pajak", money(receipt["tax"])))
+
+    totals = [_pair(compiled, "TOTAL", money(receipt["total"]))]
+
+    closing = []
+    for payment in receipt.get("payments") or []:
+        closing.append(_pair(compiled, payment["method"].upper(), money(payment["amount"])))
+    if receipt.get("change"):
+        closing.append(_pair(compiled, "Kembali", money(receipt["change"])))
+    if receipt.get("footer"):
+        closing.append("")
+        for line in receipt["footer"]:
+            closing.extend(_wrap(line, width))
+    return header, body, totals + closing
+
+
+# --- Encoders ---
+
+def _ascii(text: str) -> str:
+    # Font bawaan printer thermal hanya aman untuk ASCII: buang diakritik, sisanya "?"
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in normalized if not unicodedata.combining(c)).encode("ascii", "replace").decode("ascii")
+
+
+def encode_text(header: List[str], body: List[str], totals: List[str], compiled: CompiledTemplate) -> bytes:
+    width = compiled.template.width
+    lines = [line.center(width).rstrip() for line in header] + body + [compiled.double_separator] + totals
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+ESC, GS = b"\x1b", b"\x1d"
+
+
+def encode_escpos(header: List[str], body: List[str], totals: List[str], compiled: CompiledTemplate) -> bytes:
+    out = bytearray(ESC + b"@") # Inisialisasi printer
+    out += ESC + b"a\x01" + ESC + b"E\x01" # Rata tengah, tebal
+    for line in header:
+        out += _ascii(line).encode("ascii") + b"\n"
+    out += ESC + b"E\x00" + ESC + b"a\x00"
+    for line in body:
+        out += _ascii(line).encode("ascii") + b"\n"
+    out += _ascii(compiled.double_separator).encode("ascii") + b"\n"
+    if totals:
+        # Tinggi ganda saja: lebar ganda akan memotong kolom jumlah
+        out += GS + b"!\x01" + _ascii(totals[0]).encode("ascii") + b"\n" + GS + b"!\x00"
+        for line in totals[1:]:
+            out += _ascii(line).encode("ascii") + b"\n"
+    out += ESC + b"d" + bytes([compiled.template.feed_lines])
+    out += GS + b"V\x42\x00" # Potong sebagian setelah feed
+    return bytes(out)
+
+
+_PDF_FONT_SIZE = 9
+_PDF_CHAR_WIDTH = _PDF_FONT_SIZE * 0.6 # Courier: setiap glyph selebar 600/1000 em
+_PDF_LEADING = 11
+_PDF_MARGIN = 12
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("latin-1", "replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def encode_pdf(header: List[str], body: List[str], totals: List[str], compiled: CompiledTemplate) -> bytes:
+    width = compiled.template.width
+    lines = [line.center(width).rstrip() for line in header] + body + [compiled.double_separator] + totals
+    page_width = round(width * _PDF_CHAR_WIDTH + 2 * _PDF_MARGIN)
+    page_height = round(len(lines) * _PDF_LEADING + 2 * _PDF_MARGIN)
+
+    content = bytearray(
+        b"BT /F1 %d Tf %d TL %d %d Td\n" % (_PDF_FONT_SIZE, _PDF_LEADING, _PDF_MARGIN, page_height - _PDF_MARGIN - _PDF_FONT_SIZE)
+    )
+    for line in lines:
+        content += _pdf_string(line) + b" Tj T*\n"
+    content += b"ET"
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>"
+        % (page_width, page_height),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + bytes(content) + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+ENCODERS = {"text": encode_text, "escpos": encode_escpos, "pdf": encode_pdf}
+
+
+def render(receipt: Dict[str, Any], template: str, fmt: str) -> Tuple[bytes, float]:
+    """Entry point of the worker process: (output, CPU seconds spent)."""
+    started = time.process_time()
+    compiled = compile_template(template)
+    header, body, totals = layout(receipt, compiled)
+    output = ENCODERS[fmt](header, body, totals, compiled)
+    return output, time.process_time() - started
@@ -0,0 +1,302 @@
+# app/services/receipts.py
+
+"""
+Receipt rendering off the event loop.
+
+    output = await receipt_renderer.render(receipt, "escpos", "roll_58mm")
+    results = await receipt_renderer.reprint(company_id, [("TRX-1", "pdf", None), ...])
+
+Laying out a receipt and encoding it (ESC/POS, PDF) is pure CPU work, so it
+runs in a process pool (app/services/receipt_layout.py) and never blocks
+the event loop or holds the GIL of the worker serving requests.
+
+Outputs are cached per (company, transaction, content hash, format): the
+content hash covers the payload, the template and TEMPLATE_VERSION, so a
+corrected transaction or a changed layout is rendered again, while a
+reprint of an unchanged receipt costs a dictionary lookup. The last payload
+of every rendered transaction is kept (bounded LRU) so a reprint only needs
+the transaction id.
+
+Reprints must not slow down checkout. The pool has one process per slot:
+RECEIPT_REPRINT_CONCURRENCY slots (at most RECEIPT_RENDER_WORKERS - 1) for
+reprints and the rest for checkout, with one extra process when
+RECEIPT_RENDER_WORKERS is 1. Renders in flight never exceed the pool, so a
+storm of reprints waits in its own queue instead of in front of the
+customer at the counter. A slot is only given back when its process is
+free again; a render that timed out keeps its slot until it finishes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services import receipt_layout
+from app.services.receipt_layout import TEMPLATE_VERSION, TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+# Jendela waktu untuk angka throughput (render per detik)
+_THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+class ReceiptError(Exception):
+    """Unknown template, or a render that failed or timed out."""
+
+
+@dataclass(frozen=True)
+class RenderedReceipt:
+    transaction_id: str
+    format: str
+    content_hash: str
+    content: bytes
+    cached: bool
+
+    @property
+    def media_type(self) -> str:
+        return receipt_layout.MEDIA_TYPES[self.format]
+
+
+def content_hash(receipt: Dict[str, Any], template: str) -> str:
+    canonical = json.dumps(
+        {"receipt": receipt, "template": template, "version": TEMPLATE_VERSION},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class _LRU:
+    """OrderedDict LRU bounded by entry count and (optionally) total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any) -> Any:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any) -> None:
+        size = len(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes // 4: # Satu PDF besar tidak boleh mendominasi cache
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None and self.max_bytes is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = value
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            if self.max_bytes is not None:
+                self._bytes -= len(evicted)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+
+class ReceiptRenderer:
+    """Process-pool renderer with an output cache and separate checkout/reprint capacity."""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._checkout_slots: Optional[asyncio.Semaphore] = None
+        self._reprint_slots: Optional[asyncio.Semaphore] = None
+        self._outputs = _LRU(settings.RECEIPT_CACHE_ENTRIES, settings.RECEIPT_CACHE_MAX_BYTES)
+        # (company_id, transaction_id) -> (payload, template, content hash) untuk reprint
+        self._payloads = _LRU(settings.RECEIPT_PAYLOAD_ENTRIES)
+        self._completed: Deque[float] = deque()
+        self.renders = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.render_seconds = 0.0 # CPU di proses worker
+        self.wait_seconds = {"checkout": 0.0, "reprint": 0.0} # Antre menunggu slot
+        self.max_wait_seconds = {"checkout": 0.0, "reprint": 0.0}
+
+    @property
+    def reprint_slots(self) -> int:
+        # Minimal satu slot selalu tersisa untuk checkout
+        return max(min(settings.RECEIPT_REPRINT_CONCURRENCY, settings.RECEIPT_RENDER_WORKERS - 1), 1)
+
+    @property
+    def checkout_slots(self) -> int:
+        return max(settings.RECEIPT_RENDER_WORKERS - self.reprint_slots, 1)
+
+    @property
+    def workers(self) -> int:
+        """Processes in the pool: one per checkout or reprint slot (0 = render in threads)."""
+        if settings.RECEIPT_RENDER_WORKERS <= 0:
+            return 0
+        return self.checkout_slots + self.reprint_slots
+
+    def _new_pool(self) -> Optional[ProcessPoolExecutor]:
+        if not self.workers:
+            return None # 0 = render di thread (mis. pengembangan lokal)
+        # spawn, bukan fork: proses anak tidak mewarisi event loop, koneksi DB dan thread milik worker ini
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def start(self) -> None:
+        if self._checkout_slots is not None:
+            return
+        # Jumlah slot = jumlah proses: reprint tidak pernah mengantre di depan checkout di dalam pool
+        self._checkout_slots = asyncio.Semaphore(self.checkout_slots)
+        self._reprint_slots = asyncio.Semaphore(self.reprint_slots)
+        self._pool = self._new_pool()
+        if self._pool is not None:
+            # Panaskan proses worker (import + kompilasi template) sebelum struk pertama
+            await asyncio.gather(*(
+                asyncio.get_running_loop().run_in_executor(self._pool, receipt_layout.compile_template, name)
+                for name in TEMPLATES for _ in range(self.workers)
+            ), return_exceptions=True)
+
+    async def stop(self) -> None:
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+        self._checkout_slots = None
+        self._reprint_slots = None
+
+    @staticmethod
+    def _release_when_done(slots: asyncio.Semaphore, future: "asyncio.Future") -> None:
+        def release(done: "asyncio.Future") -> None:
+            slots.release()
+            if not done.cancelled():
+                done.exception() # Hasil render yang terlambat dibuang tanpa peringatan "never retrieved"
+        future.add_done_callback(release)
+
+    async def _execute(
+        self, pool: Optional[ProcessPoolExecutor], slots: asyncio.Semaphore,
+        receipt: Dict[str, Any], template: str, fmt: str,
+    ) -> Tuple[bytes, float]:
+        """
+        Render in the pool with an acquired slot and give it back. The slot
+        follows the process, not the caller: on timeout or cancellation it is
+        released only when the render actually finishes, so the pool is never
+        oversubscribed.
+        """
+        try:
+            future = asyncio.get_running_loop().run_in_executor(pool, receipt_layout.render, receipt, template, fmt)
+        except BaseException:
+            slots.release()
+            raise
+        try:
+            done, _ = await asyncio.wait({future}, timeout=settings.RECEIPT_RENDER_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            self._release_when_done(slots, future)
+            raise
+        if not done:
+            self._release_when_done(slots, future)
+            raise asyncio.TimeoutError()
+        slots.release()
+        return future.result()
+
+    async def _run(self, receipt: Dict[str, Any], template: str, fmt: str, kind: str) -> bytes:
+        if self._checkout_slots is None:
+            await self.start()
+        slots = self._checkout_slots if kind == "checkout" else self._reprint_slots
+        queued_at = time.monotonic()
+        await slots.acquire()
+        waited = time.monotonic() - queued_at
+        self.wait_seconds[kind] += waited
+        self.max_wait_seconds[kind] = max(self.max_wait_seconds[kind], waited)
+        pool = self._pool
+        try:
+            output, cpu_seconds = await self._execute(pool, slots, receipt, template, fmt)
+        except BrokenProcessPool:
+            # Proses worker mati (mis. OOM): ganti pool agar render berikutnya tidak ikut gagal
+            self.failures += 1
+            if self._pool is pool:
+                logger.error("Receipt render pool broken; starting a new one.")
+                self._pool = self._new_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise ReceiptError("Render worker crashed.")
+        except asyncio.TimeoutError:
+            self.failures += 1
+            raise ReceiptError("Render timed out.")
+        except Exception as e:
+            self.failures += 1
+            logger.exception("Receipt render failed.")
+            raise ReceiptError(f"Render failed: {e}")
+        self.renders += 1
+        self.render_seconds += cpu_seconds
+        self._completed.append(time.monotonic())
+        return output
+
+    async def render(self, receipt: Dict[str, Any], fmt: str, template: str, kind: str = "checkout") -> RenderedReceipt:
+        """Render (or take from cache) a receipt payload and remember it for reprints."""
+        if template not in TEMPLATES:
+            raise ReceiptError(f"Unknown template '{template}'.")
+        digest = content_hash(receipt, template)
+        key = (receipt["company_id"], receipt["transaction_id"])
+        self._payloads.set(key, (receipt, template, digest))
+
+        cached = self._outputs.get((*key, digest, fmt))
+        if cached is not None:
+            self.cache_hits += 1
+            return RenderedReceipt(receipt["transaction_id"], fmt, digest, cached, cached=True)
+        output = await self._run(receipt, template, fmt, kind)
+        self._outputs.set((*key, digest, fmt), output)
+        return RenderedReceipt(receipt["transaction_id"], fmt, digest, output, cached=False)
+
+    async def reprint(
+        self, company_id: int, items: Sequence[Tuple[str, str, Optional[str]]]
+    ) -> List[Tuple[str, str, Optional[RenderedReceipt], Optional[str]]]:
+        """
+        Reprint (transaction_id, format, template or None) items from the
+        remembered payloads, in order; each result is (transaction_id,
+        format, output or None, error: None, "not_found" or "failed").
+        Identical items are rendered once.
+        """
+        tasks: Dict[Tuple[str, str, Optional[str]], "asyncio.Future"] = {}
+
+        async def one(transaction_id: str, fmt: str, template: Optional[str]) -> Tuple[Optional[RenderedReceipt], Optional[str]]:
+            stored = self._payloads.get((company_id, transaction_id))
+            if stored is None:
+                return None, "not_found"
+            receipt, original_template, _ = stored
+            try:
+                return await self.render(receipt, fmt, template or original_template, kind="reprint"), None
+            except ReceiptError:
+                return None, "failed"
+
+        for item in items:
+            if item not in tasks:
+                tasks[item] = asyncio.ensure_future(one(*item))
+        await asyncio.gather(*tasks.values())
+        return [(item[0], item[1], *tasks[item].result()) for item in items]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        while self._completed and now - self._completed[0] > _THROUGHPUT_WINDOW_SECONDS:
+            self._completed.popleft()
+        return {
+            "workers": self.workers,
+            "renders": self.renders,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "renders_per_second": round(len(self._completed) / _THROUGHPUT_WINDOW_SECONDS, 2),
+            "avg_render_ms": round(self.render_seconds / self.renders * 1000, 3) if self.renders else None,
+            "wait_seconds": {kind: round(value, 3) for kind, value in self.wait_seconds.items()},
+            "max_wait_seconds": {kind: round(value, 3) for kind, value in self.max_wait_seconds.items()},
+            "cached_outputs": len(self._outputs),
+            "cached_bytes": self._outputs.bytes,
+            "remembered_receipts": len(self._payloads),
+        }
+
+
+receipt_renderer = ReceiptRenderer()
@@ -0,0 +1,284 @@
+# app/services/recipes.py
+
+"""
+Bill-of-materials explosion: which raw materials, in their stock UOM, one
+unit of a product consumes through all levels of sub-recipes.
+
+    per_unit = await recipe_book.explode(db, company_id, product_id)
+    basket = await recipe_book.explode_basket(db, company_id, {latte_id: 2, croissant_id: 1})
+    basket.materials    # {raw material id: quantity in its stock UOM}
+    basket.stock_uoms   # {raw material id: stock UOM id}
+
+A product without a recipe is itself the raw material ({product_id: 1}).
+Recipe quantities are converted to the material's stock UOM with
+`product_uom_conversions`; a missing conversion or a cycle raises
+RecipeError.
+
+Explosions are memoized per product on every worker, sub-recipes included,
+so a basket usually costs dictionary lookups only. Misses are loaded
+together: one query per recipe level for the whole basket, then one for the
+products and one for the conversions involved.
+
+Invalidation follows reverse dependencies. Recipe and conversion writers
+call mark_stale(db, "recipe", product_id); product writes already publish
+mark_stale(db, "product", product_id) (e.g. a new stock UOM). The cache bus
+delivers the eviction to every worker, which drops that product and every
+memoized product that (transitively) uses it.
+"""
+
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import Integer, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import local_cache
+from app.models.product import Product as ProductModel
+from app.models.product_uom_conversion import ProductUOMConversion as ProductUOMConversionModel
+from app.models.recipe_material import RecipeMaterial as RecipeMaterialModel
+
+logger = logging.getLogger(__name__)
+
+# Namespace cache yang dipakai penulis resep/konversi: mark_stale(db, RECIPE_NAMESPACE, product_id)
+RECIPE_NAMESPACE = "recipe"
+# Perubahan produk (mis. UOM stok) juga mengubah hasil explosion
+_PRODUCT_NAMESPACE = "product"
+
+# Batas kedalaman sub-resep; lebih dalam dari ini hampir pasti data yang salah
+MAX_DEPTH = 32
+
+
+class RecipeError(Exception):
+    """Unknown product, recipe cycle or missing UOM conversion."""
+
+
+@dataclass(frozen=True)
+class Explosion:
+    company_id: int
+    # Bahan mentah -> jumlah dalam satuan stoknya, per 1 satuan stok produk
+    materials: Mapping[int, float]
+    # Bahan mentah -> satuan stoknya, dari data yang sama dengan perhitungan jumlahnya
+    stock_uoms: Mapping[int, int]
+
+
+def _ids(values: Iterable[int]):
+    return literal(sorted(values), ARRAY(Integer))
+
+
+class _Graph:
+    """Recipe rows, stock UOMs and conversions loaded for one computation."""
+
+    def __init__(self):
+        self.recipes: Dict[int, List[Tuple[int, float, int]]] = {}
+        self.stock_uoms: Dict[int, int] = {}
+        self.conversions: Dict[Tuple[int, int], float] = {}
+
+
+class RecipeBook:
+    def __init__(self):
+        self._exploded: Dict[int, Explosion] = {}
+        # Bahan -> produk ter-memo yang memakainya langsung (dependensi terbalik)
+        self._parents: Dict[int, Set[int]] = {}
+        # Naik setiap invalidasi: hasil yang dihitung dari data lama tidak disimpan
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    # --- Invalidasi ---
+
+    def on_cache_evict(self, namespace: str, key: Optional[Hashable]) -> None:
+        """LocalCache listener: drop a changed product and everything built from it."""
+        if namespace == "*" or (namespace in (RECIPE_NAMESPACE, _PRODUCT_NAMESPACE) and key is None):
+            self.clear()
+        elif namespace in (RECIPE_NAMESPACE, _PRODUCT_NAMESPACE):
+            self.invalidate(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._exploded.clear()
+        self._parents.clear()
+
+    def invalidate(self, product_id: int) -> int:
+        """Drop a product's memo and those of all its (transitive) parents; returns how many were dropped."""
+        self._generation += 1
+        dropped, stack, seen = 0, [product_id], set()
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            dropped += self._exploded.pop(current, None) is not None
+            stack.extend(self._parents.pop(current, ()))
+        return dropped
+
+    # --- Explosion ---
+
+    async def explode(self, db: AsyncSession, company_id: int, product_id: int) -> Explosion:
+        """Raw materials (stock UOM) consumed by one stock unit of a product."""
+        return (await self.explode_many(db, company_id, [product_id]))[product_id]
+
+    async def explode_many(
+        self, db: AsyncSession, company_id: int, product_ids: Iterable[int], use_memo: bool = True
+    ) -> Dict[int, Explosion]:
+        """
+        Explode several products in one computation. With use_memo=False the
+        memo is neither read nor written, e.g. to validate an uncommitted
+        recipe change inside the writer's transaction.
+        """
+        product_ids = set(product_ids)
+        results: Dict[int, Explosion] = {}
+        missing = set()
+        for product_id in product_ids:
+            memo = self._exploded.get(product_id) if use_memo else None
+            if memo is not None and memo.company_id == company_id:
+                results[product_id] = memo
+                self.hits += 1
+            else:
+                missing.add(product_id)
+        if not missing:
+            return results
+
+        self.misses += len(missing)
+        generation = self._generation
+        graph = await self._load(db, company_id, missing, use_memo)
+        unknown = missing - graph.stock_uoms.keys()
+        if unknown:
+            raise RecipeError(f"Product(s) {sorted(unknown)} not found for company {company_id}.")
+
+        computed: Dict[int, Explosion] = {}
+        for product_id in missing:
+            results[product_id] = self._compute(product_id, company_id, graph, computed, [], use_memo)
+
+        if use_memo and generation == self._generation:
+            for product_id, explosion in computed.items():
+                self._exploded[product_id] = explosion
+                for material_id, _, _ in graph.recipes.get(product_id, ()):
+                    self._parents.setdefault(material_id, set()).add(product_id)
+        return results
+
+    async def explode_basket(self, db: AsyncSession, company_id: int, items: Mapping[int, float]) -> Explosion:
+        """Total raw materials for a basket of {product_id: quantity}, e.g. for stock deduction at checkout."""
+        exploded = await self.explode_many(db, company_id, items.keys())
+        totals: Dict[int, float] = {}
+        stock_uoms: Dict[int, int] = {}
+        for product_id, quantity in items.items():
+            for material_id, per_unit in exploded[product_id].materials.items():
+                totals[material_id] = totals.get(material_id, 0.0) + per_unit * quantity
+            stock_uoms.update(exploded[product_id].stock_uoms)
+        return Explosion(company_id, MappingProxyType(totals), MappingProxyType(stock_uoms))
+
+    def _compute(
+        self, product_id: int, company_id: int, graph: _Graph,
+        computed: Dict[int, Explosion], path: List[int], use_memo: bool,
+    ) -> Explosion:
+        if product_id in computed:
+            return computed[product_id]
+        memo = self._exploded.get(product_id) if use_memo else None
+        if memo is not None and memo.company_id == company_id:
+            return memo
+        if product_id in path:
+            cycle = " -> ".join(str(node) for node in path[path.index(product_id):] + [product_id])
+            raise RecipeError(f"Recipe cycle: {cycle}.")
+        if len(path) >= MAX_DEPTH:
+            raise RecipeError(f"Recipe of product {path[0]} is nested deeper than {MAX_DEPTH} levels.")
+
+        rows = graph.recipes.get(product_id)
+        if not rows:
+            # Tanpa resep: produk ini sendiri bahan mentahnya
+            materials = {product_id: 1.0}
+            stock_uoms = {product_id: graph.stock_uoms[product_id]}
+        else:
+            materials, stock_uoms = {}, {}
+            path.append(product_id)
+            for material_id, quantity, uom_id in rows:
+                stock_quantity = quantity * self._factor(material_id, uom_id, graph)
+                sub = self._compute(material_id, company_id, graph, computed, path, use_memo)
+                for raw_id, per_unit in sub.materials.items():
+                    materials[raw_id] = materials.get(raw_id, 0.0) + stock_quantity * per_unit
+                stock_uoms.update(sub.stock_uoms)
+            path.pop()
+        computed[product_id] = Explosion(company_id, MappingProxyType(materials), MappingProxyType(stock_uoms))
+        return computed[product_id]
+
+    @staticmethod
+    def _factor(material_id: int, uom_id: int, graph: _Graph) -> float:
+        if graph.stock_uoms.get(material_id) == uom_id:
+            return 1.0
+        factor = graph.conversions.get((material_id, uom_id))
+        if factor is None:
+            raise RecipeError(
+                f"No conversion from UOM {uom_id} to the stock UOM of product {material_id}."
+            )
+        return factor
+
+    async def _load(self, db: AsyncSession, company_id: int, product_ids: Set[int], use_memo: bool) -> _Graph:
+        graph = _Graph()
+        seen = set(product_ids)
+        frontier = set(product_ids)
+        # Satu query per level resep untuk seluruh basket
+        while frontier:
+            result = await db.execute(
+                select(
+                    RecipeMaterialModel.product_id,
+                    RecipeMaterialModel.material_product_id,
+                    RecipeMaterialModel.quantity,
+                    RecipeMaterialModel.uom_id,
+                ).where(
+                    RecipeMaterialModel.company_id == company_id,
+                    RecipeMaterialModel.product_id == any_(_ids(frontier)),
+                )
+            )
+            self.queries += 1
+            next_frontier = set()
+            for product_id, material_id, quantity, uom_id in result.all():
+                graph.recipes.setdefault(product_id, []).append((material_id, quantity, uom_id))
+                if material_id in seen:
+                    continue
+                seen.add(material_id)
+                # Sub-resep yang sudah ter-memo tidak perlu dimuat lagi
+                memo = self._exploded.get(material_id) if use_memo else None
+                if memo is None or memo.company_id != company_id:
+                    next_frontier.add(material_id)
+            frontier = next_frontier
+
+        # Produk yang sudah di-soft-delete tetap dihitung: resep lama bisa masih memakainya
+        result = await db.execute(
+            select(ProductModel.id, ProductModel.stock_uom_id)
+            .where(ProductModel.company_id == company_id, ProductModel.id == any_(_ids(seen)))
+            .execution_options(include_deleted=True)
+        )
+        graph.stock_uoms = dict(result.all())
+        self.queries += 1
+
+        material_ids = {material_id for rows in graph.recipes.values() for material_id, _, _ in rows}
+        if material_ids:
+            result = await db.execute(
+                select(
+                    ProductUOMConversionModel.product_id,
+                    ProductUOMConversionModel.uom_id,
+                    ProductUOMConversionModel.factor,
+                ).where(
+                    ProductUOMConversionModel.company_id == company_id,
+                    ProductUOMConversionModel.product_id == any_(_ids(material_ids)),
+                )
+            )
+            graph.conversions = {(product_id, uom_id): factor for product_id, uom_id, factor in result.all()}
+            self.queries += 1
+        return graph
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memoized_products": len(self._exploded),
+            "hits": self.hits,
+            "misses": self.misses,
+            "queries": self.queries,
+        }
+
+
+recipe_book = RecipeBook()
+local_cache.add_listener(recipe_book.on_cache_evict)
@@ -0,0 +1,206 @@
+# app/services/reference_data.py
+
+"""
+In-memory reference data (UOMs and companies) for validation and responses.
+
+Both tables are tiny and almost never change, so every worker keeps an
+immutable, versioned snapshot of them, loaded in `lifespan`. Readers grab
+`reference_data.snapshot` once and work on it without locks; a reload
+builds a new snapshot and swaps the attribute in one assignment, so a
+request never sees a half-updated view.
+
+Writers call mark_stale(db, "uom") / mark_stale(db, "company", company_id);
+the cache bus delivers the eviction to every worker after commit and the
+affected table (or single company) is reloaded. A full cache flush (bus
+reconnect or gap) reloads everything.
+
+An id that is missing from the snapshot is looked up in the database once
+(the row may have been committed a moment ago and the reload is still in
+flight); if it exists, a reload is scheduled.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Hashable, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import local_cache
+from app.db.connection import engine
+from app.models.company import Company as CompanyModel
+from app.models.uom import UOM as UOMModel
+from app.schemas.company import Company as CompanySchema
+from app.schemas.uom import UOMInDB
+
+logger = logging.getLogger(__name__)
+
+UOM_NAMESPACE = "uom"
+COMPANY_NAMESPACE = "company"
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    version: int
+    # Termasuk baris nonaktif dan soft-deleted (produk/user lama masih merujuknya)
+    uoms: Mapping[int, UOMInDB]
+    # Urut id, untuk GET /uoms/
+    uom_list: Tuple[UOMInDB, ...]
+    companies: Mapping[int, CompanySchema]
+
+
+def _uom_snapshot_parts(uoms):
+    ordered = tuple(sorted(uoms, key=lambda uom: uom.id))
+    return MappingProxyType({uom.id: uom for uom in ordered}), ordered
+
+
+def _is_live(row) -> bool:
+    return row is not None and row.is_active and row.deleted_at is None
+
+
+class ReferenceDataStore:
+    def __init__(self):
+        self.snapshot = ReferenceSnapshot(0, MappingProxyType({}), (), MappingProxyType({}))
+        # None = reload penuh; UOM_NAMESPACE = semua UOM; (COMPANY_NAMESPACE, id) = satu company
+        self._pending: Set[Hashable] = set()
+        self._reload_task: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    async def load(self) -> None:
+        """Full (re)load of both tables."""
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            uoms = await self._fetch_uoms(session)
+            companies = await self._fetch_companies(session, None)
+        uom_map, uom_list = _uom_snapshot_parts(uoms)
+        self._swap(uoms=uom_map, uom_list=uom_list, companies=MappingProxyType({c.id: c for c in companies}))
+        self.loaded = True
+        logger.info(
+            "Reference data loaded: %d UOMs, %d companies (version %d).",
+            len(uom_map), len(self.snapshot.companies), self.snapshot.version,
+        )
+
+    def _swap(self, **changes) -> None:
+        current = self.snapshot
+        self.snapshot = ReferenceSnapshot(
+            version=current.version + 1,
+            uoms=changes.get("uoms", current.uoms),
+            uom_list=changes.get("uom_list", current.uom_list),
+            companies=changes.get("companies", current.companies),
+        )
+
+    async def _fetch_uoms(self, session: AsyncSession):
+        result = await session.execute(select(UOMModel).execution_options(include_deleted=True))
+        return [UOMInDB.model_validate(uom) for uom in result.scalars().all()]
+
+    async def _fetch_companies(self, session: AsyncSession, company_ids: Optional[list]):
+        query = select(CompanyModel).execution_options(include_deleted=True)
+        if company_ids is not None:
+            query = query.where(CompanyModel.id == any_(literal(company_ids, ARRAY(Integer))))
+        result = await session.execute(query)
+        return [CompanySchema.model_validate(company, from_attributes=True) for company in result.scalars().all()]
+
+    async def _reload(self, pending: Set[Hashable]) -> None:
+        if None in pending:
+            await self.load()
+            return
+        company_ids = [key[1] for key in pending if isinstance(key, tuple)]
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            changes = {}
+            if UOM_NAMESPACE in pending:
+                changes["uoms"], changes["uom_list"] = _uom_snapshot_parts(await self._fetch_uoms(session))
+            if COMPANY_NAMESPACE in pending:
+                companies = await self._fetch_companies(session, None)
+                changes["companies"] = MappingProxyType({c.id: c for c in companies})
+            elif company_ids:
+                fresh = {c.id: c for c in await self._fetch_companies(session, company_ids)}
+                companies = {k: v for k, v in self.snapshot.companies.items() if k not in company_ids}
+                companies.update(fresh)
+                changes["companies"] = MappingProxyType(companies)
+        self._swap(**changes)
+
+    def on_cache_evict(self, namespace: str, key: Optional[Hashable]) -> None:
+        """LocalCache listener: schedule a (debounced) reload of what changed."""
+        if namespace == "*":
+            self._pending.add(None)
+        elif namespace == UOM_NAMESPACE:
+            self._pending.add(UOM_NAMESPACE)
+        elif namespace == COMPANY_NAMESPACE:
+            self._pending.add(COMPANY_NAMESPACE if key is None else (COMPANY_NAMESPACE, key))
+        else:
+            return
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self.loaded and (self._reload_task is None or self._reload_task.done()):
+            try:
+                self._reload_task = asyncio.get_running_loop().create_task(self._apply_pending())
+            except RuntimeError:
+                pass # Tidak ada event loop (mis. skrip sinkron)
+
+    async def _apply_pending(self) -> None:
+        # Loop sampai tidak ada sisa: invalidasi bisa datang selama reload berjalan
+        while self._pending:
+            await asyncio.sleep(0.05) # Gabungkan burst invalidasi
+            pending, self._pending = self._pending, set()
+            try:
+                await self._reload(pending)
+            except Exception:
+                logger.exception("Reference data reload failed; retrying with a full reload.")
+                self._pending.add(None)
+                await asyncio.sleep(1)
+
+    # --- Lookup ---
+
+    async def uom(self, db: AsyncSession, uom_id: int) -> Optional[UOMInDB]:
+        uom = self.snapshot.uoms.get(uom_id)
+        if uom is None:
+            row = (await db.execute(
+                select(UOMModel).where(UOMModel.id == uom_id).execution_options(include_deleted=True)
+            )).scalar_one_or_none()
+            if row is None:
+                return None
+            uom = UOMInDB.model_validate(row)
+            self._pending.add(UOM_NAMESPACE)
+            self._schedule()
+        return uom
+
+    async def company(self, db: AsyncSession, company_id: int) -> Optional[CompanySchema]:
+        company = self.snapshot.companies.get(company_id)
+        if company is None:
+            row = (await db.execute(
+                select(CompanyModel).where(CompanyModel.id == company_id).execution_options(include_deleted=True)
+            )).scalar_one_or_none()
+            if row is None:
+                return None
+            company = CompanySchema.model_validate(row, from_attributes=True)
+            self._pending.add((COMPANY_NAMESPACE, company_id))
+            self._schedule()
+        return company
+
+
+reference_data = ReferenceDataStore()
+local_cache.add_listener(reference_data.on_cache_evict)
+
+
+async def get_uom(db: AsyncSession, uom_id: int) -> Optional[UOMInDB]:
+    return await reference_data.uom(db, uom_id)
+
+
+async def get_active_uom(db: AsyncSession, uom_id: int) -> Optional[UOMInDB]:
+    """A UOM that may be assigned to a product: active and not soft-deleted."""
+    uom = await reference_data.uom(db, uom_id)
+    return uom if _is_live(uom) else None
+
+
+async def get_company(db: AsyncSession, company_id: int) -> Optional[CompanySchema]:
+    return await reference_data.company(db, company_id)
+
+
+async def get_active_company(db: AsyncSession, company_id: int) -> Optional[CompanySchema]:
+    """A company that may own products/users: active and not soft-deleted."""
+    company = await reference_data.company(db, company_id)
+    return company if _is_live(company) else None
@@ -0,0 +1,305 @@
+# app/services/scheduler.py
+
+"""
+In-process periodic job scheduler, started from `lifespan`.
+
+Every worker runs the same scheduler loop. Jobs marked `exclusive` (the
+default) run exactly once per interval across all workers and hosts: a
+worker may only run a job after claiming its row in `scheduler_leases` with
+a single conditional upsert, which succeeds for at most one worker once the
+job is due and the previous lease has expired. The lease lasts for the
+job's timeout plus SCHEDULER_LEASE_MARGIN_SECONDS, so a worker that dies
+mid-run blocks the job for at most that long. Non-exclusive jobs (e.g.
+refreshing per-worker in-memory state) run on every worker.
+
+    @scheduler.job("prune_login_throttle", interval=3600, timeout=60)
+    async def prune_login_throttle():
+        ...
+
+Per-job metrics are kept in memory (`scheduler.stats()`); the outcome of
+the last run of exclusive jobs is also recorded in `scheduler_leases`.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.connection import engine
+from app.db.partitioning import create_audit_partitions, drop_audit_partitions_before, month_start
+from app.services.cache_bus import WORKER_ID
+from app.services.tokens import revocation_list
+from app.services.verification import PostgresVerificationStore, verification_store
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[Any]]
+
+_CLAIM_SQL = text(
+    """
+    INSERT INTO scheduler_leases (job_name, owner, lease_until, next_run_at, last_started_at)
+    VALUES (:job, :owner, now() + make_interval(secs => :lease), now() + make_interval(secs => :next), now())
+    ON CONFLICT (job_name) DO UPDATE SET
+        owner = EXCLUDED.owner,
+        lease_until = EXCLUDED.lease_until,
+        next_run_at = EXCLUDED.next_run_at,
+        last_started_at = now()
+    WHERE scheduler_leases.next_run_at <= now()
+      AND scheduler_leases.lease_until <= now()
+    RETURNING job_name
+    """
+)
+
+_FINISH_SQL = text(
+    """
+    UPDATE scheduler_leases SET
+        lease_until = now(),
+        last_finished_at = now(),
+        last_status = :status,
+        last_error = :error,
+        last_duration_seconds = :duration,
+        run_count = run_count + 1
+    WHERE job_name = :job AND owner = :owner
+    """
+)
+
+_RELEASE_SQL = text(
+    "UPDATE scheduler_leases SET lease_until = now() WHERE owner = :owner AND lease_until > now()"
+)
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    # Giliran yang dijalankan worker lain (atau belum jatuh tempo)
+    skipped: int = 0
+    last_duration: Optional[float] = None
+    last_started_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    name: str
+    func: JobFunc
+    interval: float
+    timeout: float
+    # Jitter acak (detik) agar job dan worker tidak serempak
+    jitter: float = 0.0
+    exclusive: bool = True
+    # Jalankan segera saat start, bukan setelah satu interval
+    run_on_start: bool = False
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+
+
+class Scheduler:
+    def __init__(self, owner: str = WORKER_ID):
+        self.owner = owner
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def add_job(
+        self,
+        name: str,
+        func: JobFunc,
+        interval: float,
+        timeout: Optional[float] = None,
+        jitter: Optional[float] = None,
+        exclusive: bool = True,
+        run_on_start: bool = False,
+    ) -> Job:
+        if name in self._jobs:
+            raise ValueError(f"Job {name!r} is already registered")
+        job = Job(
+            name=name,
+            func=func,
+            interval=interval,
+            timeout=timeout if timeout is not None else interval,
+            jitter=jitter if jitter is not None else min(interval * 0.1, 30.0),
+            exclusive=exclusive,
+            run_on_start=run_on_start,
+        )
+        self._jobs[name] = job
+        return job
+
+    def job(self, name: str, interval: float, **options) -> Callable[[JobFunc], JobFunc]:
+        """Decorator form of add_job."""
+        def register(func: JobFunc) -> JobFunc:
+            self.add_job(name, func, interval, **options)
+            return func
+        return register
+
+    async def start(self) -> None:
+        if not settings.SCHEDULER_ENABLED or self._tasks:
+            return
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}") for job in self._jobs.values()
+        ]
+        logger.info("Scheduler started with %d job(s) as %s", len(self._tasks), self.owner)
+
+    async def stop(self, grace: float = 10.0) -> None:
+        if not self._tasks:
+            return
+        self._stopping.set()
+        # Beri job yang sedang berjalan kesempatan selesai, lalu batalkan
+        done, pending = await asyncio.wait(self._tasks, timeout=grace)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(_RELEASE_SQL, {"owner": self.owner})
+        except Exception as e:
+            logger.warning("Could not release scheduler leases: %s", e)
+        logger.info("Scheduler stopped.")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "interval": job.interval,
+                "timeout": job.timeout,
+                "exclusive": job.exclusive,
+                **job.metrics.__dict__,
+            }
+            for name, job in self._jobs.items()
+        }
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleep unless stopping; returns False when the scheduler is stopping."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=max(seconds, 0))
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _loop(self, job: Job) -> None:
+        delay = random.uniform(0, job.jitter) if job.run_on_start else job.interval + random.uniform(0, job.jitter)
+        while await self._sleep(delay):
+            delay = job.interval + random.uniform(0, job.jitter)
+            try:
+                if job.exclusive and not await self._claim(job):
+                    job.metrics.skipped += 1
+                    # Cek lagi lebih cepat agar giliran berikutnya tidak terlambat satu interval penuh
+                    delay = min(delay, max(job.interval / 4, 1.0)) + random.uniform(0, job.jitter)
+                    continue
+            except Exception as e:
+                logger.warning("Scheduler could not claim job %s: %s", job.name, e)
+                continue
+            await self._run(job)
+
+    async def _claim(self, job: Job) -> bool:
+        async with engine.begin() as conn:
+            result = await conn.execute(_CLAIM_SQL, {
+                "job": job.name,
+                "owner": self.owner,
+                "lease": job.timeout + settings.SCHEDULER_LEASE_MARGIN_SECONDS,
+                "next": job.interval + random.uniform(0, job.jitter),
+            })
+            return result.first() is not None
+
+    async def _run(self, job: Job) -> None:
+        metrics = job.metrics
+        metrics.last_started_at = time.time()
+        started = time.monotonic()
+        status, error = "ok", None
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"timed out after {job.timeout}s"
+            metrics.timeouts += 1
+            logger.warning("Scheduled job %s timed out after %.0fs", job.name, job.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status, error = "error", repr(e)[:1000]
+            metrics.failures += 1
+            logger.exception("Scheduled job %s failed", job.name)
+
+        metrics.runs += 1
+        metrics.last_duration = time.monotonic() - started
+        metrics.last_error = error
+        if job.exclusive:
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(_FINISH_SQL, {
+                        "job": job.name,
+                        "owner": self.owner,
+                        "status": status,
+                        "error": error,
+                        "duration": metrics.last_duration,
+                    })
+            except Exception as e:
+                logger.warning("Could not record result of job %s: %s", job.name, e)
+
+
+scheduler = Scheduler()
+
+
+# --- Jobs ---
+
+@scheduler.job("prune_login_throttle_buckets", interval=3600, timeout=120)
+async def prune_login_throttle_buckets() -> None:
+    """Buckets untouched for a day are full again; the row is just dead weight."""
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text("DELETE FROM login_throttle_buckets WHERE updated_at < now() - interval '1 day'")
+        )
+    if result.rowcount:
+        logger.info("Pruned %d idle login throttle bucket(s).", result.rowcount)
+
+
+@scheduler.job("prune_refresh_tokens", interval=3600, timeout=300)
+async def prune_refresh_tokens() -> None:
+    """Expired refresh tokens can never be used again; revoked ones only matter until they expire."""
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text("DELETE FROM refresh_tokens WHERE expires_at < now() - interval '1 day'")
+        )
+    if result.rowcount:
+        logger.info("Pruned %d expired refresh token(s).", result.rowcount)
+
+
+@scheduler.job(
+    "sync_revocation_list", interval=settings.REVOCATION_SYNC_SECONDS, timeout=30, exclusive=False,
+)
+async def sync_revocation_list() -> None:
+    """Per-worker: re-read recent revocations in case a cache bus notification was lost."""
+    await revocation_list.sync()
+
+
+@scheduler.job("purge_verification_codes", interval=300, timeout=120)
+async def purge_verification_codes() -> None:
+    """Postgres backend only; the memory backend expires entries with its own timing wheel."""
+    if not isinstance(verification_store, PostgresVerificationStore):
+        return
+    deleted = await verification_store.purge_expired()
+    if deleted:
+        logger.info("Purged %d expired verification code(s).", deleted)
+
+
+@scheduler.job("maintain_audit_partitions", interval=86400, timeout=120, run_on_start=True)
+async def maintain_audit_partitions() -> None:
+    """Create audit_log partitions ahead of time (so rows never land in the DEFAULT partition) and apply retention."""
+    today = date.today()
+    async with engine.begin() as conn:
+        created = await conn.run_sync(
+            create_audit_partitions, month_start(today), settings.AUDIT_PARTITION_MONTHS_AHEAD + 1
+        )
+        dropped = []
+        if settings.AUDIT_RETENTION_MONTHS > 0:
+            dropped = await conn.run_sync(
+                drop_audit_partitions_before, month_start(today, -settings.AUDIT_RETENTION_MONTHS)
+            )
+    if created or dropped:
+        logger.info("Audit partitions created: %s; dropped: %s", created or "-", dropped or "-")
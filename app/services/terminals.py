@@ -0,0 +1,158 @@
+# app/services/terminals.py
+
+"""
+Cashier PIN login on registered terminals.
+
+A terminal authenticates with its device secret; a cashier enrolled on it
+then logs in with username/email + 6-digit PIN. Both checks are HMACs
+(app/core/security.py), so a login costs microseconds of CPU instead of a
+bcrypt verification.
+
+Everything a PIN login needs about a terminal (its keys and the enrolled
+cashiers with their PIN digests) is one `TerminalRoster`, loaded with a
+single query on first use and then served from the local cache. Switching
+cashiers mid-shift therefore reads nothing from the database (the endpoint
+only records the session as a revocable token family). PIN tokens are
+always limited to the terminal's outlet, superuser or not. Rosters are
+invalidated through the cache bus: writers call
+mark_stale(db, ROSTER_NAMESPACE, terminal_id), and a user change
+(namespace "user") drops the rosters that user is enrolled in.
+"""
+
+import hmac
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Hashable, Mapping, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import local_cache, MISSING
+from app.core.security import get_pin_hash, hash_terminal_secret, verify_pin
+from app.models.terminal import Terminal as TerminalModel, TerminalUserPin as TerminalUserPinModel
+from app.models.user import User as UserModel
+
+ROSTER_NAMESPACE = "terminal_roster"
+
+
+class PinLoginError(Exception):
+    """Unknown/inactive terminal, wrong terminal secret, unknown cashier or wrong PIN."""
+
+
+@dataclass(frozen=True)
+class RosterEntry:
+    user_id: int
+    username: str
+    full_name: Optional[str]
+    company_id: Optional[int]
+    pin_digest: str
+
+
+@dataclass(frozen=True)
+class TerminalRoster:
+    terminal_id: int
+    company_id: int
+    outlet_id: int
+    secret_hash: str
+    pin_key: str
+    users: Mapping[int, RosterEntry]
+    # username/email (lowercase) -> user_id
+    logins: Mapping[str, int]
+
+
+class TerminalRosterCache:
+    def __init__(self):
+        # user_id -> terminal yang roster-nya memuat user itu (untuk invalidasi saat user berubah)
+        self._terminals_of_user: Dict[int, Set[int]] = {}
+
+    async def get(self, db: AsyncSession, terminal_id: int) -> Optional[TerminalRoster]:
+        """Roster of a live, active terminal (None otherwise)."""
+        roster = local_cache.get(ROSTER_NAMESPACE, terminal_id)
+        if roster is not MISSING:
+            return roster
+
+        terminal = (await db.execute(
+            select(TerminalModel).where(TerminalModel.id == terminal_id, TerminalModel.is_active == True)
+        )).scalar_one_or_none()
+        if terminal is None:
+            # Terminal tidak dikenal juga di-cache: percobaan berulang tidak sampai ke database
+            local_cache.set(ROSTER_NAMESPACE, terminal_id, None)
+            return None
+
+        # Hanya kasir aktif yang masih hidup dan berada di company terminal
+        result = await db.execute(
+            select(TerminalUserPinModel.pin_digest, UserModel)
+            .join(UserModel, UserModel.id == TerminalUserPinModel.user_id)
+            .where(
+                TerminalUserPinModel.terminal_id == terminal_id,
+                UserModel.is_active == True,
+                UserModel.company_id == terminal.company_id,
+            )
+        )
+        users, logins = {}, {}
+        for pin_digest, user in result:
+            users[user.id] = RosterEntry(
+                user_id=user.id,
+                username=user.username,
+                full_name=user.full_name,
+                company_id=user.company_id,
+                pin_digest=pin_digest,
+            )
+            logins[user.username.lower()] = user.id
+            logins[user.email.lower()] = user.id
+            self._terminals_of_user.setdefault(user.id, set()).add(terminal_id)
+
+        roster = TerminalRoster(
+            terminal_id=terminal.id,
+            company_id=terminal.company_id,
+            outlet_id=terminal.outlet_id,
+            secret_hash=terminal.secret_hash,
+            pin_key=terminal.pin_key,
+            users=MappingProxyType(users),
+            logins=MappingProxyType(logins),
+        )
+        local_cache.set(ROSTER_NAMESPACE, terminal_id, roster)
+        return roster
+
+    def on_cache_evict(self, namespace: str, key: Optional[Hashable]) -> None:
+        """LocalCache listener: a changed user drops every roster it appears in."""
+        if namespace == "user":
+            if key is None:
+                self._terminals_of_user.clear()
+                local_cache.evict(ROSTER_NAMESPACE)
+                return
+            for terminal_id in self._terminals_of_user.pop(key, ()):
+                local_cache.evict(ROSTER_NAMESPACE, terminal_id)
+        elif namespace == "*":
+            self._terminals_of_user.clear()
+
+
+roster_cache = TerminalRosterCache()
+local_cache.add_listener(roster_cache.on_cache_evict)
+
+
+async def authenticate_terminal(db: AsyncSession, terminal_id: int, terminal_secret: str) -> TerminalRoster:
+    roster = await roster_cache.get(db, terminal_id)
+    if roster is None or not hmac.compare_digest(roster.secret_hash, hash_terminal_secret(terminal_secret)):
+        raise PinLoginError("unknown terminal or wrong terminal secret")
+    return roster
+
+
+async def pin_login(
+    db: AsyncSession, terminal_id: int, terminal_secret: str, username_or_email: str, pin: str
+) -> Tuple[TerminalRoster, RosterEntry]:
+    """Verify terminal and cashier PIN; returns the roster and the cashier."""
+    roster = await authenticate_terminal(db, terminal_id, terminal_secret)
+    user_id = roster.logins.get(username_or_email.strip().lower())
+    entry = roster.users.get(user_id) if user_id is not None else None
+    if entry is None:
+        # Tetap hitung HMAC agar waktu respons tidak membedakan kasir yang tidak terdaftar
+        verify_pin(pin, "", roster.pin_key, 0)
+        raise PinLoginError("cashier not enrolled on this terminal")
+    if not verify_pin(pin, entry.pin_digest, roster.pin_key, entry.user_id):
+        raise PinLoginError("wrong PIN")
+    return roster, entry
+
+
+def pin_digest_for(terminal: TerminalModel, user_id: int, pin: str) -> str:
+    return get_pin_hash(pin, terminal.pin_key, user_id)
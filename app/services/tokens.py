@@ -0,0 +1,189 @@
+# app/services/tokens.py
+
+"""
+Rotating refresh tokens and access-token revocation.
+
+Login issues a short-lived access token (JWT) and an opaque refresh token.
+The refresh token is stored only as an HMAC (app/core/security.py), so a
+refresh is one indexed lookup plus a hash, never a bcrypt verification.
+Each refresh rotates the token: the presented row is marked rotated and a
+new row in the same *family* is issued. Presenting an already rotated (or
+revoked) token means it was copied, so the whole family is revoked.
+
+Access tokens carry their family id (`fam`). Revoked families are kept in
+`revocation_list`, an in-memory set consulted on every request (O(1), no
+database access):
+  - revocations on any worker reach every worker right after commit through
+    the cache bus (namespace TOKEN_FAMILY_NAMESPACE);
+  - a periodic job (app/services/scheduler.py) re-reads recent revocations
+    from the database, covering lost notifications and fresh workers.
+A family only has to stay in the set for as long as an access token issued
+from it can live, so the set holds recent revocations only.
+"""
+
+import asyncio
+import logging
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import local_cache
+from app.core.config import settings
+from app.core.security import generate_refresh_token, hash_refresh_token
+from app.db.connection import engine
+from app.models.refresh_token import RefreshToken as RefreshTokenModel
+from app.models.user import User as UserModel
+from app.services.cache_bus import mark_stale
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FAMILY_NAMESPACE = "token_family"
+
+_RECENT_REVOCATIONS_SQL = text(
+    "SELECT family_id, extract(epoch FROM max(revoked_at)) FROM refresh_tokens "
+    "WHERE revoked_at > now() - make_interval(secs => :window) GROUP BY family_id"
+)
+
+
+class RefreshTokenError(Exception):
+    """The refresh token is unknown, expired or revoked. `reused` = family was just revoked."""
+
+    def __init__(self, reason: str, reused: bool = False):
+        super().__init__(reason)
+        self.reused = reused
+
+
+def new_family_id() -> str:
+    return secrets.token_hex(16)
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> Tuple[str, str]:
+    """Add a refresh token row to the session; returns (token, family_id). The caller commits."""
+    token = generate_refresh_token()
+    family_id = family_id or new_family_id()
+    db.add(RefreshTokenModel(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token, family_id
+
+
+async def revoke_family(db: AsyncSession, family_id: str) -> None:
+    """Revoke every token of a family; all workers learn about it after commit."""
+    await db.execute(
+        update(RefreshTokenModel)
+        .where(RefreshTokenModel.family_id == family_id, RefreshTokenModel.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+    mark_stale(db, TOKEN_FAMILY_NAMESPACE, family_id)
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[UserModel, str, str]:
+    """
+    Exchange a refresh token for a new one; returns (user, new token, family_id).
+    Raises RefreshTokenError; when `reused` is set the family revocation is
+    pending in the session and the caller must commit it.
+    """
+    result = await db.execute(
+        select(RefreshTokenModel, UserModel)
+        .join(UserModel, UserModel.id == RefreshTokenModel.user_id)
+        .where(RefreshTokenModel.token_hash == hash_refresh_token(token))
+        .with_for_update(of=RefreshTokenModel) # Dua refresh bersamaan dengan token yang sama: hanya satu yang lolos
+    )
+    row = result.first()
+    if row is None:
+        raise RefreshTokenError("unknown refresh token")
+    stored, user = row
+
+    if stored.revoked_at is not None:
+        raise RefreshTokenError("refresh token revoked")
+    if stored.rotated_at is not None:
+        # Token lama dipakai lagi: kemungkinan dicuri, cabut seluruh family
+        logger.warning("Refresh token reuse detected for user %s (family %s); revoking family.", user.id, stored.family_id)
+        await revoke_family(db, stored.family_id)
+        raise RefreshTokenError("refresh token reused", reused=True)
+    if stored.expires_at <= datetime.now(timezone.utc):
+        raise RefreshTokenError("refresh token expired")
+    if not user.is_active or user.deleted_at is not None:
+        raise RefreshTokenError("user inactive")
+
+    stored.rotated_at = datetime.now(timezone.utc)
+    new_token, family_id = await issue_refresh_token(db, user.id, stored.family_id)
+    return user, new_token, family_id
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> bool:
+    """Logout: revoke the family of a refresh token. Returns False for an unknown token."""
+    family_id = (await db.execute(
+        select(RefreshTokenModel.family_id).where(RefreshTokenModel.token_hash == hash_refresh_token(token))
+    )).scalar_one_or_none()
+    if family_id is None:
+        return False
+    await revoke_family(db, family_id)
+    return True
+
+
+class RevocationList:
+    """Recently revoked token families, checked on every authenticated request."""
+
+    def __init__(self):
+        # family_id -> waktu pencabutan (epoch); dipangkas setelah access token terlama pasti kedaluwarsa
+        self._families: Dict[str, float] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self.synced_at: Optional[float] = None
+
+    @property
+    def retention_seconds(self) -> float:
+        # Access token berumur ACCESS_TOKEN_EXPIRE_MINUTES; beri kelonggaran untuk selisih jam
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 300
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def is_revoked(self, family_id: Optional[str]) -> bool:
+        return family_id is not None and family_id in self._families
+
+    def add(self, family_id: str, revoked_at: Optional[float] = None) -> None:
+        self._families[family_id] = revoked_at if revoked_at is not None else time.time()
+
+    async def sync(self) -> None:
+        """Rebuild the set from the database (recent revocations only)."""
+        started = time.time()
+        async with engine.connect() as conn:
+            result = await conn.execute(_RECENT_REVOCATIONS_SQL, {"window": self.retention_seconds})
+            fresh = {family_id: float(revoked_at) for family_id, revoked_at in result}
+        # Pencabutan yang tiba lewat cache bus selama query berjalan belum tentu terlihat oleh snapshot query
+        for family_id, revoked_at in self._families.items():
+            if revoked_at >= started - 1:
+                fresh.setdefault(family_id, revoked_at)
+        self._families = fresh
+        self.synced_at = time.time()
+
+    async def _resync(self) -> None:
+        try:
+            await self.sync()
+        except Exception:
+            logger.exception("Revocation list resync failed; the periodic sync will retry.")
+
+    def on_cache_evict(self, namespace: str, key: Optional[Hashable]) -> None:
+        """LocalCache listener: revocations committed on any worker arrive here."""
+        if namespace == TOKEN_FAMILY_NAMESPACE and key is not None:
+            self.add(key)
+        elif namespace == TOKEN_FAMILY_NAMESPACE or namespace == "*":
+            # Notifikasi digabung atau hilang: baca ulang dari database
+            if self.synced_at is not None and (self._sync_task is None or self._sync_task.done()):
+                try:
+                    self._sync_task = asyncio.get_running_loop().create_task(self._resync())
+                except RuntimeError:
+                    pass # Tidak ada event loop (mis. skrip sinkron)
+
+
+revocation_list = RevocationList()
+local_cache.add_listener(revocation_list.on_cache_evict)
@@ -0,0 +1,279 @@
+# app/services/verification.py
+
+"""
+Short-lived verification secrets: 6-digit login codes and account
+activation links.
+
+    await verification_store.issue(LOGIN_CODE, email, code, ttl, payload={"user_id": 1})
+    payload = await verification_store.verify(LOGIN_CODE, email, code)  # raises VerificationError
+
+Entries are addressed by an HMAC of (purpose, subject), so a verification is
+a single primary-key lookup followed by a constant-time digest comparison;
+neither the subject nor the secret is stored in clear. A wrong secret
+counts as an attempt; once `max_attempts` is reached the entry is dropped.
+A successful verification consumes the entry.
+
+Two backends (VERIFICATION_BACKEND):
+  - "memory": one worker/node. A timing wheel drops each entry within one
+    tick of its expiry, so memory use is bounded by the live entries.
+  - "postgres": shared by all workers/hosts (table `verification_codes`).
+    Lookups ignore expired rows; a scheduler job deletes them in batches.
+"""
+
+import abc
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.connection import engine
+
+logger = logging.getLogger(__name__)
+
+# Jenis rahasia; juga bagian dari kunci sehingga kode login tidak bisa dipakai sebagai link
+LOGIN_CODE = "login_code"
+EMAIL_LINK = "email_link"
+
+
+class VerificationError(Exception):
+    """Unknown, expired or exhausted entry, or a wrong secret."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _hmac(*parts: str) -> str:
+    key = settings.SECRET_KEY.get_secret_value().encode()
+    return hmac.new(key, "\x1f".join(parts).encode(), hashlib.sha256).hexdigest()
+
+
+def entry_key(purpose: str, subject: str) -> str:
+    return _hmac("verification-key", purpose, subject.strip().lower())
+
+
+def secret_digest(purpose: str, subject: str, secret: str) -> str:
+    return _hmac("verification-secret", purpose, subject.strip().lower(), secret)
+
+
+class VerificationStore(abc.ABC):
+    """Backend interface; a backend missing issue() or verify() fails when it is constructed."""
+
+    @abc.abstractmethod
+    async def issue(
+        self,
+        purpose: str,
+        subject: str,
+        secret: str,
+        ttl: float,
+        payload: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        """Store (or replace) the secret for a subject."""
+
+    @abc.abstractmethod
+    async def verify(self, purpose: str, subject: str, secret: str) -> Dict[str, Any]:
+        """Consume the entry and return its payload, or raise VerificationError."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+# --- Memory ---
+
+class TimingWheel:
+    """
+    Hashed timing wheel: a key scheduled at time t lands in slot ceil(t / tick) % slots.
+    Advancing the wheel returns the keys of every slot passed since the last call;
+    keys due in a later revolution come back early and are simply rescheduled.
+    """
+
+    def __init__(self, tick: float, slots: int, now: Optional[float] = None):
+        self.tick = tick
+        self._slots: List[Set[str]] = [set() for _ in range(slots)]
+        self._current = int((now if now is not None else time.monotonic()) / tick)
+
+    def schedule(self, key: str, at: float) -> None:
+        # Tidak pernah ke slot yang sudah lewat: paling cepat slot berikutnya
+        tick_no = max(math.ceil(at / self.tick), self._current + 1)
+        self._slots[tick_no % len(self._slots)].add(key)
+
+    def advance(self, now: float) -> Set[str]:
+        target = int(now / self.tick)
+        due: Set[str] = set()
+        # Lebih dari satu putaran tertinggal: cukup kosongkan setiap slot sekali
+        for tick_no in range(self._current + 1, min(target, self._current + len(self._slots)) + 1):
+            slot = self._slots[tick_no % len(self._slots)]
+            due |= slot
+            slot.clear()
+        self._current = max(self._current, target)
+        return due
+
+
+@dataclass
+class _Entry:
+    digest: str
+    expires_at: float # time.monotonic()
+    max_attempts: int
+    payload: Dict[str, Any]
+    attempts: int = 0
+
+
+class MemoryVerificationStore(VerificationStore):
+    def __init__(self, tick: float = 1.0, slots: int = 3600):
+        self._entries: Dict[str, _Entry] = {}
+        self._wheel = TimingWheel(tick, slots)
+        self._sweeper: Optional[asyncio.Task] = None
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def issue(self, purpose, subject, secret, ttl, payload=None, max_attempts=None) -> None:
+        key = entry_key(purpose, subject)
+        expires_at = time.monotonic() + ttl
+        self._entries[key] = _Entry(
+            digest=secret_digest(purpose, subject, secret),
+            expires_at=expires_at,
+            max_attempts=max_attempts or settings.VERIFICATION_MAX_ATTEMPTS,
+            payload=dict(payload or {}),
+        )
+        self._wheel.schedule(key, expires_at)
+
+    async def verify(self, purpose, subject, secret) -> Dict[str, Any]:
+        key = entry_key(purpose, subject)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            raise VerificationError("unknown or expired")
+        if not hmac.compare_digest(entry.digest, secret_digest(purpose, subject, secret)):
+            entry.attempts += 1
+            if entry.attempts >= entry.max_attempts:
+                del self._entries[key]
+                raise VerificationError("too many attempts")
+            raise VerificationError("wrong secret")
+        del self._entries[key]
+        return entry.payload
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop entries whose slot has come up; returns how many expired."""
+        now = now if now is not None else time.monotonic()
+        removed = 0
+        for key in self._wheel.advance(now):
+            entry = self._entries.get(key)
+            if entry is None:
+                continue # Sudah dipakai atau dihapus
+            if entry.expires_at <= now:
+                del self._entries[key]
+                removed += 1
+            else:
+                # Diterbitkan ulang, atau jatuh tempo di putaran berikutnya
+                self._wheel.schedule(key, entry.expires_at)
+        self.expired += removed
+        return removed
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._wheel.tick)
+            self.sweep()
+
+    async def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="verification-sweeper")
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+
+# --- Postgres ---
+
+class PostgresVerificationStore(VerificationStore):
+    _ISSUE_SQL = text(
+        """
+        INSERT INTO verification_codes (key_hash, purpose, secret_hash, payload, attempts, max_attempts, expires_at)
+        VALUES (:key, :purpose, :digest, CAST(:payload AS jsonb), 0, :max_attempts,
+                now() + make_interval(secs => :ttl))
+        ON CONFLICT (key_hash) DO UPDATE SET
+            secret_hash = EXCLUDED.secret_hash,
+            payload = EXCLUDED.payload,
+            attempts = 0,
+            max_attempts = EXCLUDED.max_attempts,
+            expires_at = EXCLUDED.expires_at,
+            created_at = now()
+        """
+    )
+    # Kunci baris agar dua percobaan bersamaan tidak sama-sama lolos atau melewati batas percobaan
+    _LOOKUP_SQL = text(
+        "SELECT secret_hash, payload, attempts, max_attempts FROM verification_codes "
+        "WHERE key_hash = :key AND expires_at > now() FOR UPDATE"
+    )
+    _DELETE_SQL = text("DELETE FROM verification_codes WHERE key_hash = :key")
+    _FAIL_SQL = text("UPDATE verification_codes SET attempts = attempts + 1 WHERE key_hash = :key")
+    _PURGE_SQL = text(
+        "DELETE FROM verification_codes WHERE key_hash IN ("
+        "SELECT key_hash FROM verification_codes WHERE expires_at <= now() LIMIT :batch FOR UPDATE SKIP LOCKED)"
+    )
+
+    async def issue(self, purpose, subject, secret, ttl, payload=None, max_attempts=None) -> None:
+        async with engine.begin() as conn:
+            await conn.execute(self._ISSUE_SQL, {
+                "key": entry_key(purpose, subject),
+                "purpose": purpose,
+                "digest": secret_digest(purpose, subject, secret),
+                "payload": json.dumps(payload or {}),
+                "max_attempts": max_attempts or settings.VERIFICATION_MAX_ATTEMPTS,
+                "ttl": ttl,
+            })
+
+    async def verify(self, purpose, subject, secret) -> Dict[str, Any]:
+        key = entry_key(purpose, subject)
+        async with engine.begin() as conn:
+            row = (await conn.execute(self._LOOKUP_SQL, {"key": key})).first()
+            if row is None:
+                raise VerificationError("unknown or expired")
+            stored_digest, payload, attempts, max_attempts = row
+            if hmac.compare_digest(stored_digest, secret_digest(purpose, subject, secret)):
+                await conn.execute(self._DELETE_SQL, {"key": key})
+                return payload if isinstance(payload, dict) else json.loads(payload)
+            if attempts + 1 >= max_attempts:
+                await conn.execute(self._DELETE_SQL, {"key": key})
+                reason = "too many attempts"
+            else:
+                await conn.execute(self._FAIL_SQL, {"key": key})
+                reason = "wrong secret"
+        # Di luar blok transaksi: penghitung percobaan sudah ter-commit
+        raise VerificationError(reason)
+
+    async def purge_expired(self, batch_size: Optional[int] = None, max_batches: int = 1000) -> int:
+        """Delete expired rows in short batches (no long lock, no bloat spike); returns the count."""
+        batch_size = batch_size or settings.VERIFICATION_PURGE_BATCH_SIZE
+        total = 0
+        for _ in range(max_batches):
+            async with engine.begin() as conn:
+                deleted = (await conn.execute(self._PURGE_SQL, {"batch": batch_size})).rowcount
+            total += deleted
+            if deleted < batch_size:
+                break
+        return total
+
+
+def create_verification_store() -> VerificationStore:
+    if settings.VERIFICATION_BACKEND == "postgres":
+        return PostgresVerificationStore()
+    return MemoryVerificationStore(tick=settings.VERIFICATION_SWEEP_TICK_SECONDS)
+
+
+verification_store = create_verification_store()
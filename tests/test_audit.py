@@ -0,0 +1,52 @@
+# tests/test_audit.py
+
+import asyncio
+
+from sqlalchemy.exc import DataError, OperationalError
+
+from app.services.audit import AuditWriter
+
+
+class _Database:
+    """Stand-in for AuditWriter._insert: rejects records marked bad, or everything while `down`."""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+
+    async def insert(self, records):
+        if self.down:
+            raise OperationalError("INSERT", {}, ConnectionError("connection refused"))
+        if any(record.get("bad") for record in records):
+            raise DataError("INSERT", {}, ValueError("value too long for type character varying(64)"))
+        self.rows.extend(record["n"] for record in records)
+
+
+def _writer(monkeypatch, database):
+    writer = AuditWriter()
+    monkeypatch.setattr(writer, "_insert", database.insert)
+    return writer
+
+
+def test_rejected_record_is_dropped_and_the_rest_written(monkeypatch):
+    database = _Database()
+    writer = _writer(monkeypatch, database)
+    writer.enqueue([{"n": n, "bad": n == 5} for n in range(10)])
+
+    assert asyncio.run(writer.flush()) == 9
+    assert database.rows == [0, 1, 2, 3, 4, 6, 7, 8, 9]
+    assert (len(writer), writer.dropped) == (0, 1)
+
+
+def test_connection_error_keeps_the_batch(monkeypatch):
+    database = _Database()
+    writer = _writer(monkeypatch, database)
+    writer.enqueue([{"n": n} for n in range(3)])
+
+    database.down = True
+    assert asyncio.run(writer.flush()) == 0
+    assert (len(writer), writer.dropped, writer.failed_flushes) == (3, 0, 1)
+
+    database.down = False
+    assert asyncio.run(writer.flush()) == 3
+    assert database.rows == [0, 1, 2]
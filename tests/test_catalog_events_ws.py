@@ -0,0 +1,41 @@
+# tests/test_catalog_events_ws.py
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.v1.endpoints import events
+from app.core.security import create_access_token
+
+app = FastAPI()
+app.include_router(events.router, prefix="/events")
+client = TestClient(app)
+
+
+def _token(**claims) -> str:
+    return create_access_token({"sub": "kasir", "user_id": 5, **claims})
+
+
+def test_company_user_receives_hello_for_own_company():
+    with client.websocket_connect(f"/events/catalog?company_id=7&token={_token(company_id=7)}") as ws:
+        assert ws.receive_json()["type"] == "hello"
+
+
+def test_bearer_header_is_accepted():
+    headers = {"Authorization": f"Bearer {_token(company_id=7)}"}
+    with client.websocket_connect("/events/catalog?company_id=7", headers=headers) as ws:
+        assert ws.receive_json()["type"] == "hello"
+
+
+@pytest.mark.parametrize("query", [
+    f"company_id=8&token={_token(company_id=7)}", # Company lain
+    f"company_id=7&outlet_id=3&token={_token(company_id=7, outlet_id=2)}", # Outlet lain
+    f"company_id=7&token={_token()}", # Bukan superuser, tanpa company
+    "company_id=7&token=not-a-token",
+])
+def test_handshake_outside_scope_is_rejected(query):
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect(f"/events/catalog?{query}") as ws:
+            ws.receive_json()
+    assert exc_info.value.code == 1008
@@ -0,0 +1,24 @@
+# tests/test_compression.py
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+
+@app.get("/{name}")
+def page(name: str, skip: int = 0):
+    # ETag yang sama untuk resource berbeda (mis. versi katalog)
+    return PlainTextResponse(f"{name} {skip} " * 100, headers={"ETag": '"catalog-v1"'})
+
+
+def test_cache_key_includes_path_and_query():
+    client = TestClient(app)
+    for path, expected in (("/a", "a 0 "), ("/b", "b 0 "), ("/b?skip=100", "b 100 ")):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == expected * 100
@@ -0,0 +1,44 @@
+# tests/test_pricing.py
+
+import asyncio
+from datetime import datetime, timezone
+
+from app.schemas.pricing import PriceResolveRequest
+from app.services.pricing import PriceBook, PriceRule
+
+
+def _book() -> PriceBook:
+    book = PriceBook()
+    book._rules[1] = {1: (
+        PriceRule(
+            id=7, price=9000.0, outlet_id=None,
+            valid_from=datetime(2025, 7, 1, tzinfo=timezone.utc), valid_to=datetime(2025, 8, 1, tzinfo=timezone.utc),
+        ),
+    )}
+    return book
+
+
+def test_naive_request_timestamp_is_treated_as_utc():
+    request = PriceResolveRequest(company_id=1, sales_channel_id=1, at="2025-07-01T12:00:00", product_ids=[1])
+    assert request.at == datetime(2025, 7, 1, 12, tzinfo=timezone.utc)
+    assert _book().resolve(1, 1, None, request.at).id == 7
+
+
+def test_resolve_accepts_naive_datetime():
+    assert _book().resolve(1, 1, None, datetime(2025, 7, 15)).id == 7
+    assert _book().resolve(1, 1, None, datetime(2025, 8, 1)) is None
+
+
+def test_reload_swaps_only_changed_products(monkeypatch):
+    book = _book()
+    other = {2: (PriceRule(id=8, price=5000.0, outlet_id=None, valid_from=None, valid_to=None),)}
+    book._rules[2] = other
+
+    async def fetch(product_ids):
+        assert product_ids == [1]
+        return {} # Override produk 1 sudah dihapus
+    monkeypatch.setattr(book, "_fetch", fetch)
+
+    asyncio.run(book.reload_products([1]))
+    assert book.resolve(1, 1, None, datetime(2025, 7, 15)) is None
+    assert book._rules[2] is other
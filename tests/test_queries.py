@@ -0,0 +1,35 @@
+# tests/test_queries.py
+
+import importlib
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db import queries
+from app.db.soft_delete import INCLUDE_DELETED, SOFT_DELETE_APPLIED
+
+
+def test_app_imports_without_building_statements():
+    importlib.import_module("app.main")
+
+
+def test_build_all_builds_every_variant_once():
+    assert queries.build_all() > 0
+    assert queries.product_by_sku() is queries.product_by_sku()
+    options = queries.product_by_id(True).get_execution_options()
+    assert options[SOFT_DELETE_APPLIED] and options[queries.HOT_QUERY_OPTION] == "product_by_id"
+    assert queries.product_name_taken().get_execution_options()[INCLUDE_DELETED]
+    sql = str(queries.product_by_id(True).compile(dialect=postgresql.dialect()))
+    assert "products.deleted_at IS NULL" in sql
+
+
+def test_broken_statement_raises_hot_query_error():
+    @queries.hot_query()
+    def broken():
+        raise AttributeError("no such column")
+
+    try:
+        with pytest.raises(queries.HotQueryError, match="broken"):
+            queries.build_all()
+    finally:
+        queries._REGISTRY.pop(broken)
@@ -0,0 +1,38 @@
+# tests/test_receipts.py
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.services import receipt_layout
+from app.services.receipts import ReceiptError, ReceiptRenderer
+
+
+@pytest.mark.parametrize("workers, reprint, expected", [(1, 1, (1, 1, 2)), (2, 1, (1, 1, 2)), (4, 3, (1, 3, 4)), (4, 9, (1, 3, 4))])
+def test_slots_never_exceed_the_pool(monkeypatch, workers, reprint, expected):
+    monkeypatch.setattr(settings, "RECEIPT_RENDER_WORKERS", workers)
+    monkeypatch.setattr(settings, "RECEIPT_REPRINT_CONCURRENCY", reprint)
+    renderer = ReceiptRenderer()
+    assert (renderer.checkout_slots, renderer.reprint_slots, renderer.workers) == expected
+
+
+def test_timed_out_render_keeps_its_slot_until_it_finishes(monkeypatch):
+    # 0 worker: render di thread, cukup untuk melihat kapan slot dilepas
+    monkeypatch.setattr(settings, "RECEIPT_RENDER_WORKERS", 0)
+    monkeypatch.setattr(settings, "RECEIPT_RENDER_TIMEOUT_SECONDS", 0.05)
+    finish = threading.Event()
+    monkeypatch.setattr(receipt_layout, "render", lambda *_a: (finish.wait(5), (b"", 0.0))[1])
+
+    async def scenario():
+        renderer = ReceiptRenderer()
+        await renderer.start()
+        with pytest.raises(ReceiptError):
+            await renderer._run({}, "roll_58mm", "text", "checkout")
+        assert renderer._checkout_slots.locked()
+        finish.set()
+        await asyncio.wait_for(renderer._checkout_slots.acquire(), timeout=5)
+        await renderer.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+# tests/test_recipes.py
+
+from types import MappingProxyType
+
+from app.services.recipes import Explosion, RecipeBook, _Graph
+
+ML, GRAM, PCS = 1, 2, 3
+
+
+def test_stock_uoms_come_with_the_explosion():
+    book = RecipeBook()
+    # Sub-resep "espresso" sudah ter-memo dari request sebelumnya; graph ini tidak memuat bahannya
+    book._exploded[10] = Explosion(1, MappingProxyType({20: 18.0}), MappingProxyType({20: GRAM}))
+    graph = _Graph()
+    graph.recipes = {1: [(10, 1.0, PCS), (30, 150.0, ML)]}
+    graph.stock_uoms = {1: PCS, 10: PCS, 30: ML}
+
+    latte = book._compute(1, 1, graph, {}, [], True)
+    assert dict(latte.materials) == {20: 18.0, 30: 150.0}
+    assert dict(latte.stock_uoms) == {20: GRAM, 30: ML}
+
+    # Tanpa memo (validasi replace_recipe) satuan stok tetap dari graph
+    raw = book._compute(30, 1, graph, {}, [], False)
+    assert dict(raw.stock_uoms) == {30: ML}
@@ -0,0 +1,36 @@
+# tests/test_scope.py
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import UNSCOPED, Principal, Scope, get_scope
+from app.api.v1.endpoints.users import _check_assignable
+
+
+def test_superuser_without_company_is_unscoped():
+    principal = Principal(user_id=1, username="root", is_superuser=True)
+    assert asyncio.run(get_scope(principal)) is UNSCOPED
+
+
+def test_companyless_user_is_forbidden():
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(get_scope(Principal(user_id=2, username="kasir")))
+    assert exc_info.value.status_code == 403
+
+
+def test_company_user_is_scoped_to_company():
+    scope = asyncio.run(get_scope(Principal(user_id=3, username="admin", company_id=7, outlet_id=2)))
+    assert (scope.company_id, scope.outlet_id) == (7, 2)
+    with pytest.raises(HTTPException):
+        scope.company(8)
+
+
+def test_outlet_staff_create_users_in_their_outlet():
+    scope = Scope(company_id=7, outlet_id=2)
+    assert _check_assignable(scope, None, None, False) == (7, 2)
+    with pytest.raises(HTTPException):
+        _check_assignable(scope, 7, 3, False)
+    with pytest.raises(HTTPException):
+        _check_assignable(scope, None, None, True)
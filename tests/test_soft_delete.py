@@ -0,0 +1,35 @@
+# tests/test_soft_delete.py
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+import app.db.connection  # noqa: F401 - mendaftarkan semua model
+from app.db.soft_delete import exclude_deleted
+from app.models.product import Product
+
+
+def test_exclude_deleted_compiles_for_product():
+    sql = str(exclude_deleted(select(Product)).compile(dialect=postgresql.dialect()))
+    assert "products.deleted_at IS NULL" in sql
+
+
+def _executed_sql(statement) -> str:
+    # SQLite tanpa tabel: cukup untuk menangkap SQL yang dikirim setelah hook do_orm_execute berjalan
+    engine = create_engine("sqlite://")
+    captured = []
+    event.listen(engine, "before_cursor_execute", lambda _c, _cur, sql, *_a: captured.append(sql))
+    with Session(engine) as session, pytest.raises(OperationalError):
+        session.execute(statement)
+    return captured[0]
+
+
+def test_session_hook_excludes_soft_deleted_rows():
+    assert "products.deleted_at IS NULL" in _executed_sql(select(Product))
+
+
+def test_include_deleted_skips_the_criteria():
+    assert "deleted_at IS NULL" not in _executed_sql(select(Product).execution_options(include_deleted=True))
@@ -0,0 +1,146 @@
+# tests/test_write_queries.py
+
+"""
+Write endpoints must build their response from INSERT/UPDATE ... RETURNING:
+after validation, exactly one statement touches the written table and
+nothing is read back. Also the bulk price rule, whose guard runs in SQL.
+Needs the PostgreSQL database of DATABASE_ASYNC_URL
+(migrated with `alembic upgrade head`); skipped when it cannot be
+connected to or is not migrated.
+Every test runs in a transaction that is rolled back.
+"""
+
+import asyncio
+import re
+import uuid
+
+import asyncpg
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.api.deps import UNSCOPED
+from app.api.v1.endpoints import products, users
+from app.core.config import settings
+from app.models.company import Company as CompanyModel
+from app.models.uom import UOM as UOMModel
+from app.schemas.company import Company as CompanySchema
+from app.schemas.product import ProductBulkPriceRule, ProductBulkUpdateRequest, ProductCreate, ProductUpdate
+from app.schemas.uom import UOMInDB
+from app.schemas.user import UserCreate, UserUpdate
+from app.services.reference_data import ReferenceSnapshot, reference_data
+
+# Statement yang boleh muncul setelah write: NOTIFY cache bus/catalog event dan savepoint
+_BOOKKEEPING = re.compile(r"^\s*(SELECT pg_notify|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)", re.IGNORECASE)
+
+
+def _run(monkeypatch, scenario):
+    async def main():
+        engine = create_async_engine(settings.DATABASE_ASYNC_URL, poolclass=NullPool)
+        try:
+            try:
+                async with engine.connect() as probe:
+                    await probe.execute(text("SELECT 1 FROM products LIMIT 0"))
+            except (OSError, ConnectionError, DBAPIError, asyncpg.PostgresError) as e:
+                # Server mati, role/database conftest tidak ada, atau belum di-migrate: lewati, jangan gagal
+                pytest.skip(f"PostgreSQL test database not available: {e}")
+            async with engine.connect() as conn:
+                await conn.begin()
+                statements = []
+                event.listen(
+                    engine.sync_engine, "before_cursor_execute",
+                    lambda _c, _cur, sql, *_a: statements.append(sql),
+                )
+                # commit() di endpoint hanya melepas savepoint; transaksi luar di-rollback
+                db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+                suffix = uuid.uuid4().hex[:8]
+                company = CompanyModel(name=f"Test {suffix}")
+                uom = UOMModel(name=f"Test {suffix}", symbol=suffix)
+                db.add_all([company, uom])
+                await db.flush()
+                # Seperti setelah lifespan: company dan UOM sudah ada di snapshot reference data
+                uom_out = UOMInDB.model_validate(uom)
+                monkeypatch.setattr(reference_data, "snapshot", ReferenceSnapshot(
+                    1, {uom.id: uom_out}, (uom_out,),
+                    {company.id: CompanySchema.model_validate(company, from_attributes=True)},
+                ))
+                company_id, uom_id = company.id, uom.id
+                await scenario(db, statements, company_id, uom_id, suffix)
+                await db.close()
+                await conn.rollback()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+async def _writes(statements, call, table):
+    """Run `call` and return the statements it issued from the first write on `table` onwards."""
+    start = len(statements)
+    result = await call
+    issued = statements[start:]
+    write = re.compile(rf"^\s*(INSERT INTO|UPDATE) {table}\b", re.IGNORECASE)
+    first = next(i for i, sql in enumerate(issued) if write.match(sql))
+    return result, [sql for sql in issued[first:] if not _BOOKKEEPING.match(sql)]
+
+
+def test_product_writes_issue_one_statement(monkeypatch):
+    async def scenario(db, statements, company_id, uom_id, suffix):
+        product_in = ProductCreate(company_id=company_id, name="Latte", sku=f"SKU-{suffix}", stock_uom_id=uom_id, base_price=25000)
+        created, after = await _writes(
+            statements, products.create_product(product_in, db=db, scope=UNSCOPED), "products"
+        )
+        assert len(after) == 1 and "RETURNING" in after[0]
+        assert created.stock_uom.id == uom_id
+
+        product_in = ProductUpdate(base_price=27000)
+        updated, after = await _writes(
+            statements,
+            products.update_product(created.id, product_in, company_id=company_id, db=db, scope=UNSCOPED),
+            "products",
+        )
+        assert len(after) == 1 and "RETURNING" in after[0]
+        assert updated.base_price == 27000
+
+    _run(monkeypatch, scenario)
+
+
+def test_user_writes_issue_one_statement(monkeypatch):
+    async def scenario(db, statements, company_id, uom_id, suffix):
+        user_in = UserCreate(username=f"u{suffix}", email=f"{suffix}@example.com", password="secret123", company_id=company_id)
+        created, after = await _writes(statements, users.create_user(user_in, db=db, scope=UNSCOPED), "users")
+        assert len(after) == 1 and "RETURNING" in after[0]
+        assert created.company.id == company_id
+
+        updated, after = await _writes(
+            statements, users.update_user(created.id, UserUpdate(full_name="Kasir"), db=db, scope=UNSCOPED), "users"
+        )
+        assert len(after) == 1 and "RETURNING" in after[0]
+        assert updated.full_name == "Kasir"
+
+    _run(monkeypatch, scenario)
+
+
+def test_price_rule_skips_prices_that_round_to_zero(monkeypatch):
+    async def scenario(db, statements, company_id, uom_id, suffix):
+        ids = []
+        for n, price in enumerate((1, 100)):
+            product_in = ProductCreate(
+                company_id=company_id, name=f"Gula {n}", sku=f"RND-{suffix}-{n}", stock_uom_id=uom_id, base_price=price
+            )
+            ids.append((await products.create_product(product_in, db=db, scope=UNSCOPED)).id)
+
+        # 1 * 0.004 = 0.004 lolos "> 0" sebelum dibulatkan, tapi tersimpan sebagai 0.00
+        bulk_in = ProductBulkUpdateRequest(
+            company_id=company_id, rule=ProductBulkPriceRule(price_multiplier=0.004, round_to=2, product_ids=ids)
+        )
+        response = await products.bulk_update_products(bulk_in, db=db, scope=UNSCOPED)
+        assert response.updated == 1
+        stored = await db.execute(
+            text("SELECT base_price FROM products WHERE company_id = :company_id ORDER BY id"), {"company_id": company_id}
+        )
+        assert stored.scalars().all() == [1, 0.4]
+
+    _run(monkeypatch, scenario)